@@ -0,0 +1,97 @@
+"""
+Helpers for running benchmarks against a private tmux server.
+
+Each benchmark gets its own socket so that it never touches the user's real
+tmux server, and the server is started with an empty config so that user
+settings do not skew the numbers.
+"""
+
+import contextlib
+import json
+import os
+import shutil
+import stat
+import subprocess
+import uuid
+
+from libtmux import Server
+
+
+@contextlib.contextmanager
+def isolated_server(config_file=os.devnull):
+    """Start a tmux server on a throwaway socket and kill it afterwards."""
+    socket_name = f"tmux-bro-bench-{uuid.uuid4().hex[:8]}"
+    server = Server(socket_name=socket_name, config_file=config_file)
+    try:
+        yield server
+    finally:
+        subprocess.run(
+            ["tmux", "-L", socket_name, "kill-server"],
+            capture_output=True,
+        )
+
+
+SHIM = """#!/bin/sh
+echo "$@" >> {log}
+exec {tmux} "$@"
+"""
+
+
+def install_tmux_shim(root):
+    """
+    Put a tmux on PATH that logs every invocation before running the real one.
+    Returns the path of the log.
+    """
+    shim_dir = os.path.join(root, "bin")
+    os.makedirs(shim_dir)
+    log = os.path.join(root, "tmux.log")
+    shim = os.path.join(shim_dir, "tmux")
+    with open(shim, "w") as f:
+        f.write(SHIM.format(log=log, tmux=shutil.which("tmux")))
+    os.chmod(shim, os.stat(shim).st_mode | stat.S_IXUSR)
+    os.environ["PATH"] = f"{shim_dir}{os.pathsep}{os.environ['PATH']}"
+    return log
+
+
+def make_workspace(workspace, packages, scripts=None, project_config=None):
+    """
+    Create an npm workspace with the given number of packages, each with the
+    given package.json scripts, and optionally a .tmux-bro.yaml.
+    """
+    os.makedirs(workspace)
+    with open(os.path.join(workspace, "package.json"), "w") as f:
+        json.dump({"name": "workspace", "workspaces": ["packages/*"]}, f)
+    if project_config is not None:
+        with open(os.path.join(workspace, ".tmux-bro.yaml"), "w") as f:
+            f.write(project_config)
+    for i in range(packages):
+        package_dir = os.path.join(workspace, "packages", f"pkg{i}")
+        os.makedirs(package_dir)
+        manifest = {"name": f"pkg{i}"}
+        if scripts:
+            manifest["scripts"] = scripts
+        with open(os.path.join(package_dir, "package.json"), "w") as f:
+            json.dump(manifest, f)
+    return workspace
+
+
+def write_executable(path, content):
+    with open(path, "w") as f:
+        f.write(content)
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+
+
+def count_lines(path):
+    try:
+        with open(path) as f:
+            return sum(1 for _ in f)
+    except OSError:
+        return 0
+
+
+def pane_pids(server, session_name):
+    """Return the pids of the processes running in every pane of a session."""
+    output = server.cmd(
+        "list-panes", "-s", "-t", session_name, "-F", "#{pane_pid}"
+    ).stdout
+    return [int(pid) for pid in output if pid.strip()]
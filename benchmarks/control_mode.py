@@ -0,0 +1,88 @@
+"""
+Count tmux processes spawned, and time taken, by the work tmux-bro does
+around a session build: looking the session up, tagging its windows and
+panes, and the queries of a reconcile that finds nothing to do. Runs the same
+steps through a control mode client and through libtmux's one process per
+command.
+
+tmux is wrapped by a shim on PATH that logs every invocation. Switching the
+client is left out, since the private server has no terminal attached.
+
+    python -m benchmarks.control_mode --packages 20 --rounds 5
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from tmuxp.workspace.builder import WorkspaceBuilder
+
+from tmux_bro.control import ControlClient
+from tmux_bro.tmux import (
+    build_session_config,
+    find_tmux_session,
+    reconcile_tmux_session,
+    tag_tmux_session,
+)
+
+from ._tmux import count_lines, install_tmux_shim, isolated_server, make_workspace
+
+
+def _post_build(runner, config, workspace):
+    session = find_tmux_session(config["session_name"], runner)
+    tag_tmux_session(session, config, workspace, runner)
+    reconcile_tmux_session(session, config, runner=runner)
+
+
+def run(packages, rounds):
+    with tempfile.TemporaryDirectory() as root:
+        workspace = make_workspace(
+            os.path.join(root, "workspace"), packages, {"dev": "sleep 1000"}
+        )
+        config = build_session_config(workspace)
+        # Dev panes would only add noise to the timings
+        for window in config["windows"]:
+            for pane in window["panes"]:
+                pane["shell_command"] = []
+
+        with isolated_server() as server:
+            WorkspaceBuilder(session_config=config, server=server).build()
+            log = install_tmux_shim(root)
+            socket_args = ["-L", server.socket_name]
+
+            def with_libtmux():
+                _post_build(server, config, workspace)
+
+            def with_control():
+                with ControlClient(socket_args) as client:
+                    client.connect()
+                    _post_build(client, config, workspace)
+
+            print(f"{len(config['windows'])} windows, {rounds} rounds")
+            for name, func in (("libtmux", with_libtmux), ("control", with_control)):
+                timings = []
+                spawned = 0
+                for _ in range(rounds):
+                    before = count_lines(log)
+                    start = time.perf_counter()
+                    func()
+                    timings.append(time.perf_counter() - start)
+                    spawned = count_lines(log) - before
+                print(
+                    f"{name:>8}: {spawned:4d} tmux processes, "
+                    f"median {statistics.median(timings) * 1000:7.1f} ms"
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--packages", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    run(args.packages, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
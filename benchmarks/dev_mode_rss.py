@@ -0,0 +1,65 @@
+"""
+Compare the memory used by dev processes in `dev_mode: package` and
+`dev_mode: aggregate` for a real workspace.
+
+Each mode builds its session on a private tmux server, waits for the dev
+servers to settle and then sums the RSS of every pane's process tree.
+
+    python -m benchmarks.dev_mode_rss ~/code/my-monorepo --settle 20
+"""
+
+import argparse
+import time
+from unittest.mock import patch
+
+from tmuxp.workspace.builder import WorkspaceBuilder
+
+from tmux_bro.config import load_project_config
+from tmux_bro.procfs import tree_rss
+from tmux_bro.tmux import build_session_config
+from tmux_bro.units import format_bytes
+
+from ._tmux import isolated_server, pane_pids
+
+
+def measure(directory, dev_mode, settle):
+    def project_config(path):
+        return {**load_project_config(path), "dev_mode": dev_mode}
+
+    with patch("tmux_bro.tmux.load_project_config", side_effect=project_config):
+        config = build_session_config(directory)
+
+    with isolated_server() as server:
+        builder = WorkspaceBuilder(session_config=config, server=server)
+        builder.build()
+        time.sleep(settle)
+        pids = pane_pids(server, config["session_name"])
+        return len(config["windows"]), len(pids), tree_rss(pids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("directory", help="workspace root to benchmark")
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=15.0,
+        help="seconds to wait for dev servers to start before sampling",
+    )
+    args = parser.parse_args()
+
+    results = {}
+    for dev_mode in ("package", "aggregate"):
+        windows, panes, rss = measure(args.directory, dev_mode, args.settle)
+        results[dev_mode] = rss
+        print(
+            f"{dev_mode:>10}: {windows} windows, {panes} panes, "
+            f"{format_bytes(rss)} RSS"
+        )
+
+    saved = results["package"] - results["aggregate"]
+    print(f"{'saved':>10}: {format_bytes(saved)}")
+
+
+if __name__ == "__main__":
+    main()
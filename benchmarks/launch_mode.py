@@ -0,0 +1,103 @@
+"""
+Measure time until the editor is visible in every window for
+`launch_mode: keys` and `launch_mode: command`.
+
+A stub editor prints a marker, and the pane shell is replaced with one that
+sleeps for --rc-delay seconds before becoming interactive, standing in for a
+slow shell rc file. Commands run directly as the pane process skip that delay.
+
+    python -m benchmarks.launch_mode --packages 10 --rc-delay 0.3
+"""
+
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+from unittest.mock import patch
+
+from tmuxp.workspace.builder import WorkspaceBuilder
+
+from tmux_bro.tmux import build_session_config
+
+from ._tmux import isolated_server, make_workspace, write_executable
+
+MARKER = "EDITOR-VISIBLE"
+
+SLOW_SHELL = """#!/bin/sh
+if [ "$1" = "-c" ]; then
+    exec /bin/sh "$@"
+fi
+sleep {rc_delay}
+exec /bin/sh -i
+"""
+
+
+def _editor_panes(server, session_name):
+    output = server.cmd(
+        "list-panes", "-s", "-t", session_name, "-F", "#{pane_index} #{pane_id}"
+    ).stdout
+    return [line.split()[1] for line in output if line.split()[0] == "0"]
+
+
+def measure(workspace, launch_mode, tmux_conf, editor):
+    with patch(
+        "tmux_bro.tmux.load_global_config",
+        return_value={"launch_mode": launch_mode},
+    ), patch.dict(os.environ, {"EDITOR": editor}):
+        config = build_session_config(workspace)
+
+    with isolated_server(tmux_conf) as server:
+        start = time.monotonic()
+        builder = WorkspaceBuilder(session_config=config, server=server)
+        builder.build()
+        built = time.monotonic() - start
+
+        pending = set(_editor_panes(server, config["session_name"]))
+        first = None
+        while pending:
+            for pane_id in list(pending):
+                screen = subprocess.run(
+                    ["tmux", "-L", server.socket_name, "capture-pane", "-p"]
+                    + ["-t", pane_id],
+                    capture_output=True,
+                    text=True,
+                ).stdout
+                if MARKER in screen:
+                    pending.discard(pane_id)
+                    if first is None:
+                        first = time.monotonic() - start
+            time.sleep(0.005)
+
+        return built, first, time.monotonic() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--packages", type=int, default=10)
+    parser.add_argument(
+        "--rc-delay",
+        type=float,
+        default=0.3,
+        help="seconds the stand-in shell spends in its rc file",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        shell = os.path.join(root, "slow-sh")
+        write_executable(shell, SLOW_SHELL.format(rc_delay=args.rc_delay))
+        tmux_conf = os.path.join(root, "tmux.conf")
+        with open(tmux_conf, "w") as f:
+            f.write(f"set -g default-shell {shell}\n")
+        editor = os.path.join(root, "stub-editor")
+        write_executable(editor, f"#!/bin/sh\necho {MARKER}\nexec sleep 600\n")
+        workspace = make_workspace(os.path.join(root, "workspace"), args.packages)
+
+        print(f"{'mode':>8} {'build':>8} {'first':>8} {'all':>8}")
+        for launch_mode in ("keys", "command"):
+            built, first, last = measure(workspace, launch_mode, tmux_conf, editor)
+            print(f"{launch_mode:>8} {built:>7.3f}s {first:>7.3f}s {last:>7.3f}s")
+
+
+if __name__ == "__main__":
+    main()
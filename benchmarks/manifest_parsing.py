@@ -0,0 +1,114 @@
+"""
+Compare the manifest reads done by workspace detection with full parsing by
+json and toml, over the manifests in tests/fixtures/manifests and a large
+generated package.json.
+
+For each package.json it asks for `workspaces` and for a dev script, and for
+each Cargo.toml for `[workspace]`, the way detection does.
+
+    python -m benchmarks.manifest_parsing --rounds 200
+"""
+
+import argparse
+import glob
+import json
+import os
+import tempfile
+import time
+
+import toml
+
+from tmux_bro.manifest import (
+    JSON_BACKEND,
+    TOML_BACKEND,
+    read_json_keys,
+    read_toml_keys,
+)
+
+FIXTURES = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "tests",
+    "fixtures",
+    "manifests",
+)
+
+
+def _full_json(path):
+    with open(path, "r") as f:
+        data = json.load(f)
+    return data.get("workspaces"), "dev" in data.get("scripts", {})
+
+
+def _targeted_json(path):
+    workspaces = read_json_keys(path, ["workspaces"]).get("workspaces")
+    scripts = read_json_keys(path, ["scripts"], ["dev"]).get("scripts", {})
+    return workspaces, "dev" in scripts
+
+
+def _full_toml(path):
+    with open(path, "r") as f:
+        return toml.load(f).get("workspace")
+
+
+def _targeted_toml(path):
+    return read_toml_keys(path, ["workspace"], ["members"]).get("workspace")
+
+
+def _write_generated(root, dependencies):
+    """A lockfile-sized package.json, as some generators produce."""
+    path = os.path.join(root, "generated.package.json")
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "name": "generated",
+                "scripts": {"build": "tsc -b"},
+                "dependencies": {
+                    f"@scope/package-{i}": f"^{i % 20}.{i % 7}.0"
+                    for i in range(dependencies)
+                },
+            },
+            f,
+            indent=2,
+        )
+    return path
+
+
+def _time(func, paths, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for path in paths:
+            func(path)
+    return (time.perf_counter() - start) / rounds / len(paths) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--dependencies", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        package_jsons = sorted(glob.glob(os.path.join(FIXTURES, "*.package.json")))
+        cargo_tomls = sorted(glob.glob(os.path.join(FIXTURES, "*.toml")))
+        generated = _write_generated(root, args.dependencies)
+
+        for path in package_jsons + [generated]:
+            assert _full_json(path) == _targeted_json(path), path
+        for path in cargo_tomls:
+            assert _full_toml(path) == _targeted_toml(path), path
+
+        print(f"json backend: {JSON_BACKEND}, toml backend: {TOML_BACKEND}")
+        print(f"{'corpus':<24} {'files':>5} {'full':>10} {'targeted':>10}  (us/file)")
+        for name, paths, full, targeted, rounds in (
+            ("package.json", package_jsons, _full_json, _targeted_json, args.rounds),
+            ("generated package.json", [generated], _full_json, _targeted_json, 5),
+            ("Cargo.toml", cargo_tomls, _full_toml, _targeted_toml, args.rounds),
+        ):
+            print(
+                f"{name:<24} {len(paths):>5} {_time(full, paths, rounds):>10.1f} "
+                f"{_time(targeted, paths, rounds):>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Time building sessions of 1 to 200 windows against a private tmux server,
+for each builder backend.
+
+Sessions are built from build_session_config output for synthetic workspaces
+whose packages run a stub editor and a stub dev command. For every build it
+records the time to build, the time until the editor of the first window is
+visible, the tmux server's RSS with the session open and the number of tmux
+processes spawned. Pass --json to save the results with the current commit,
+so that runs can be compared across commits.
+
+    python -m benchmarks.session_build --windows 1,10,50,200 --rounds 3
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+from tmuxp.workspace.builder import WorkspaceBuilder
+
+from tmux_bro.control import ControlClient
+from tmux_bro.procfs import process_rss
+from tmux_bro.tmux import build_session_config, build_tmux_session
+from tmux_bro.units import format_bytes
+
+from ._tmux import (
+    count_lines,
+    install_tmux_shim,
+    isolated_server,
+    make_workspace,
+    write_executable,
+)
+
+MARKER = "EDITOR-VISIBLE"
+
+
+def _build_tmuxp(server, config, workspace):
+    WorkspaceBuilder(session_config=config, server=server).build()
+
+
+def _build_tmux_bro(server, config, workspace):
+    with ControlClient(["-L", server.socket_name]) as client:
+        runner = client if client.connect() else server
+        build_tmux_session(config, workspace, server, runner)
+
+
+# Plain tmuxp, and tmux-bro's builder with tagging through a control client
+BACKENDS = {"tmuxp": _build_tmuxp, "tmux-bro": _build_tmux_bro}
+
+
+def _wait_for_first_editor(tmux, socket_name, session_name, start, stop, result):
+    """
+    Poll the first window's editor pane until it shows the stub editor's
+    marker. Runs the real tmux binary, so its processes are not counted.
+    """
+    base = [tmux, "-L", socket_name]
+    while not stop.is_set():
+        windows = subprocess.run(
+            base + ["list-windows", "-t", f"={session_name}", "-F", "#{window_id}"],
+            capture_output=True,
+            text=True,
+        ).stdout.split()
+        # tmuxp builds the first window next to a placeholder it kills later
+        for window_id in windows[:2]:
+            screen = subprocess.run(
+                base + ["capture-pane", "-p", "-t", f"{window_id}.0"],
+                capture_output=True,
+                text=True,
+            ).stdout
+            if MARKER in screen:
+                result.append(time.perf_counter() - start)
+                return
+        time.sleep(0.005)
+
+
+def measure(server, backend, config, workspace, log, tmux):
+    session_name = config["session_name"]
+    stop = threading.Event()
+    first = []
+    before = count_lines(log)
+    start = time.perf_counter()
+    poller = threading.Thread(
+        target=_wait_for_first_editor,
+        args=(tmux, server.socket_name, session_name, start, stop, first),
+        daemon=True,
+    )
+    poller.start()
+
+    BACKENDS[backend](server, config, workspace)
+    built = time.perf_counter() - start
+    spawned = count_lines(log) - before
+
+    poller.join(timeout=30)
+    stop.set()
+    server_pid = int(server.cmd("display-message", "-p", "#{pid}").stdout[0])
+    rss = process_rss(server_pid)
+    server.cmd("kill-session", "-t", f"={session_name}")
+    return {
+        "build": built,
+        "first_ready": first[0] if first else None,
+        "server_rss": rss,
+        "spawns": spawned,
+    }
+
+
+def _commit():
+    return subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    ).stdout.strip()
+
+
+def run(window_counts, backends, rounds, launch_mode):
+    results = []
+    with tempfile.TemporaryDirectory() as root:
+        editor = os.path.join(root, "stub-editor")
+        write_executable(editor, f"#!/bin/sh\necho {MARKER}\nexec sleep 600\n")
+        dev = os.path.join(root, "stub-dev")
+        write_executable(dev, "#!/bin/sh\nexec sleep 600\n")
+        # A plain shell, so that the user's rc files don't skew the numbers
+        tmux_conf = os.path.join(root, "tmux.conf")
+        with open(tmux_conf, "w") as f:
+            f.write("set -g default-shell /bin/sh\n")
+        tmux = shutil.which("tmux")
+        log = install_tmux_shim(root)
+
+        print(
+            f"{'backend':>9} {'windows':>7} {'build':>8} {'first':>8} "
+            f"{'server rss':>11} {'spawns':>6}"
+        )
+        for count in window_counts:
+            workspace = make_workspace(
+                os.path.join(root, f"workspace-{count}"),
+                count,
+                project_config=f"dev_command: {dev}\n",
+            )
+            with patch(
+                "tmux_bro.tmux.load_global_config",
+                return_value={"launch_mode": launch_mode},
+            ), patch.dict(os.environ, {"EDITOR": editor}):
+                config = build_session_config(workspace)
+
+            for backend in backends:
+                # A fresh server per backend, so RSS isn't carried over
+                with isolated_server(tmux_conf) as server:
+                    # Keeps the server alive between builds
+                    server.cmd("new-session", "-d", "-s", "keepalive")
+                    rounds_results = [
+                        measure(server, backend, config, workspace, log, tmux)
+                        for _ in range(rounds)
+                    ]
+
+                firsts = [r["first_ready"] for r in rounds_results if r["first_ready"]]
+                result = {
+                    "backend": backend,
+                    "windows": len(config["windows"]),
+                    "launch_mode": launch_mode,
+                    "build": statistics.median(r["build"] for r in rounds_results),
+                    "first_ready": statistics.median(firsts) if firsts else None,
+                    "server_rss": max(r["server_rss"] for r in rounds_results),
+                    "spawns": rounds_results[-1]["spawns"],
+                }
+                results.append(result)
+                first = (
+                    f"{result['first_ready']:7.3f}s"
+                    if result["first_ready"] is not None
+                    else f"{'-':>8}"
+                )
+                print(
+                    f"{backend:>9} {result['windows']:>7} {result['build']:7.3f}s "
+                    f"{first} {format_bytes(result['server_rss']):>11} "
+                    f"{result['spawns']:>6}"
+                )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--windows",
+        default="1,10,50,200",
+        help="comma separated window counts (default: 1,10,50,200)",
+    )
+    parser.add_argument(
+        "--backend",
+        action="append",
+        choices=sorted(BACKENDS),
+        help="backend to run, can be repeated (default: all)",
+    )
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--launch-mode", choices=["keys", "command"], default="keys")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    window_counts = [int(count) for count in args.windows.split(",")]
+    results = run(
+        window_counts, args.backend or list(BACKENDS), args.rounds, args.launch_mode
+    )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"commit": _commit(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -23,6 +23,7 @@ setup(
     ],
     python_requires=">=3.6",
     install_requires=requirements,
+    extras_require={"fast": ["orjson"]},
     entry_points={
         "console_scripts": [
             "tmux-bro=tmux_bro.main:main",
@@ -35,3 +35,18 @@ def test_load_global_config_valid_yaml(tmp_path):
         mock_path.return_value = str(config_file)
         config = load_global_config()
         assert config == test_config
+
+
+def test_load_global_config_parses_again_after_change(tmp_path):
+    """Test that the cached config is dropped when the file changes"""
+    config_file = tmp_path / "tmux-bro.yaml"
+    config_file.write_text("speculate: false\n")
+
+    with patch("tmux_bro.config.get_global_config_path") as mock_path:
+        mock_path.return_value = str(config_file)
+        config = load_global_config()
+        config["speculate"] = True
+        assert load_global_config() == {"speculate": False}
+
+        config_file.write_text("speculate: true\npreview: false\n")
+        assert load_global_config() == {"speculate": True, "preview": False}
@@ -0,0 +1,77 @@
+import pytest
+
+from tmux_bro.candidates import filter_candidates
+
+
+@pytest.fixture
+def projects(tmp_path):
+    root = tmp_path / "code"
+    for path in ["app/src", "app-web", "notes/drafts", "lib/node_modules/x"]:
+        (root / path).mkdir(parents=True)
+    (root / "app" / "package.json").write_text("{}")
+    (root / "lib" / ".git").mkdir()
+    return root
+
+
+def test_filter_drops_missing_ignored_and_subpaths(projects):
+    """Test that only existing candidates outside project roots are kept."""
+    directories = [
+        str(projects / name)
+        for name in [
+            "app/src",
+            "gone",
+            "app",
+            "app-web",
+            "notes",
+            "notes/drafts",
+            "lib/node_modules/x",
+            "app",
+        ]
+    ]
+    assert filter_candidates(directories, {}) == [
+        str(projects / name) for name in ["app", "app-web", "notes", "notes/drafts"]
+    ]
+
+
+def test_filter_keeps_nested_project_roots(projects):
+    """Test that a project root inside another one is not hidden."""
+    (projects / "app" / "packages" / "ui").mkdir(parents=True)
+    (projects / "app" / "packages" / "ui" / "package.json").write_text("{}")
+    directories = [
+        str(projects / name) for name in ["app", "app/src", "app/packages/ui"]
+    ]
+    assert filter_candidates(directories, {}) == [
+        str(projects / name) for name in ["app", "app/packages/ui"]
+    ]
+
+
+def test_filter_home_and_projects_dir_hide_nothing(projects, tmp_path, monkeypatch):
+    """Test that markers in home or projects_dir don't hide the projects below."""
+    home = tmp_path
+    monkeypatch.setenv("HOME", str(home))
+    (home / "package.json").write_text("{}")
+    (home / ".git").mkdir()
+    (projects / ".git").mkdir()
+    directories = [
+        str(path) for path in [home, projects, projects / "notes", projects / "app-web"]
+    ]
+    assert filter_candidates(directories, {"projects_dir": "~/code"}) == directories
+    # Without projects_dir, the repository in code still hides what isn't a root
+    assert filter_candidates(directories, {}) == directories[:2]
+
+
+def test_filter_options(projects):
+    """Test keeping subpaths and keeping only project roots."""
+    directories = [str(projects / name) for name in ["app", "app/src", "notes"]]
+    assert filter_candidates(directories, {"hide_subpaths": False}) == directories
+    assert filter_candidates(directories, {"roots_only": True}) == [
+        str(projects / "app")
+    ]
+
+
+def test_filter_cache_sees_changes(projects):
+    """Test that cached directory listings are refreshed when they change."""
+    new = projects / "new"
+    assert filter_candidates([str(new)], {}) == []
+    new.mkdir()
+    assert filter_candidates([str(new)], {}) == [str(new)]
@@ -0,0 +1,59 @@
+import io
+from unittest.mock import MagicMock
+
+from tmux_bro.control import ControlClient, quote
+
+
+def _client(output):
+    """Create a connected client that reads the given control mode output."""
+    client = ControlClient()
+    client.process = MagicMock()
+    client.process.stdin = io.BytesIO()
+    client.process.stdout = io.BytesIO(output.encode())
+    return client
+
+
+def test_quote_keeps_formats_and_variables_literal():
+    """Test that arguments reach tmux unexpanded."""
+    assert quote("#{session_id}") == "'#{session_id}'"
+    assert quote("it's $HOME") == '"it\'s \\$HOME"'
+
+
+def test_run_matches_pipelined_results_in_order():
+    """Test that blocks are matched to commands and notifications skipped."""
+    client = _client(
+        "%sessions-changed\n"
+        "%begin 1 10 0\n$1\n%end 1 10 0\n"
+        "%window-add @3\n"
+        "%begin 1 11 0\ncan't find session: nope\n%error 1 11 0\n"
+        "%begin 1 12 0\n%end 1 12 0\n"
+    )
+
+    ok, missing, empty = client.run(
+        [["display-message", "-p", "#{session_id}"], ["has-session", "-t", "=nope"]]
+        + [["set-option", "@tag", "a b"]]
+    )
+
+    assert client.process.stdin.getvalue() == (
+        b"'display-message' '-p' '#{session_id}'\n"
+        b"'has-session' '-t' '=nope'\n"
+        b"'set-option' '@tag' 'a b'\n"
+    )
+    assert (ok.stdout, ok.stderr) == (["$1"], [])
+    assert (missing.stdout, missing.stderr) == ([], ["can't find session: nope"])
+    assert (empty.stdout, empty.stderr) == ([], [])
+
+
+def test_switch_client_picks_most_recent_regular_client():
+    """Test that the control client itself is never switched."""
+    client = _client(
+        "%begin 1 1 0\n"
+        "300\t1\tclient-1\n200\t0\t/dev/pts/1\n100\t0\t/dev/pts/2\n"
+        "%end 1 1 0\n"
+        "%begin 1 2 0\n%end 1 2 0\n"
+    )
+
+    assert client.switch_client("proj")
+    assert client.process.stdin.getvalue().splitlines()[-1] == (
+        b"'switch-client' '-c' '/dev/pts/1' '-t' '=proj'"
+    )
@@ -0,0 +1,47 @@
+import threading
+from unittest.mock import patch
+
+from tmux_bro.tmux import detect_session_config
+
+
+def _detect(directory, timeout_ms, build=None, snapshot=None):
+    global_config = {"detection_timeout_ms": timeout_ms}
+    with patch("tmux_bro.tmux.load_global_config", return_value=global_config), patch(
+        "tmux_bro.tmux.build_session_config", side_effect=build
+    ), patch("tmux_bro.tmux.load_snapshot", return_value=snapshot):
+        return detect_session_config(directory)
+
+
+def test_detection_within_deadline_is_complete(tmp_path):
+    """Test that a fast detection is used as is."""
+    config = {"session_name": "proj", "windows": []}
+    assert _detect(str(tmp_path), 1000, build=lambda d: config) == (config, "detected")
+
+
+def test_slow_detection_falls_back_to_snapshot(tmp_path):
+    """Test that the last snapshot is used when detection hangs."""
+    hang = threading.Event()
+    snapshot = {"config": {"session_name": "proj", "windows": ["cached"]}}
+
+    config, source = _detect(
+        str(tmp_path), 10, build=lambda d: hang.wait(), snapshot=snapshot
+    )
+    hang.set()
+
+    assert (config, source) == (snapshot["config"], "snapshot")
+
+
+def test_slow_detection_without_snapshot_opens_single_window(tmp_path):
+    """Test that a plain editor and shell window is used without a snapshot."""
+    hang = threading.Event()
+    project = tmp_path / "proj"
+    project.mkdir()
+
+    config, source = _detect(str(project), 10, build=lambda d: hang.wait())
+    hang.set()
+
+    assert source == "fallback"
+    assert config["session_name"] == "proj"
+    [window] = config["windows"]
+    assert window["start_directory"] == str(project)
+    assert len(window["panes"]) == 2
@@ -0,0 +1,144 @@
+import json
+import os
+import sys
+
+import pytest
+
+from tmux_bro import detectors
+from tmux_bro.workspace import detect_workspace_type
+
+
+@pytest.fixture(autouse=True)
+def plugin_cache():
+    detectors.clear_plugin_cache()
+    yield
+    detectors.clear_plugin_cache()
+
+
+def test_detectors_only_run_for_their_markers(tmp_path, monkeypatch):
+    """Test that a detector whose markers are absent is never called."""
+    called = []
+    monkeypatch.setattr(
+        detectors,
+        "_builtin",
+        [
+            detectors.Detector("a", frozenset(["a.txt"]), called.append),
+            detectors.Detector("b", frozenset(["b.txt"]), lambda d: ["pkg"]),
+        ],
+    )
+    (tmp_path / "b.txt").write_text("")
+
+    assert detectors.run_detectors(str(tmp_path)) == ("b", ["pkg"])
+    assert called == []
+
+
+def test_go_workspace(tmp_path):
+    """Test that the modules of go.work use directives are found."""
+    for name in ("api", "cli", "tools/gen"):
+        (tmp_path / name).mkdir(parents=True)
+    (tmp_path / "go.work").write_text(
+        "go 1.22\n\n"
+        "use ./api // the server\n"
+        "use (\n"
+        "\t./cli\n"
+        '\t"./tools/gen"\n'
+        "\t./missing\n"
+        ")\n"
+    )
+
+    assert detect_workspace_type(str(tmp_path)) == (
+        "go",
+        [str(tmp_path / "api"), str(tmp_path / "cli"), str(tmp_path / "tools/gen")],
+    )
+
+
+def test_uv_workspace(tmp_path):
+    """Test that uv workspace members are expanded without excluded ones."""
+    for name in ("a", "b", "scratch"):
+        (tmp_path / "packages" / name).mkdir(parents=True)
+        (tmp_path / "packages" / name / "pyproject.toml").write_text("")
+    (tmp_path / "packages" / "docs").mkdir()
+    (tmp_path / "pyproject.toml").write_text(
+        "[project]\nname = 'root'\n\n"
+        "[tool.uv.workspace]\n"
+        "members = ['packages/*']\n"
+        "exclude = ['packages/scratch']\n"
+    )
+
+    assert detect_workspace_type(str(tmp_path)) == (
+        "uv",
+        [str(tmp_path / "packages/a"), str(tmp_path / "packages/b")],
+    )
+
+
+def test_plain_pyproject_is_not_a_workspace(tmp_path):
+    (tmp_path / "pyproject.toml").write_text("[project]\nname = 'single'\n")
+
+    assert detect_workspace_type(str(tmp_path)) is None
+
+
+def test_plugin_is_imported_only_when_its_marker_exists(tmp_path, monkeypatch):
+    """Test that an entry point detector's module is imported lazily."""
+    plugin_dir = tmp_path / "site"
+    plugin_dir.mkdir()
+    (plugin_dir / "bro_deno_plugin.py").write_text(
+        "def detect(directory):\n    return [directory + '/app']\n"
+    )
+    monkeypatch.syspath_prepend(str(plugin_dir))
+    monkeypatch.setattr(
+        detectors,
+        "_scan_entry_points",
+        lambda: [["deno:deno.json,deno.jsonc", "bro_deno_plugin:detect"]],
+    )
+    project = tmp_path / "project"
+    project.mkdir()
+    (project / "package.json").write_text(json.dumps({"name": "app"}))
+
+    assert detect_workspace_type(str(project)) is None
+    assert "bro_deno_plugin" not in sys.modules
+
+    (project / "deno.json").write_text("{}")
+    assert detect_workspace_type(str(project)) == ("deno", [f"{project}/app"])
+    assert "deno.json" in detectors.detector_markers()
+    monkeypatch.delitem(sys.modules, "bro_deno_plugin")
+
+
+def test_entry_points_are_cached(monkeypatch):
+    """Test that entry points are only scanned again when sys.path changes."""
+    scans = []
+    monkeypatch.setattr(detectors, "_scan_entry_points", lambda: scans.append(1) or [])
+
+    detectors._load_entry_points()
+    detectors._load_entry_points()
+
+    assert len(scans) == 1
+
+
+def test_entry_point_cache_is_rewritten_only_on_change(tmp_path, monkeypatch):
+    """Test that a sys.path change rescans but only rewrites for new entry points."""
+    site = tmp_path / "site"
+    site.mkdir()
+    monkeypatch.syspath_prepend(str(site))
+    found = [["deno:deno.json", "bro_deno_plugin:detect"]]
+    monkeypatch.setattr(detectors, "_scan_entry_points", lambda: list(found))
+    cache_path = detectors._get_entry_point_cache_path()
+
+    def install():
+        mtime = os.stat(cache_path).st_mtime_ns + 1
+        os.utime(str(site), ns=(mtime, mtime))
+
+    assert detectors._load_entry_points() == found
+    inode = os.stat(cache_path).st_ino
+
+    install()
+    assert detectors._load_entry_points() == found
+    assert os.stat(cache_path).st_ino == inode
+    # Checked against the new sys.path, so not scanned again
+    monkeypatch.setattr(detectors, "_scan_entry_points", lambda: 1 / 0)
+    assert detectors._load_entry_points() == found
+
+    install()
+    found.append(["bun:bun.lockb", "bro_bun_plugin:detect"])
+    monkeypatch.setattr(detectors, "_scan_entry_points", lambda: list(found))
+    assert detectors._load_entry_points() == found
+    assert os.stat(cache_path).st_ino != inode
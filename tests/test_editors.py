@@ -0,0 +1,100 @@
+import json
+import os
+import shlex
+import socket
+import subprocess
+from unittest.mock import patch
+
+import pytest
+
+from tmux_bro import editors
+from tmux_bro.editors import get_editor_socket, get_shared_editor
+from tmux_bro.tmux import build_session_config
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    root = tmp_path / "ws"
+    for name in ("a", "b", "c"):
+        (root / "packages" / name).mkdir(parents=True)
+    (root / "package.json").write_text(json.dumps({"workspaces": ["packages/*"]}))
+    return root
+
+
+def _build(directory, editor, global_config, window_dirs=None):
+    with patch.dict(os.environ, {"EDITOR": editor}), patch(
+        "tmux_bro.tmux.load_global_config", return_value=global_config
+    ):
+        return build_session_config(str(directory), window_dirs)
+
+
+def test_neovim_server_and_clients():
+    shared = get_shared_editor("nvim -u ~/.config/nvim/lite.lua", "my session")
+    socket = shlex.quote(get_editor_socket("my session"))
+
+    assert shared.server.endswith(
+        f"; nvim -u ~/.config/nvim/lite.lua --listen {socket}"
+    )
+    assert shlex.split(shared.client)[:2] == ["sh", "-c"]
+    assert f"--server {socket} --remote-ui" in shlex.split(shared.client)[2]
+
+
+def test_client_falls_back_to_own_editor_without_server(tmp_path, monkeypatch):
+    """Test that a client stops waiting for a server that never listens."""
+    monkeypatch.setattr(editors, "SERVER_WAIT_SECONDS", 0.2)
+    path = str(tmp_path / "socket")
+    command = editors._wait_for_socket(path, "echo client", "echo editor")
+
+    def run():
+        return subprocess.run(
+            command, shell=True, capture_output=True, text=True, timeout=5
+        ).stdout
+
+    assert run() == "editor\n"
+    server = socket.socket(socket.AF_UNIX)
+    server.bind(path)
+    try:
+        assert run() == "client\n"
+    finally:
+        server.close()
+
+
+def test_editors_without_server_mode_are_not_shared():
+    assert get_shared_editor("vim", "s") is None
+    assert get_shared_editor("code --wait", "s") is None
+
+
+def test_shared_editor_mode_runs_one_server(workspace):
+    """Test that the first window hosts the editor and the others connect."""
+    config = _build(workspace, "nvim", {"editor_mode": "shared"})
+    shared = get_shared_editor("nvim", config["session_name"])
+
+    editors = [window["panes"][0] for window in config["windows"]]
+    assert editors == [
+        {"shell_command": [{"cmd": shared.server}]},
+        {"shell_command": [{"cmd": shared.client}]},
+        {"shell_command": [{"cmd": shared.client}]},
+    ]
+
+
+def test_partial_build_keeps_server_in_first_window(workspace):
+    """Test that a window added by reconcile connects to the existing server."""
+    config = _build(
+        workspace,
+        "kak",
+        {"editor_mode": "shared"},
+        window_dirs={str(workspace / "packages" / "c")},
+    )
+    shared = get_shared_editor("kak", config["session_name"])
+
+    [window] = config["windows"]
+    assert window["panes"][0] == {"shell_command": [{"cmd": shared.client}]}
+
+
+def test_window_mode_and_fallback_keep_an_editor_per_window(workspace):
+    for editor, global_config in (("nvim", {}), ("vim", {"editor_mode": "shared"})):
+        config = _build(workspace, editor, global_config)
+        assert all(
+            window["panes"][0] == {"shell_command": [{"cmd": editor}]}
+            for window in config["windows"]
+        )
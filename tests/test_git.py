@@ -0,0 +1,82 @@
+import pytest
+
+from tmux_bro.git import discover_git_checkouts
+from tmux_bro.tmux import get_session_name
+
+
+def _add_worktree(repo, worktree):
+    """Lay out a linked worktree the way `git worktree add` does."""
+    admin_dir = repo / ".git" / "worktrees" / worktree.name
+    admin_dir.mkdir(parents=True)
+    (admin_dir / "gitdir").write_text(f"{worktree}/.git\n")
+    worktree.mkdir()
+    (worktree / ".git").write_text(f"gitdir: {admin_dir}\n")
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo_dir = tmp_path / "repo"
+    (repo_dir / ".git").mkdir(parents=True)
+    return repo_dir
+
+
+def test_discover_worktrees(tmp_path, repo):
+    """Test that linked worktrees of listed repositories are found."""
+    _add_worktree(repo, tmp_path / "repo-feature")
+    _add_worktree(repo, tmp_path / "hotfix")
+
+    found = discover_git_checkouts([str(repo), str(tmp_path / "repo-feature")])
+
+    # Worktrees already among the candidates are not repeated
+    assert found == [str(tmp_path / "hotfix")]
+
+
+def test_discover_submodules(repo):
+    """Test that initialized submodules listed in .gitmodules are found."""
+    (repo / ".gitmodules").write_text(
+        '[submodule "lib"]\n\tpath = vendor/lib\n\turl = ../lib\n'
+        '[submodule "missing"]\n\tpath = vendor/missing\n\turl = ../missing\n'
+    )
+    (repo / "vendor" / "lib").mkdir(parents=True)
+    (repo / "vendor" / "lib" / ".git").write_text("gitdir: ../../.git/modules/lib")
+
+    assert discover_git_checkouts([str(repo)]) == [str(repo / "vendor" / "lib")]
+
+
+def test_submodule_initialized_later_is_found(repo):
+    """Test that initializing a submodule invalidates the cached result."""
+    (repo / ".gitmodules").write_text(
+        '[submodule "lib"]\n\tpath = vendor/lib\n\turl = ../lib\n'
+    )
+    assert discover_git_checkouts([str(repo)]) == []
+
+    # What `git submodule update --init` leaves behind
+    (repo / ".git" / "modules" / "lib").mkdir(parents=True)
+    (repo / "vendor" / "lib").mkdir(parents=True)
+    (repo / "vendor" / "lib" / ".git").write_text("gitdir: ../../.git/modules/lib")
+
+    assert discover_git_checkouts([str(repo)]) == [str(repo / "vendor" / "lib")]
+
+
+def test_discover_uses_cache_until_worktrees_change(tmp_path, repo):
+    """Test that cached results are reused until the worktrees dir changes."""
+    _add_worktree(repo, tmp_path / "one")
+    assert discover_git_checkouts([str(repo)]) == [str(tmp_path / "one")]
+
+    # Editing an existing entry doesn't touch the worktrees dir mtime, so the
+    # cached result is returned
+    (repo / ".git" / "worktrees" / "one" / "gitdir").write_text("/elsewhere/.git")
+    assert discover_git_checkouts([str(repo)]) == [str(tmp_path / "one")]
+
+    _add_worktree(repo, tmp_path / "two")
+    assert discover_git_checkouts([str(repo)]) == ["/elsewhere", str(tmp_path / "two")]
+
+
+def test_worktree_session_name(tmp_path, repo):
+    """Test that worktrees get their own session name prefixed by the repo."""
+    _add_worktree(repo, tmp_path / "feature")
+    _add_worktree(repo, tmp_path / "repo-hotfix")
+
+    assert get_session_name(str(repo)) == "repo"
+    assert get_session_name(str(tmp_path / "feature")) == "repo-feature"
+    assert get_session_name(str(tmp_path / "repo-hotfix")) == "repo-hotfix"
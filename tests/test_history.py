@@ -0,0 +1,60 @@
+from tmux_bro import history
+from tmux_bro.history import (
+    PhaseTimer,
+    append_history,
+    format_stats,
+    percentile,
+    read_history,
+    summarize,
+)
+
+
+def test_phase_timer_accumulates_phases():
+    """Test that repeated phases add up."""
+    timer = PhaseTimer()
+    for _ in range(2):
+        with timer.phase("detect"):
+            pass
+    assert list(timer.phases) == ["detect"]
+    assert timer.total() == timer.phases["detect"]
+
+
+def test_history_is_rotated_and_read_oldest_first(monkeypatch):
+    """Test that a full log is rotated and both files are read."""
+    monkeypatch.setattr(history, "MAX_HISTORY_BYTES", 50)
+    for i in range(6):
+        append_history({"path": f"/p{i}", "total": i})
+
+    assert [record["path"] for record in read_history()] == ["/p2", "/p3", "/p4", "/p5"]
+
+
+def test_percentile():
+    """Test nearest-rank percentiles."""
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile(values, 100) == 100
+    assert percentile(values, 0) == 1
+    assert percentile([1, 2, 3, 4, 5], 50) == 3
+    assert percentile([1, 2, 3, 4, 5], 90) == 5
+    assert percentile([1, 2, 3], 50) == 2
+    assert percentile([1, 2], 50) == 1
+    assert percentile([1, 2], 99) == 2
+    assert percentile([7], 90) == 7
+
+
+def test_stats_report_phases_sources_and_slowest_projects():
+    """Test the stats report over a few records."""
+    records = [
+        {"path": "/fast", "source": "speculated", "phases": {"detect": 1}, "total": 5},
+        {"path": "/slow", "source": "detected", "phases": {"detect": 90}, "total": 200},
+        {"path": "/slow", "source": "detected", "phases": {"detect": 80}, "total": 150},
+    ]
+
+    lines = format_stats(summarize(records))
+
+    assert lines[0] == "3 invocations"
+    assert any(line.startswith("detect") for line in lines)
+    assert "  detected         2 (67%)" in lines
+    slowest = lines[lines.index("slowest projects (median total ms, opens):") + 1]
+    assert slowest.endswith("/slow")
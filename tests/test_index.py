@@ -0,0 +1,143 @@
+import os
+
+import pytest
+
+from tmux_bro import fuzzy
+from tmux_bro.index import (
+    FLAG_SESSION,
+    FLAG_SINGLE,
+    FLAG_WORKSPACE,
+    TYPE_FLAGS,
+    CandidateIndex,
+)
+
+
+@pytest.fixture
+def index(tmp_path):
+    return CandidateIndex(str(tmp_path / "index"))
+
+
+def read_written(index):
+    read_fd, write_fd = os.pipe()
+    try:
+        index.write_to(write_fd)
+    finally:
+        os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as f:
+        return f.read()
+
+
+def test_empty_index(index):
+    """Test that a missing index has no candidates."""
+    assert index.paths() == []
+    assert read_written(index) == b""
+    assert index.flags("/a") == 0
+
+
+def test_update_appends_and_skips_removed(index):
+    """Test that updates append new paths and drop removed ones from output."""
+    assert index.update(["/a", "/b", "/c"]) == ["/a", "/b", "/c"]
+    assert index.update(["/a", "/c", "/d"]) == ["/d"]
+
+    # The removed entry is only flagged, the new one appended
+    assert index.count == 4
+    assert index.paths() == ["/a", "/c", "/d"]
+    assert read_written(index) == b"/a\n/c\n/d\n"
+    assert read_written(CandidateIndex(index.directory)) == b"/a\n/c\n/d\n"
+
+
+def test_update_keeps_ranking_without_rewrite(index):
+    """Test that a new order is kept in the rank, not by rewriting the index."""
+    index.update(["/a", "/b", "/c"])
+    with open(index.blob_path, "rb") as f:
+        blob = f.read()
+
+    assert index.update(["/d", "/c", "/a"]) == ["/d"]
+    assert index.paths() == ["/d", "/c", "/a"]
+    assert read_written(index) == b"/d\n/c\n/a\n"
+    # Only the new path was appended to the blob
+    with open(index.blob_path, "rb") as f:
+        assert f.read() == blob + b"/d\n"
+    assert CandidateIndex(index.directory).paths() == ["/d", "/c", "/a"]
+
+
+def test_write_to_handles_partial_writes(index, tmp_path, monkeypatch):
+    """Test that many ranked runs are written whole, however writev splits them."""
+    paths = ["/project/%d" % i for i in range(3000)]
+    index.update(paths)
+    index.update(paths[::-1])
+    # Write no more than a few bytes at a time, across slices
+    monkeypatch.setattr(
+        "tmux_bro.index.os.writev",
+        lambda fd, buffers: os.write(fd, b"".join(buffers[:3])[:7]),
+    )
+
+    out = tmp_path / "out"
+    with open(str(out), "wb") as f:
+        index.write_to(f.fileno())
+    assert out.read_bytes() == "".join(p + "\n" for p in paths[::-1]).encode()
+
+
+def test_stale_rank_is_ignored(index):
+    """Test that a rank written for other entries falls back to entry order."""
+    index.update(["/a", "/b"])
+    index.update(["/b", "/a"])
+    with open(index.rank_path, "rb") as f:
+        rank = f.read()
+    index.update(["/a", "/b", "/c"])
+    with open(index.rank_path, "wb") as f:
+        f.write(rank)
+
+    assert CandidateIndex(index.directory).paths() == ["/a", "/b", "/c"]
+
+
+def test_update_compacts_deleted_entries(index):
+    """Test that the index is rewritten once mostly deleted entries."""
+    index.update([f"/p{i}" for i in range(10)])
+    index.update(["/p0"])
+    assert index.count == 1
+    assert index.paths() == ["/p0"]
+
+
+def test_flags_survive_updates(index):
+    """Test that flags are kept across appends and rewrites."""
+    index.update(["/a", "/b"])
+    index.set_flags("/b", FLAG_SESSION | FLAG_SINGLE)
+    index.update(["/a", "/b", "/c"])
+    index.update(["/b", "/a"])
+    assert index.flags("/b") == FLAG_SESSION | FLAG_SINGLE
+
+    index.set_flags("/b", FLAG_WORKSPACE, TYPE_FLAGS)
+    assert CandidateIndex(index.directory).flags("/b") == (
+        FLAG_SESSION | FLAG_WORKSPACE
+    )
+    assert index.paths(exclude_flags=TYPE_FLAGS) == ["/a"]
+
+
+def test_flags_match_whole_paths(index):
+    """Test that a path is not found as part of another one."""
+    index.update(["/ab", "/b"])
+    index.set_flags("/b", FLAG_SESSION)
+    assert index.flags("/ab") == 0
+    assert index.flags("b") == 0
+    assert index.flags("/b") == FLAG_SESSION
+
+
+def test_mismatched_files_are_ignored(index):
+    """Test that entries pointing into another blob are not used."""
+    index.update(["/a"])
+    with open(index.blob_path, "r+b") as f:
+        f.write(b"\0" * 8)
+    assert CandidateIndex(index.directory).paths() == []
+
+
+def test_feed_candidates_streams_new_paths(index, monkeypatch):
+    """Test that cached candidates come first and new ones follow."""
+    index.update(["/a", "/b"])
+    monkeypatch.setattr(fuzzy, "get_candidates", lambda config: ["/a", "/b", "/c"])
+
+    read_fd, write_fd = os.pipe()
+    fuzzy.feed_candidates(index, {}, os.fdopen(write_fd, "wb"))
+    with os.fdopen(read_fd, "rb") as f:
+        assert f.read() == b"/a\n/b\n/c\n"
+    assert index.paths() == ["/a", "/b", "/c"]
@@ -0,0 +1,55 @@
+import pytest
+
+from tmux_bro.layout import layout_checksum, layout_string
+
+# Strings from tmux 3.3a's select-layout for an 80x24 window of three panes
+# with ids 0, 1 and 2
+
+
+@pytest.mark.parametrize(
+    "layout, options, expected",
+    [
+        (
+            "main-vertical",
+            {"main-pane-width": "50%"},
+            "80x24,0,0{39x24,0,0,0,40x24,40,0[40x11,40,0,1,40x12,40,12,2]}",
+        ),
+        (
+            "main-horizontal",
+            {"main-pane-height": "30%"},
+            "80x24,0,0[80x6,0,0,0,80x17,0,7{39x17,0,7,1,40x17,40,7,2}]",
+        ),
+        (
+            "main-vertical",
+            {"main-pane-width": "100"},
+            "80x24,0,0{78x24,0,0,0,1x24,79,0[1x11,79,0,1,1x12,79,12,2]}",
+        ),
+        (
+            "tiled",
+            {},
+            "80x24,0,0[80x11,0,0{39x11,0,0,0,40x11,40,0,1},80x12,0,12,2]",
+        ),
+        (
+            "even-horizontal",
+            {},
+            "80x24,0,0{26x24,0,0,0,26x24,27,0,1,26x24,54,0,2}",
+        ),
+    ],
+)
+def test_layout_string_matches_tmux(layout, options, expected):
+    assert layout_string(layout, 3, 80, 24, options) == (
+        f"{layout_checksum(expected)},{expected}"
+    )
+
+
+def test_layout_checksum():
+    """Test the checksum against a layout string printed by tmux."""
+    body = "80x24,0,0{39x24,0,0,2,40x24,40,0[40x11,40,0,3,40x12,40,12,4]}"
+    assert layout_checksum(body) == "2e5f"
+
+
+def test_layout_string_without_preset_or_room():
+    """Test that layouts tmux would have to clip are left to tmux."""
+    assert layout_string("custom", 3, 80, 24) is None
+    assert layout_string("even-vertical", 6, 30, 10) is None
+    assert layout_string("main-vertical", 1, 80, 24) == "b25d,80x24,0,0,0"
@@ -0,0 +1,62 @@
+import os
+import subprocess
+from unittest.mock import patch
+
+import pytest
+
+from tmux_bro.limits import get_dev_limits, parse_size, wrap_dev_command
+
+
+def test_dev_limits_are_merged_per_key():
+    """Test that package limits override project ones, which override global."""
+    global_config = {"dev_limits": {"nice": 5, "memory": "4G"}}
+    project_config = {
+        "dev_limits": {"memory": "2G"},
+        "packages": {"web": {"dev_limits": {"cpu": "150%"}}},
+    }
+
+    assert get_dev_limits(global_config, project_config) == {
+        "nice": 5,
+        "memory": "2G",
+    }
+    assert get_dev_limits(global_config, project_config, "web") == {
+        "nice": 5,
+        "memory": "2G",
+        "cpu": "150%",
+    }
+
+
+def test_parse_size():
+    """Test parsing memory sizes."""
+    assert parse_size("512M") == 512 * 1024**2
+    assert parse_size("2GiB") == 2 * 1024**3
+    assert parse_size(4096) == 4096
+    with pytest.raises(ValueError):
+        parse_size("lots")
+
+
+def test_limits_use_systemd_scope_when_available():
+    """Test that memory and CPU limits go to a transient cgroup scope."""
+    with patch("tmux_bro.limits.has_user_systemd", return_value=True):
+        cmd = wrap_dev_command("pnpm dev", {"memory": "1G", "cpu": 1.5, "nice": 10})
+
+    assert cmd == (
+        "systemd-run --user --scope --quiet --collect "
+        "-p MemoryMax=1073741824 -p CPUQuota=150% nice -n 10 sh -c 'pnpm dev'"
+    )
+
+
+def test_limits_fall_back_to_ulimit_and_nice():
+    """Test the fallback without systemd by running the wrapped command."""
+    with patch("tmux_bro.limits.has_user_systemd", return_value=False):
+        cmd = wrap_dev_command(
+            "echo $(nice) $(ulimit -d)", {"memory": "512M", "cpu": 2, "nice": 7}
+        )
+
+    output = subprocess.run(["sh", "-c", cmd], capture_output=True, text=True)
+    assert output.stdout.split() == [str(os.nice(0) + 7), "524288"]
+
+
+def test_no_limits_leave_command_alone():
+    """Test that commands without limits are not wrapped."""
+    assert wrap_dev_command("npm run dev", {}) == "npm run dev"
@@ -0,0 +1,92 @@
+import gzip
+import os
+import subprocess
+from unittest.mock import MagicMock, patch
+
+from tmuxp.workspace.builder import WorkspaceBuilder
+
+from tmux_bro.logs import get_log_command
+from tmux_bro.tmux import SessionBuilder, _apply_pane_settings
+
+
+def write_through(path, data, max_bytes, keep, compress=False):
+    options = {"max_size": max_bytes, "keep": keep, "compress": compress}
+    with patch("tmux_bro.logs.get_log_path", return_value=str(path)):
+        command = get_log_command("ws", "a", options)
+    # tmux runs pipe-pane commands with sh -c
+    subprocess.run(["sh", "-c", command], input=data, check=True)
+
+
+def test_log_is_rotated_at_max_size(tmp_path):
+    """Test that a log past max_size is rotated and only keep old logs kept."""
+    path = tmp_path / "ws" / "a" / "dev.log"
+    for data in (b"a" * 50, b"b" * 60, b"c" * 150, b"d" * 120):
+        write_through(path, data, 100, 2)
+
+    assert sorted(os.listdir(path.parent)) == ["dev.log", "dev.log.1", "dev.log.2"]
+    assert path.read_bytes() == b""
+    assert (path.parent / "dev.log.1").read_bytes() == b"d" * 120
+    assert (path.parent / "dev.log.2").read_bytes() == b"c" * 150
+
+
+def test_rotated_logs_are_compressed(tmp_path):
+    """Test that rotated logs are gzipped with compress set."""
+    path = tmp_path / "dev.log"
+    write_through(path, b"a" * 100, 100, 3, compress=True)
+    write_through(path, b"b" * 10, 100, 3, compress=True)
+
+    with gzip.open(tmp_path / "dev.log.1.gz") as f:
+        assert f.read() == b"a" * 100
+    assert path.read_bytes() == b"b" * 10
+
+
+def test_pane_settings():
+    """Test that history limits go by role and only dev panes are logged."""
+    window = {"window_name": "a", "panes": [{}, {}, {}]}
+    config = {"session_name": "ws", "windows": [window]}
+    _apply_pane_settings(
+        config,
+        {"history_limit": {"dev": 500, "shell": 10000}, "dev_log": True},
+        {"history_limit": {"shell": 20000}},
+    )
+
+    editor, dev, shell = window["panes"]
+    assert "history_limit" not in editor
+    assert dev["history_limit"] == 500
+    assert shell["history_limit"] == 20000
+    assert "log_command" not in editor and "log_command" not in shell
+    assert os.path.join("ws", "a", "dev.log") in dev["log_command"]
+
+
+def test_panes_without_history_limit_get_the_global_one():
+    """Test that only panes with a history_limit are created with it."""
+    builder = SessionBuilder.__new__(SessionBuilder)
+    builder.server = MagicMock()
+    builder._session = MagicMock(session_id="$1")
+    builder._history_limit = None
+    builder._layouts = {}
+    windows = [
+        {"window_name": name, "panes": [{"shell_command": []} for _ in range(3)]}
+        for name in ("a", "b")
+    ]
+    builder.session_config = {"session_name": "ws", "windows": windows}
+    _apply_pane_settings(builder.session_config, {"history_limit": {"dev": 500}}, {})
+    created = []
+
+    def create_windows(self, session, append=False):
+        for window_config in self.session_config["windows"]:
+            created.append(self._history_limit)
+            yield MagicMock(window_id=window_config["window_name"]), window_config
+
+    def create_panes(self, window, window_config):
+        yield MagicMock(), window_config["panes"][0]
+        for pane_config in window_config["panes"][1:]:
+            created.append(self._history_limit)
+            yield MagicMock(), pane_config
+
+    with patch.object(WorkspaceBuilder, "iter_create_windows", create_windows):
+        with patch.object(WorkspaceBuilder, "iter_create_panes", create_panes):
+            for window, window_config in builder.iter_create_windows(None):
+                list(builder.iter_create_panes(window, window_config))
+
+    assert created == [None, 500, None, None, 500, None]
@@ -0,0 +1,48 @@
+import glob
+import json
+import os
+
+import pytest
+import toml
+
+from tmux_bro.manifest import read_json_keys, read_toml_keys, read_yaml
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "manifests")
+
+
+@pytest.mark.parametrize(
+    "path", sorted(glob.glob(os.path.join(FIXTURES, "*.package.json")))
+)
+def test_json_keys_match_full_parse(path):
+    """Test that targeted reads agree with parsing the whole manifest."""
+    with open(path) as f:
+        full = json.load(f)
+
+    workspaces = read_json_keys(path, ["workspaces"])
+    assert workspaces.get("workspaces") == full.get("workspaces")
+    scripts = read_json_keys(path, ["scripts"], ["dev"])
+    assert ("dev" in scripts.get("scripts", {})) == ("dev" in full.get("scripts", {}))
+
+
+@pytest.mark.parametrize("path", sorted(glob.glob(os.path.join(FIXTURES, "*.toml"))))
+def test_toml_keys_match_full_parse(path):
+    """Test that targeted reads agree with parsing the whole manifest."""
+    full = toml.load(path)
+    assert read_toml_keys(path, ["workspace"]).get("workspace") == full.get("workspace")
+
+
+def test_manifests_are_not_parsed_without_the_keys(tmp_path):
+    """Test that files without the needed keys aren't parsed at all."""
+    path = tmp_path / "package.json"
+    path.write_text('{"name": "x", "scripts": {"build": "tsc"}, broken')
+    assert read_json_keys(str(path), ["workspaces"]) == {}
+    assert read_json_keys(str(path), ["scripts"], ["dev"]) == {}
+    # Invalid files are reported once they have to be parsed
+    assert read_json_keys(str(path), ["scripts"]) is None
+    assert read_json_keys(str(tmp_path / "missing.json"), ["scripts"]) is None
+
+
+def test_read_yaml():
+    """Test reading a pnpm workspace file."""
+    config = read_yaml(os.path.join(FIXTURES, "pnpm-workspace.yaml"))
+    assert config["packages"] == ["apps/*", "packages/*", "!**/test/**"]
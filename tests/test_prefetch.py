@@ -0,0 +1,46 @@
+from unittest.mock import MagicMock, patch
+
+from tmux_bro.prefetch import PLACEHOLDER_SESSION, Prefetcher
+
+
+def _prefetch(connects, tmux_ok=True):
+    prefetcher = Prefetcher()
+    prefetcher.client = MagicMock(process=None)
+    prefetcher.client.connect.side_effect = connects
+    with patch("tmux_bro.prefetch.subprocess.run") as run:
+        run.return_value.returncode = 0 if tmux_ok else 1
+        prefetcher.start()
+        runner = prefetcher.wait()
+    return prefetcher, runner, run
+
+
+def test_running_server_is_not_started_again():
+    """Test that only the client connects when the server has sessions."""
+    prefetcher, runner, run = _prefetch([True])
+
+    assert runner is prefetcher.client
+    assert not prefetcher.placeholder
+    run.assert_not_called()
+
+
+def test_server_is_started_and_placeholder_released():
+    """Test that a placeholder holds a started server until it is released."""
+    prefetcher, runner, run = _prefetch([False, True])
+
+    assert runner is prefetcher.client
+    assert run.call_args[0][0][1:5] == ["new-session", "-d", "-s", PLACEHOLDER_SESSION]
+
+    prefetcher.client.process = MagicMock()
+    prefetcher.release()
+    prefetcher.release()
+
+    prefetcher.client.cmd.assert_called_once_with(
+        "kill-session", "-t", f"={PLACEHOLDER_SESSION}"
+    )
+
+
+def test_no_client_without_tmux():
+    prefetcher, runner, _ = _prefetch([False], tmux_ok=False)
+
+    assert runner is None
+    assert not prefetcher.placeholder
@@ -0,0 +1,83 @@
+import json
+import os
+import shlex
+import subprocess
+import threading
+
+import yaml
+
+from tmux_bro import preview
+from tmux_bro.preview import (
+    describe,
+    fill_preview_records,
+    get_preview_command,
+    is_preview_fresh,
+    write_preview_record,
+)
+
+
+def _run_preview(directory):
+    # fzf replaces {} with the single-quoted candidate
+    command = get_preview_command().replace("{}", shlex.quote(directory))
+    return subprocess.run(
+        ["/bin/sh", "-c", command], capture_output=True, text=True
+    ).stdout
+
+
+def test_describe_workspace(tmp_path):
+    """Test the preview record of a pnpm workspace."""
+    workspace_dir = tmp_path / "my workspace"
+    workspace_dir.mkdir()
+    (workspace_dir / "pnpm-workspace.yaml").write_text(
+        yaml.dump({"packages": ["packages/*"]})
+    )
+    (workspace_dir / "pnpm-lock.yaml").write_text("")
+    for name, scripts in [("pkg1", {"dev": "vite"}), ("pkg2", {})]:
+        (workspace_dir / "packages" / name).mkdir(parents=True)
+        (workspace_dir / "packages" / name / "package.json").write_text(
+            json.dumps({"scripts": scripts})
+        )
+
+    assert describe(str(workspace_dir)) == [
+        "my workspace",
+        "type: pnpm workspace",
+        "packages: 2",
+        "dev scripts: 1 of 2 packages",
+        "package manager: pnpm",
+    ]
+
+
+def test_preview_command_reads_record(tmp_path, monkeypatch):
+    """Test that the shell preview command shows a written record."""
+    monkeypatch.setattr(
+        preview, "get_session_name", lambda d: "tmux-bro-test-no-such-session"
+    )
+    project_dir = tmp_path / "it's a project"
+    project_dir.mkdir()
+    write_preview_record(str(project_dir))
+
+    assert _run_preview(str(project_dir)) == (
+        "type: single project\ndev script: no\npackage manager: unknown\n"
+        "session: not running\n"
+    )
+    assert _run_preview(str(tmp_path / "other")) == "not analyzed yet\n"
+
+
+def test_stale_records_are_recomputed(tmp_path):
+    """Test that a record is recomputed once a manifest it was built from changes."""
+    project_dir = tmp_path / "project"
+    project_dir.mkdir()
+    package_json = project_dir / "package.json"
+    package_json.write_text(json.dumps({"scripts": {}}))
+    write_preview_record(str(project_dir))
+    assert is_preview_fresh(str(project_dir))
+    assert "dev script: no" in _run_preview(str(project_dir))
+
+    package_json.write_text(json.dumps({"scripts": {"dev": "vite"}}))
+    mtime = os.stat(str(package_json)).st_mtime + 1
+    os.utime(str(package_json), (mtime, mtime))
+    assert not is_preview_fresh(str(project_dir))
+
+    fill_preview_records([str(project_dir)], threading.Event())
+    assert is_preview_fresh(str(project_dir))
+    assert "dev script: yes" in _run_preview(str(project_dir))
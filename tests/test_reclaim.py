@@ -0,0 +1,87 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from tmux_bro.reclaim import find_idle_sessions, reclaim_session
+from tmux_bro.units import parse_duration
+
+NOW = 1_000_000
+
+# pid -> parent pid: pane shells 10, 11, 12 of session $1 and 20 of $2
+PARENTS = {10: 1, 11: 1, 12: 1, 110: 11, 111: 110, 20: 1}
+RSS = {10: 5, 11: 5, 12: 5, 110: 100, 111: 300, 20: 7}
+
+
+def _server(sessions, panes):
+    server = MagicMock()
+
+    def cmd(name, *args):
+        result = MagicMock()
+        result.stdout = sessions if name == "list-sessions" else panes
+        return result
+
+    server.cmd.side_effect = cmd
+    return server
+
+
+def _find(mode, idle=3600):
+    server = _server(
+        [
+            f"$1\t0\t{NOW - 7200}\t{NOW - 9000}\t/ws\tws",
+            f"$2\t0\t{NOW - 7200}\t0\t/other\tother",
+            f"$3\t1\t{NOW - 7200}\t0\t/attached\tattached",
+            f"$4\t0\t{NOW - 7200}\t0\t\tnot-tmux-bro",
+        ],
+        [
+            "$1\t10\teditor",
+            "$1\t11\tdev",
+            "$1\t12\tshell",
+            "$2\t20\teditor",
+        ],
+    )
+    with patch("tmux_bro.reclaim.read_process_table", return_value=PARENTS), patch(
+        "tmux_bro.reclaim.process_rss", side_effect=RSS.get
+    ), patch("tmux_bro.reclaim.process_cpu_time", return_value=1.0):
+        return server, find_idle_sessions(server, idle, mode, now=NOW)
+
+
+def test_parse_duration():
+    """Test parsing idle thresholds."""
+    assert parse_duration("90m") == 5400
+    assert parse_duration("3d") == 259200
+    assert parse_duration("30") == 30
+    with pytest.raises(ValueError):
+        parse_duration("soon")
+
+
+def test_stop_dev_targets_only_dev_pane_children():
+    """Test that the dev pane's shell and other panes are left running."""
+    _, candidates = _find("stop-dev")
+
+    [candidate] = candidates
+    assert candidate["name"] == "ws"
+    assert candidate["targets"] == [110, 111]
+    assert (candidate["reclaim"], candidate["rss"]) == (400, 415)
+    assert candidate["cpu"] == 5.0
+
+
+def test_kill_mode_is_sorted_by_memory_reclaimed():
+    """Test that whole sessions are candidates, biggest first."""
+    _, candidates = _find("kill")
+    assert [c["name"] for c in candidates] == ["ws", "other"]
+
+
+def test_recently_used_sessions_are_kept():
+    """Test that sessions used within the threshold are not candidates."""
+    _, candidates = _find("kill", idle=86400)
+    assert candidates == []
+
+
+def test_kill_removes_session_and_snapshot():
+    """Test that killed sessions are not restored later."""
+    server, [candidate, _] = _find("kill")
+    with patch("tmux_bro.reclaim.remove_snapshot") as remove_snapshot:
+        reclaim_session(server, candidate, "kill")
+
+    server.cmd.assert_called_with("kill-session", "-t", "$1")
+    remove_snapshot.assert_called_once_with("/ws")
@@ -0,0 +1,114 @@
+from unittest.mock import MagicMock, patch
+
+from tmux_bro.tmux import (
+    FALLBACK_TAG,
+    _get_fallback_session_config,
+    _tag_commands,
+    build_session_config,
+    pane_roles,
+    reconcile_tmux_session,
+    replace_fallback_windows,
+)
+
+
+def _window(path):
+    return {"start_directory": path, "panes": []}
+
+
+def _make_session(windows, tagged=True):
+    """Create a fake libtmux session whose windows are tagged with paths."""
+    session = MagicMock(session_id="$1")
+
+    def cmd(name, *args):
+        result = MagicMock()
+        if name == "show-options":
+            result.stdout = ["/ws"] if tagged else []
+        elif name == "list-windows":
+            result.stdout = [f"{window_id}\t{path}" for window_id, path in windows]
+        elif name == "list-panes":
+            result.stdout = [f"{window_id}\t%0" for window_id, _ in windows]
+        return result
+
+    session.server.cmd.side_effect = cmd
+    return session
+
+
+def test_reconcile_adds_missing_and_removes_stale_windows():
+    """Test that only windows for new packages are built and stale ones closed."""
+    session = _make_session([("@1", "/ws/a"), ("@2", "/ws/old"), ("@3", "")])
+    config = {
+        "session_name": "ws",
+        "windows": [_window("/ws/a"), _window("/ws/b")],
+    }
+
+    with patch("tmux_bro.tmux.SessionBuilder") as builder:
+        added, removed = reconcile_tmux_session(session, config, remove=True)
+
+    assert (added, removed) == (1, 1)
+    assert builder.call_args.kwargs["session_config"]["windows"] == [_window("/ws/b")]
+    builder.return_value.build.assert_called_once_with(session=session, append=True)
+    session.server.cmd.assert_any_call("kill-window", "-t", "@2")
+
+
+def test_reconcile_ignores_sessions_not_created_by_tmux_bro():
+    """Test that untagged sessions are left alone."""
+    session = _make_session([("@1", "")], tagged=False)
+    config = {"session_name": "ws", "windows": [_window("/ws/a")]}
+
+    with patch("tmux_bro.tmux.SessionBuilder") as builder:
+        assert reconcile_tmux_session(session, config, remove=True) == (0, 0)
+
+    builder.assert_not_called()
+
+
+def test_fallback_windows_are_replaced(tmp_path):
+    """
+    Test that a single-directory project opened from the fallback config gets
+    its stand-in window rebuilt from the detected config.
+    """
+    project = tmp_path / "project"
+    project.mkdir()
+    (project / "package.json").write_text('{"scripts": {"dev": "vite"}}')
+    (project / ".venv" / "bin").mkdir(parents=True)
+    (project / ".venv" / "bin" / "activate").write_text("")
+
+    with patch("tmux_bro.tmux.load_global_config", return_value={}):
+        fallback = _get_fallback_session_config(str(project), "project")
+        config = build_session_config(str(project))
+    # The stand-in window is tagged when it's built
+    tags = _tag_commands(["@1"], {"@1": ["%1", "%2"]}, fallback["windows"])
+    assert ["set-option", "-w", "-t", "@1", FALLBACK_TAG, "1"] in tags
+    assert config["windows"][0]["start_directory"] == str(project)
+
+    windows = [["@1", "1", str(project), "1"]]
+    session = MagicMock(session_id="$1")
+
+    def cmd(name, *args):
+        result = MagicMock(stdout=[])
+        if name == "show-options":
+            result.stdout = [str(project)]
+        elif name == "list-windows":
+            result.stdout = ["\t".join(window) for window in windows]
+            if FALLBACK_TAG not in args[-1]:
+                result.stdout = [f"{w[0]}\t{w[2]}" for w in windows]
+        elif name == "set-option" and "-u" in args:
+            windows[0][2] = ""
+        return result
+
+    session.server.cmd.side_effect = cmd
+
+    def build(session, append):
+        windows.append(["@2", "0", str(project), ""])
+
+    with patch("tmux_bro.tmux.SessionBuilder") as builder:
+        builder.return_value.build.side_effect = build
+        assert replace_fallback_windows(session, config) == 1
+
+    built = builder.call_args.kwargs["session_config"]["windows"]
+    assert built == config["windows"]
+    assert built[0]["environment"] == {"VIRTUAL_ENV": str(project / ".venv")}
+    assert pane_roles(built[0]) == ["editor", "dev", "shell"]
+    calls = [c.args for c in session.server.cmd.call_args_list]
+    assert calls.index(("select-window", "-t", "@2")) < calls.index(
+        ("kill-window", "-t", "@1")
+    )
@@ -0,0 +1,99 @@
+import json
+import os
+import shlex
+import subprocess
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from tmux_bro.snapshot import (
+    get_closed_hook,
+    is_snapshot_valid,
+    load_live_sessions,
+    load_snapshot,
+    load_snapshots,
+    mark_session_live,
+    save_snapshot,
+)
+from tmux_bro.tmux import restore_tmux_sessions
+
+
+@pytest.fixture
+def project(tmp_path):
+    project_dir = tmp_path / "project"
+    (project_dir / "packages" / "pkg1").mkdir(parents=True)
+    (project_dir / "package.json").write_text(
+        json.dumps({"workspaces": ["packages/*"]})
+    )
+    (project_dir / "packages" / "pkg1" / "package.json").write_text("{}")
+    return project_dir
+
+
+def _config(project_dir):
+    return {
+        "session_name": "project",
+        "windows": [{"start_directory": str(project_dir / "packages" / "pkg1")}],
+    }
+
+
+def test_snapshot_round_trip(project):
+    """Test that a saved snapshot can be loaded and is valid."""
+    save_snapshot(str(project), _config(project))
+
+    snapshot = load_snapshot(str(project))
+    assert snapshot["directory"] == str(project)
+    assert snapshot["config"] == _config(project)
+    assert is_snapshot_valid(snapshot)
+    assert load_snapshots() == [snapshot]
+
+
+def test_snapshot_invalidated_by_manifest_change(project):
+    """Test that changing a recorded manifest invalidates the snapshot."""
+    save_snapshot(str(project), _config(project))
+
+    manifest = project / "packages" / "pkg1" / "package.json"
+    stat = manifest.stat()
+    os.utime(manifest, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert not is_snapshot_valid(load_snapshot(str(project)))
+
+
+def test_snapshot_invalidated_by_new_manifest(project):
+    """Test that creating a manifest that didn't exist invalidates the snapshot."""
+    save_snapshot(str(project), _config(project))
+
+    (project / ".tmux-bro.yaml").write_text("layout: tiled")
+
+    assert not is_snapshot_valid(load_snapshot(str(project)))
+
+
+def _run_closed_hook(session_name):
+    # tmux expands the format and runs the command given to run-shell
+    hook = get_closed_hook().replace(
+        "#{q:hook_session_name}", shlex.quote(session_name)
+    )
+    command = shlex.split(hook)[-1]
+    subprocess.run(["/bin/sh", "-c", command], check=True)
+
+
+def test_closed_sessions_are_not_restored(tmp_path):
+    """Test that only the sessions alive when the server went away are restored."""
+    directories = {}
+    for name in ["kept", "closed", "it's open"]:
+        directories[name] = tmp_path / name
+        directories[name].mkdir()
+        config = {"session_name": name, "windows": []}
+        save_snapshot(str(directories[name]), config)
+        mark_session_live(name, str(directories[name]))
+    _run_closed_hook("closed")
+    assert [name for name, _ in load_live_sessions()] == ["it's open", "kept"]
+
+    with patch("tmux_bro.tmux.Server") as server, patch(
+        "tmux_bro.tmux.build_tmux_session"
+    ) as build:
+        server.return_value.sessions = [MagicMock()]
+        server.return_value.sessions[0].name = "it's open"
+        restored = restore_tmux_sessions(workers=1)
+
+    assert restored == [(str(directories["kept"]), "kept", True)]
+    build.assert_called_once()
@@ -0,0 +1,108 @@
+import subprocess
+import threading
+import time
+
+import pytest
+
+from tmux_bro import tmux
+from tmux_bro.speculate import ConfigSpeculator, parse_fzf_version
+
+
+def _wait_until(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_parse_fzf_version():
+    """Test parsing fzf --version output."""
+    assert parse_fzf_version("0.44.1 (debian)") == (0, 44)
+    assert parse_fzf_version("") is None
+
+
+def test_only_the_settled_focus_is_built():
+    """Test that candidates scrolled past are not built."""
+    built = []
+    speculator = ConfigSpeculator(lambda d, cancel: built.append(d) or {"dir": d})
+    speculator.start()
+    try:
+        for directory in ["/a", "/b", "/c"]:
+            speculator.focus(directory)
+        _wait_until(lambda: built)
+        assert speculator.result("/c") == {"dir": "/c"}
+        assert built == ["/c"]
+        assert speculator.result("/a") is None
+    finally:
+        speculator.stop()
+
+
+def test_result_waits_for_build_in_progress():
+    """Test that the selected candidate's running build is awaited."""
+    release = threading.Event()
+    speculator = ConfigSpeculator(lambda d, cancel: release.wait() and {"dir": d})
+    speculator.start()
+    try:
+        speculator.focus("/a")
+        _wait_until(lambda: speculator.building == "/a")
+        threading.Timer(0.05, release.set).start()
+        assert speculator.result("/a") == {"dir": "/a"}
+    finally:
+        speculator.stop()
+
+
+def test_build_is_cancelled_when_focus_moves():
+    """Test that a build of a candidate that lost focus is cancelled."""
+    cancelled = threading.Event()
+
+    def build(directory, cancel):
+        if directory == "/slow":
+            cancel.wait(2)
+            cancelled.set()
+        return {"dir": directory}
+
+    speculator = ConfigSpeculator(build)
+    speculator.start()
+    try:
+        speculator.focus("/slow")
+        _wait_until(lambda: speculator.building == "/slow")
+        speculator.focus("/fast")
+        _wait_until(cancelled.is_set, timeout=1)
+        _wait_until(lambda: "/fast" in speculator.results)
+        assert speculator.result("/slow") is None
+    finally:
+        speculator.stop()
+
+
+def test_build_session_config_stops_when_cancelled(tmp_path, monkeypatch):
+    """Test that a cancelled config build stops between packages."""
+    inspected = []
+    monkeypatch.setattr(
+        tmux, "detect_workspace", lambda d: [f"{d}/a", f"{d}/b", f"{d}/c"]
+    )
+    monkeypatch.setattr(tmux, "load_global_config", lambda: {"inspect_workers": 1})
+    cancel = threading.Event()
+
+    def has_dev_script(package_dir):
+        inspected.append(package_dir)
+        cancel.set()
+        return False
+
+    monkeypatch.setattr(tmux, "has_package_json_dev_script", has_dev_script)
+
+    with pytest.raises(tmux.BuildCancelled):
+        tmux.build_session_config(str(tmp_path), cancel=cancel)
+    assert inspected == [f"{tmp_path}/a"]
+
+
+def test_focus_is_reported_through_fifo():
+    """Test the command fzf runs on focus changes."""
+    speculator = ConfigSpeculator(lambda d, cancel: {"dir": d}, max_builds=1)
+    speculator.start()
+    try:
+        bind = speculator.fzf_args()[1]
+        command = bind.split(":", 2)[2].replace("{}", "'/my project'")
+        subprocess.run(["/bin/sh", "-c", command], check=True, timeout=5)
+        _wait_until(lambda: "/my project" in speculator.results)
+    finally:
+        speculator.stop()
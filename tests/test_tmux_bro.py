@@ -307,10 +307,11 @@ def test_simple_directory(simple_dir):
 
 
 def test_python_venv_directory(python_venv_dir):
-    """Test configuration for a Python project with venv."""
+    """Test that a Python venv is activated through the window environment."""
     config = build_session_config(str(python_venv_dir))
 
-    venv_path = str(python_venv_dir / "venv" / "bin" / "activate")
+    venv_path = str(python_venv_dir / "venv")
+    venv_shell = """sh -c 'PATH="$VIRTUAL_ENV/bin:$PATH" exec "${SHELL:-/bin/sh}"'"""
     expected = {
         "session_name": "python-project",
         "windows": [
@@ -319,9 +320,10 @@ def test_python_venv_directory(python_venv_dir):
                 "start_directory": str(python_venv_dir),
                 "options": {"main-pane-width": "50%"},
                 "suppress_history": False,
+                "environment": {"VIRTUAL_ENV": venv_path},
                 "panes": [
-                    {"shell_command": [{"cmd": f"source {venv_path}"}, {"cmd": "vim"}]},
-                    {"shell_command": [{"cmd": f"source {venv_path}"}]},
+                    {"shell": venv_shell, "shell_command": [{"cmd": "vim"}]},
+                    {"shell": venv_shell, "shell_command": []},
                 ],
             }
         ],
@@ -330,6 +332,18 @@ def test_python_venv_directory(python_venv_dir):
     assert expected == config
 
 
+def test_workspace_package_uses_root_venv(npm_workspace_dir):
+    """Test that packages without their own venv use the workspace root's .venv."""
+    venv_bin = npm_workspace_dir / ".venv" / "bin"
+    venv_bin.mkdir(parents=True)
+    (venv_bin / "activate").write_text("# Mock activate script")
+
+    config = build_session_config(str(npm_workspace_dir))
+
+    for window in config["windows"]:
+        assert window["environment"]["VIRTUAL_ENV"] == str(npm_workspace_dir / ".venv")
+
+
 def test_npm_workspace(npm_workspace_dir):
     """Test configuration for an npm workspace."""
     config = build_session_config(str(npm_workspace_dir))
@@ -634,3 +648,131 @@ def test_workspace_layout_settings(npm_workspace_with_overrides):
         assert window["layout"] == "main-horizontal"
         assert window["options"]["main-pane-height"] == "65%"
         assert "main-pane-width" not in window["options"]
+
+
+def test_aggregate_dev_mode(pnpm_workspace_dir, mock_global_config):
+    """Test that aggregate dev mode runs one recursive dev command in a root window."""
+    mock_global_config.return_value = {"dev_mode": "aggregate"}
+    with patch("tmux_bro.git.get_git_root", return_value=None):
+        config = build_session_config(str(pnpm_workspace_dir))
+
+    root_window = config["windows"][0]
+    assert root_window["window_name"] == "root"
+    assert root_window["start_directory"] == str(pnpm_workspace_dir)
+    assert root_window["panes"][1] == {
+        "shell_command": [{"cmd": "pnpm -r --parallel run dev"}]
+    }
+
+    # Package windows keep only the editor and shell panes
+    assert [w["window_name"] for w in config["windows"][1:]] == ["pkg2", "pkg1"]
+    for window in config["windows"][1:]:
+        assert window["panes"] == [
+            {"shell_command": [{"cmd": "vim"}]},
+            {"shell_command": []},
+        ]
+
+
+def test_aggregate_dev_mode_uses_turbo(pnpm_workspace_dir, mock_global_config):
+    """Test that aggregate dev mode prefers turbo when the workspace uses it."""
+    mock_global_config.return_value = {"dev_mode": "aggregate"}
+    (pnpm_workspace_dir / "turbo.json").write_text("{}")
+    with patch("tmux_bro.git.get_git_root", return_value=None):
+        config = build_session_config(str(pnpm_workspace_dir))
+
+    dev_pane = config["windows"][0]["panes"][1]
+    assert dev_pane == {"shell_command": [{"cmd": "pnpm exec turbo dev"}]}
+
+
+def test_aggregate_dev_mode_falls_back_for_npm(npm_workspace_dir, mock_global_config):
+    """Test that npm workspaces without turbo keep one dev pane per package."""
+    mock_global_config.return_value = {"dev_mode": "aggregate"}
+    with patch("tmux_bro.git.get_git_root", return_value=None):
+        config = build_session_config(str(npm_workspace_dir))
+
+    assert [w["window_name"] for w in config["windows"]] == ["pkg2", "pkg1"]
+    pkg1_window = config["windows"][1]
+    assert pkg1_window["panes"][1] == {"shell_command": [{"cmd": "npm run dev"}]}
+
+
+@pytest.mark.parametrize(
+    "berry_marker, dev_command",
+    [
+        (None, None),
+        ("packageManager", "yarn workspaces foreach"),
+        (".yarnrc.yml", "yarn workspaces foreach"),
+    ],
+)
+def test_aggregate_dev_mode_for_yarn(
+    npm_workspace_dir, mock_global_config, berry_marker, dev_command
+):
+    """Test that only Yarn 2+ workspaces run dev through yarn workspaces foreach."""
+    mock_global_config.return_value = {"dev_mode": "aggregate"}
+    (npm_workspace_dir / "package-lock.json").unlink()
+    (npm_workspace_dir / "yarn.lock").write_text("")
+    if berry_marker == "packageManager":
+        package_json = npm_workspace_dir / "package.json"
+        package = json.loads(package_json.read_text())
+        package["packageManager"] = "yarn@4.1.0"
+        package_json.write_text(json.dumps(package))
+    elif berry_marker:
+        (npm_workspace_dir / berry_marker).write_text("nodeLinker: node-modules\n")
+    with patch("tmux_bro.git.get_git_root", return_value=None):
+        config = build_session_config(str(npm_workspace_dir))
+
+    if dev_command:
+        assert config["windows"][0]["window_name"] == "root"
+        dev_pane = config["windows"][0]["panes"][1]
+        assert dev_pane["shell_command"][0]["cmd"].startswith(dev_command)
+    else:
+        # Yarn classic keeps one dev pane per package, like npm
+        assert [w["window_name"] for w in config["windows"]] == ["pkg2", "pkg1"]
+        assert config["windows"][1]["panes"][1] == {
+            "shell_command": [{"cmd": "yarn dev"}]
+        }
+
+
+def test_command_launch_mode(npm_project_dir, mock_global_config):
+    """Test that command launch mode starts editor and dev as pane processes."""
+    mock_global_config.return_value = {"launch_mode": "command"}
+    config = build_session_config(str(npm_project_dir))
+
+    assert config["windows"][0]["panes"] == [
+        {
+            "shell": (
+                'sh -c \'vim; [ -z "$VIRTUAL_ENV" ] || exec "${SHELL:-/bin/sh}"; '
+                'exec "${SHELL:-/bin/sh}" -l\''
+            ),
+            "shell_command": [],
+        },
+        {
+            "shell": (
+                'sh -c \'npm run dev; [ -z "$VIRTUAL_ENV" ] || exec "${SHELL:-/bin/sh}"; '
+                'exec "${SHELL:-/bin/sh}" -l\''
+            ),
+            "shell_command": [],
+        },
+        {"shell_command": []},
+    ]
+
+
+def test_concurrent_inspection_keeps_package_order(tmp_path, mock_global_config):
+    """Test that inspecting packages in a thread pool gives the serial result."""
+    workspace_dir = tmp_path / "big-workspace"
+    workspace_dir.mkdir()
+    (workspace_dir / "pnpm-workspace.yaml").write_text(
+        yaml.dump({"packages": ["packages/*"]})
+    )
+    for i in range(20):
+        pkg_dir = workspace_dir / "packages" / f"pkg{i}"
+        pkg_dir.mkdir(parents=True)
+        scripts = {"dev": "vite"} if i % 3 == 0 else {}
+        (pkg_dir / "package.json").write_text(json.dumps({"scripts": scripts}))
+
+    with patch("tmux_bro.git.get_git_root", return_value=None):
+        mock_global_config.return_value = {"inspect_workers": 1}
+        serial = build_session_config(str(workspace_dir))
+        mock_global_config.return_value = {"inspect_workers": 8}
+        concurrent = build_session_config(str(workspace_dir))
+
+    assert len(concurrent["windows"]) == 20
+    assert concurrent == serial
@@ -0,0 +1,72 @@
+import json
+import os
+import time
+from unittest.mock import patch
+
+from tmux_bro.tmux import build_session_config
+from tmux_bro.usage import _usage_path, load_usage, split_by_usage
+
+
+def _log_visits(directory, paths):
+    os.makedirs(os.path.dirname(_usage_path(directory, ".log")), exist_ok=True)
+    with open(_usage_path(directory, ".log"), "a") as f:
+        f.writelines(f"{path}\n" for path in paths)
+
+
+def test_visit_log_is_folded_into_counts(tmp_path):
+    """Test that logged visits are counted once and the log is emptied."""
+    project = str(tmp_path)
+    _log_visits(project, ["/p/a", "/p/b", "/p/a"])
+
+    usage = load_usage(project)
+    assert {path: p["visits"] for path, p in usage["packages"].items()} == {
+        "/p/a": 2,
+        "/p/b": 1,
+    }
+    assert usage["current"] == "/p/a"
+    assert not os.path.exists(_usage_path(project, ".log"))
+
+    _log_visits(project, ["/p/b"])
+    usage = load_usage(project)
+    assert usage["packages"]["/p/b"]["visits"] == 2
+    assert usage["current"] == "/p/b"
+
+
+def test_split_by_usage():
+    now = time.time()
+    usage = {
+        "packages": {
+            "/p/often": {"visits": 5, "last": now},
+            "/p/once": {"visits": 1, "last": now},
+            "/p/stale": {"visits": 9, "last": now - 90 * 86400},
+            "/p/last": {"visits": 1, "last": now},
+        },
+        "current": "/p/last",
+    }
+    dirs = ["/p/often", "/p/once", "/p/stale", "/p/last", "/p/never"]
+
+    assert split_by_usage(dirs, usage, {}) == (
+        ["/p/often", "/p/last"],
+        ["/p/once", "/p/stale", "/p/never"],
+    )
+    # Without visits to any of the packages, all of them are built
+    assert split_by_usage(["/q/a", "/q/b"], usage, {}) == (["/q/a", "/q/b"], [])
+
+
+def test_unused_package_windows_are_deferred(tmp_path):
+    workspace = tmp_path / "ws"
+    for name in ("a", "b", "c"):
+        (workspace / "packages" / name).mkdir(parents=True)
+    (workspace / "package.json").write_text(json.dumps({"workspaces": ["packages/*"]}))
+    used = str(workspace / "packages" / "b")
+    _log_visits(str(workspace), [used])
+
+    global_config = {"adaptive_windows": {"min_visits": 1}}
+    with patch("tmux_bro.tmux.load_global_config", return_value=global_config):
+        config = build_session_config(str(workspace))
+
+    assert [w["start_directory"] for w in config["windows"]] == [used]
+    assert sorted(w["start_directory"] for w in config["deferred_windows"]) == [
+        str(workspace / "packages" / "a"),
+        str(workspace / "packages" / "c"),
+    ]
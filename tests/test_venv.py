@@ -0,0 +1,58 @@
+import base64
+import hashlib
+import os
+import subprocess
+
+import toml
+
+from tmux_bro.venv import find_venv, get_venv_shell
+
+
+def _make_venv(path):
+    bin_dir = path / "bin"
+    bin_dir.mkdir(parents=True)
+    (bin_dir / "activate").write_text("# Mock activate script")
+
+
+def test_find_venv_none(tmp_path):
+    """Test that directories without a virtual environment return None."""
+    assert find_venv(str(tmp_path)) is None
+
+
+def test_find_venv_dot_venv(tmp_path):
+    """Test that uv's default .venv is found."""
+    _make_venv(tmp_path / ".venv")
+    assert find_venv(str(tmp_path)) == str(tmp_path / ".venv")
+
+
+def test_find_venv_poetry(tmp_path, monkeypatch):
+    """Test that Poetry virtualenvs outside the project are found."""
+    project_dir = tmp_path / "My Project"
+    project_dir.mkdir()
+    (project_dir / "pyproject.toml").write_text(
+        toml.dumps({"tool": {"poetry": {"name": "My-Project"}}})
+    )
+
+    virtualenvs_dir = tmp_path / "virtualenvs"
+    monkeypatch.setenv("POETRY_VIRTUALENVS_PATH", str(virtualenvs_dir))
+
+    cwd = os.path.normcase(os.path.realpath(str(project_dir)))
+    cwd_hash = base64.urlsafe_b64encode(hashlib.sha256(cwd.encode()).digest())
+    venv_dir = virtualenvs_dir / f"my-project-{cwd_hash.decode()[:8]}-py3.12"
+    _make_venv(venv_dir)
+    _make_venv(virtualenvs_dir / "other-project-AAAAAAAA-py3.12")
+
+    assert find_venv(str(project_dir)) == str(venv_dir)
+
+
+def test_venv_shell_prepends_bin_to_current_path():
+    """Test that the venv's bin goes in front of the PATH the pane starts with."""
+    command = get_venv_shell("""sh -c 'echo "$PATH"'""")
+    result = subprocess.run(
+        ["sh", "-c", command],
+        env={"VIRTUAL_ENV": "/venv", "PATH": "/usr/local/bin:/usr/bin:/bin"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout == "/venv/bin:/usr/local/bin:/usr/bin:/bin\n"
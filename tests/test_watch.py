@@ -0,0 +1,49 @@
+import json
+import sys
+
+import pytest
+import yaml
+
+from tmux_bro.watch import IN_CREATE, IN_ISDIR, WorkspaceWatcher
+
+pytestmark = pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="inotify is Linux only"
+)
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    workspace_dir = tmp_path / "workspace"
+    (workspace_dir / "packages" / "pkg1").mkdir(parents=True)
+    (workspace_dir / "pnpm-workspace.yaml").write_text(
+        yaml.dump({"packages": ["packages/*"]})
+    )
+    (workspace_dir / "packages" / "pkg1" / "package.json").write_text("{}")
+    return workspace_dir
+
+
+def test_watcher_reports_package_manifest_change(workspace):
+    """Test that rewriting a package.json is reported for that package only."""
+    watcher = WorkspaceWatcher(str(workspace), "workspace")
+    watcher._update_watches()
+
+    (workspace / "packages" / "pkg1" / "package.json").write_text(
+        json.dumps({"scripts": {"dev": "vite"}})
+    )
+    # Unrelated files in watched directories are ignored
+    (workspace / "packages" / "pkg1" / "notes.txt").write_text("")
+
+    changes = watcher._classify(watcher.inotify.read(timeout=1))
+    assert changes == (False, {str(workspace / "packages" / "pkg1")})
+
+
+def test_watcher_reports_new_package_dir(workspace):
+    """Test that a new directory next to existing packages changes the workspace."""
+    watcher = WorkspaceWatcher(str(workspace), "workspace")
+    watcher._update_watches()
+
+    (workspace / "packages" / "pkg2").mkdir()
+
+    events = watcher.inotify.read(timeout=1)
+    assert any(mask & IN_CREATE and mask & IN_ISDIR for _, mask, _ in events)
+    assert watcher._classify(events) == (True, set())
@@ -0,0 +1,213 @@
+import bisect
+import json
+import os
+import re
+import shutil
+import subprocess
+from typing import Dict, List, Optional
+
+from .config import get_cache_dir
+from .git import discover_git_checkouts
+
+# Files and directories that make a directory a project root
+PROJECT_MARKERS = frozenset(
+    [
+        ".git",
+        "package.json",
+        "Cargo.toml",
+        "pyproject.toml",
+        "setup.py",
+        "go.mod",
+        ".tmux-bro.yaml",
+    ]
+)
+
+# Directories never offered as projects, nor anything below them
+DEFAULT_IGNORE_DIRS = ["node_modules", ".git", ".venv", "venv", "__pycache__"]
+
+
+def list_zoxide_dirs() -> Optional[List[str]]:
+    """
+    Return the directories known to zoxide, or None if zoxide is not installed.
+    """
+    try:
+        result = subprocess.run(
+            ["zoxide", "query", "-l"], capture_output=True, text=True
+        )
+    except (subprocess.SubprocessError, FileNotFoundError):
+        return None
+    return [line for line in result.stdout.splitlines() if line]
+
+
+def list_projects_dir(projects_dir: str) -> List[str]:
+    """Return the projects directory and its immediate subdirectories."""
+    projects_dir = os.path.expanduser(projects_dir)
+    directories = [projects_dir]
+    try:
+        with os.scandir(projects_dir) as entries:
+            directories.extend(
+                sorted(entry.path for entry in entries if entry.is_dir())
+            )
+    except OSError:
+        pass
+    return directories
+
+
+def _get_filter_cache_path():
+    return os.path.join(get_cache_dir(), "candidate-dirs.json")
+
+
+class _DirCache:
+    """
+    The subdirectories of each parent directory, cached by the parent's
+    mtime, and whether a directory holds a project marker, cached by its own.
+    An unchanged parent costs one stat for all the candidates in it.
+    """
+
+    def __init__(self):
+        try:
+            with open(_get_filter_cache_path(), "r") as f:
+                cache = json.load(f)
+            self.cached_children = cache["children"]
+            self.cached_roots = cache["roots"]
+        except (OSError, ValueError, KeyError, TypeError):
+            self.cached_children, self.cached_roots = {}, {}
+        self.children: Dict[str, list] = {}
+        self.roots: Dict[str, list] = {}
+        self.lookups: Dict[str, Optional[set]] = {}
+
+    def _subdirectories(self, parent: str) -> Optional[set]:
+        if parent in self.lookups:
+            return self.lookups[parent]
+        try:
+            mtime = os.stat(parent).st_mtime_ns
+        except OSError:
+            self.lookups[parent] = None
+            return None
+
+        entry = self.cached_children.get(parent)
+        if entry is None or entry[0] != mtime:
+            try:
+                with os.scandir(parent) as entries:
+                    names = sorted(e.name for e in entries if e.is_dir())
+            except OSError:
+                names = []
+            entry = [mtime, names]
+        self.children[parent] = entry
+        self.lookups[parent] = set(entry[1])
+        return self.lookups[parent]
+
+    def exists(self, directory: str) -> bool:
+        parent, _, name = directory.rpartition(os.sep)
+        names = self.lookups.get(parent, False)
+        if names is False:
+            if not name or not parent:
+                return os.path.isdir(directory)
+            names = self._subdirectories(parent)
+        return names is not None and name in names
+
+    def is_root(self, directory: str) -> bool:
+        if directory in self.roots:
+            return self.roots[directory][1]
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            return False
+
+        entry = self.cached_roots.get(directory)
+        if entry is None or entry[0] != mtime:
+            try:
+                with os.scandir(directory) as entries:
+                    is_root = any(e.name in PROJECT_MARKERS for e in entries)
+            except OSError:
+                is_root = False
+            entry = [mtime, is_root]
+        self.roots[directory] = entry
+        return entry[1]
+
+    def save(self) -> None:
+        if self.children == self.cached_children and self.roots == self.cached_roots:
+            return
+        cache_path = _get_filter_cache_path()
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"children": self.children, "roots": self.roots}, f)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass
+
+
+def filter_candidates(directories: List[str], config) -> List[str]:
+    """
+    Drop candidates that no longer exist, that are in or below one of the
+    `ignore_dirs`, and, with `hide_subpaths` (the default), that are below
+    another candidate that is a project root without being one themselves.
+    The home directory and `projects_dir` never hide what is below them, as
+    a stray package.json or a dotfiles .git doesn't make them projects. With
+    `roots_only`, keep only project roots. Keeps the order of directories.
+    """
+    ignore_dirs = config.get("ignore_dirs", DEFAULT_IGNORE_DIRS) or []
+    hide_subpaths = config.get("hide_subpaths", True)
+    roots_only = config.get("roots_only", False)
+    cache = _DirCache()
+
+    kept = dict.fromkeys(directories)
+    if ignore_dirs:
+        sep = re.escape(os.sep)
+        names = "|".join(re.escape(name) for name in ignore_dirs)
+        ignored = re.compile(f"{sep}(?:{names})(?:{sep}|$)", re.MULTILINE)
+        # One search over all of them usually finds nothing to drop
+        if ignored.search("\n".join(kept)):
+            kept = {d: None for d in kept if not ignored.search(d)}
+
+    for directory in list(kept):
+        if not cache.exists(directory) or (roots_only and not cache.is_root(directory)):
+            del kept[directory]
+
+    if hide_subpaths:
+        containers = {os.path.normpath(os.path.expanduser("~"))}
+        if config.get("projects_dir"):
+            containers.add(os.path.normpath(os.path.expanduser(config["projects_dir"])))
+        # With separators sorting first, a directory's descendants come right
+        # after it
+        keys = sorted([directory.replace(os.sep, "\0") for directory in kept])
+        parents = [a for a, b in zip(keys, keys[1:]) if b.startswith(a + "\0")]
+        for key in parents:
+            parent = key.replace("\0", os.sep)
+            if parent in containers or not cache.is_root(parent):
+                continue
+            start = bisect.bisect_left(keys, key + "\0")
+            end = bisect.bisect_left(keys, key + "\1")
+            for descendant in keys[start:end]:
+                descendant = descendant.replace("\0", os.sep)
+                if not cache.is_root(descendant):
+                    kept.pop(descendant, None)
+
+    cache.save()
+    return list(kept)
+
+
+def has_candidate_source(config) -> bool:
+    """Check that zoxide is installed or projects_dir is set, without running."""
+    return bool(shutil.which("zoxide") or config.get("projects_dir"))
+
+
+def get_candidates(config) -> Optional[List[str]]:
+    """
+    Return the directories to offer in the picker: those known to zoxide, or
+    the projects in projects_dir if zoxide is not installed, filtered with
+    filter_candidates, followed by the linked worktrees and submodules of the
+    git repositories among them.
+    Returns None if neither source is available.
+    """
+    directories = list_zoxide_dirs()
+    if directories is None:
+        projects_dir = config.get("projects_dir")
+        if not projects_dir:
+            return None
+        directories = list_projects_dir(projects_dir)
+    directories = filter_candidates(directories, config)
+
+    return directories + discover_git_checkouts(directories)
@@ -1,4 +1,6 @@
+import copy
 import os
+import threading
 import yaml
 from typing import Dict, Any
 
@@ -8,23 +10,45 @@ def get_global_config_path() -> str:
     return os.path.join(home_dir, ".config", "tmux-bro.yaml")
 
 
+def get_cache_dir() -> str:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "tmux-bro")
+
+
+# The last parsed global config, keyed by the file's path, mtime and size
+_global_config_cache: Dict[Any, Dict[str, Any]] = {}
+_global_config_lock = threading.Lock()
+
+
 def load_global_config() -> Dict[str, Any]:
     """
     Load global user configuration from ~/.config/tmux-bro.yaml
     Returns a dictionary with configuration values or empty dict if no config exists.
+    The file is only parsed again when it changes, so that the many callers
+    opening a project cost a stat each.
     """
     config_path = get_global_config_path()
 
-    if not os.path.isfile(config_path):
-        return {}
-
     try:
-        with open(config_path, "r") as f:
-            config = yaml.safe_load(f)
-        return config or {}
-    except Exception as e:
-        print(f"Warning: Error loading global config file {config_path}: {e}")
+        stat = os.stat(config_path)
+    except OSError:
         return {}
+    key = (config_path, stat.st_mtime_ns, stat.st_size)
+
+    with _global_config_lock:
+        if key not in _global_config_cache:
+            try:
+                with open(config_path, "r") as f:
+                    config = yaml.safe_load(f)
+            except Exception as e:
+                print(f"Warning: Error loading global config file {config_path}: {e}")
+                return {}
+            _global_config_cache.clear()
+            _global_config_cache[key] = config or {}
+        # Copied, so that callers can't change the cached config
+        return copy.deepcopy(_global_config_cache[key])
 
 
 def load_project_config(directory: str) -> Dict[str, Any]:
@@ -54,4 +78,3 @@ def load_project_config(directory: str) -> Dict[str, Any]:
                 print(f"Warning: Error loading project config file {config_path}: {e}")
 
     return {}
-
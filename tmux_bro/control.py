@@ -0,0 +1,154 @@
+import subprocess
+from typing import List, Optional, Sequence
+
+
+def quote(arg: str) -> str:
+    """Quote an argument for tmux's command parser."""
+    if "'" not in arg and "\n" not in arg:
+        return f"'{arg}'"
+    escaped = (
+        arg.replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("$", "\\$")
+        .replace("\n", "\\n")
+    )
+    return f'"{escaped}"'
+
+
+class ControlResult:
+    """Output of one command, shaped like libtmux's tmux_cmd."""
+
+    def __init__(self, lines: List[str], error: bool):
+        self.stdout = [] if error else lines
+        self.stderr = lines if error else []
+
+
+class ControlClient:
+    """
+    A tmux control mode (tmux -C) connection that runs any number of commands
+    through a single tmux client process, instead of forking a client per
+    command. Commands can be pipelined: they are all written before any
+    output is read, and the %begin/%end blocks are matched up in order.
+
+    Control mode needs a session to attach to, so connecting fails when the
+    server has no sessions; callers fall back to plain tmux commands then.
+    The client attaches with ignore-size and no-output so that it affects
+    neither window sizes nor receives pane output.
+    """
+
+    def __init__(self, tmux_args: Sequence[str] = ()):
+        self.tmux_args = list(tmux_args)
+        self.process: Optional[subprocess.Popen] = None
+
+    def connect(self) -> bool:
+        if self.process is not None:
+            return True
+        try:
+            self.process = subprocess.Popen(
+                ["tmux", *self.tmux_args, "-C"]
+                + ["attach-session", "-f", "ignore-size,no-output"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        except OSError:
+            return False
+
+        # The attach-session command itself produces the first block, which is
+        # an error when there is no session to attach to
+        result = self._read_block()
+        if result is None or result.stderr:
+            self.close()
+            return False
+        return True
+
+    def _read_block(self) -> Optional[ControlResult]:
+        assert self.process is not None and self.process.stdout is not None
+        lines: List[str] = []
+        in_block = False
+
+        for raw in self.process.stdout:
+            line = raw.decode("utf-8", "replace").rstrip("\n")
+            if not in_block:
+                # Notifications such as %sessions-changed arrive between blocks
+                if line.startswith("%begin "):
+                    in_block = True
+                elif line.startswith("%exit"):
+                    return None
+                continue
+            if line.startswith("%end ") or line.startswith("%error "):
+                return ControlResult(lines, line.startswith("%error "))
+            lines.append(line)
+
+        return None
+
+    def run(self, commands: Sequence[Sequence[str]]) -> List[ControlResult]:
+        """
+        Run the commands in one round trip and return their results in order.
+        """
+        if not commands:
+            return []
+        if not self.connect():
+            raise ConnectionError("tmux control mode client is not connected")
+        assert self.process is not None and self.process.stdin is not None
+
+        payload = "".join(
+            " ".join(quote(str(arg)) for arg in command) + "\n" for command in commands
+        )
+        self.process.stdin.write(payload.encode())
+        self.process.stdin.flush()
+
+        results = []
+        for _ in commands:
+            result = self._read_block()
+            if result is None:
+                self.close()
+                raise ConnectionError("tmux control mode client exited")
+            results.append(result)
+        return results
+
+    def cmd(self, *args: str) -> ControlResult:
+        """Run a single command, like libtmux's Server.cmd."""
+        return self.run([args])[0]
+
+    def has_session(self, session_name: str) -> bool:
+        return not self.cmd("has-session", "-t", f"={session_name}").stderr
+
+    def switch_client(self, session_name: str) -> bool:
+        """
+        Switch the most recently active regular client (the one that ran
+        tmux-bro) to the session. The control client itself never counts.
+        """
+        clients = self.cmd(
+            "list-clients",
+            "-F",
+            "#{client_activity}\t#{client_control_mode}\t#{client_name}",
+        ).stdout
+        candidates = []
+        for line in clients:
+            activity, control_mode, name = line.split("\t", 2)
+            if control_mode != "1":
+                candidates.append((int(activity), name))
+        if not candidates:
+            return False
+
+        _, client_name = max(candidates)
+        result = self.cmd("switch-client", "-c", client_name, "-t", f"={session_name}")
+        return not result.stderr
+
+    def close(self) -> None:
+        if self.process is None:
+            return
+        try:
+            if self.process.stdin is not None:
+                self.process.stdin.close()
+            self.process.wait(timeout=1)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+        self.process = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
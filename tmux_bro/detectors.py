@@ -0,0 +1,212 @@
+"""
+Registry of workspace detectors. Each detector declares the files in a
+project root that it looks at, and is only called when one of them is in
+the root's directory listing.
+
+Other packages can add detectors under the `tmux_bro.detectors` entry point
+group. An entry point named "<name>:<marker>,<marker>" declares its markers
+in the name, so that its module is only imported for projects that have one
+of them:
+
+    [project.entry-points."tmux_bro.detectors"]
+    "deno:deno.json,deno.jsonc" = "tmux_bro_deno:detect_deno_workspace"
+
+The function takes the project directory and returns the package
+directories, or None if it isn't such a workspace. Detectors from entry
+points are tried before the built-in ones, in entry point name order.
+"""
+
+import importlib
+import json
+import os
+import sys
+from typing import Callable, FrozenSet, Iterator, List, NamedTuple, Optional
+
+from .config import get_cache_dir
+
+ENTRY_POINT_GROUP = "tmux_bro.detectors"
+
+
+class Detector(NamedTuple):
+    name: str
+    markers: FrozenSet[str]
+    detect: Callable[[str], Optional[List[str]]]
+
+
+_builtin: List[Detector] = []
+_plugins: Optional[List[Detector]] = None
+
+
+def register_detector(
+    name: str,
+    markers,
+    detect: Callable[[str], Optional[List[str]]],
+) -> None:
+    """Add a detector, tried after the ones registered before it."""
+    _builtin.append(Detector(name, frozenset(markers), detect))
+
+
+def _import(target: str):
+    module_name, _, attribute = target.partition(":")
+    value = importlib.import_module(module_name)
+    for part in attribute.split("."):
+        value = getattr(value, part)
+    return value
+
+
+def _lazy(target: str) -> Callable[[str], Optional[List[str]]]:
+    """Return a function that imports the entry point target when called."""
+    loaded: List[Callable] = []
+
+    def detect(directory: str):
+        if not loaded:
+            loaded.append(_import(target))
+        return loaded[0](directory)
+
+    return detect
+
+
+def _get_entry_point_cache_path() -> str:
+    return os.path.join(get_cache_dir(), "detectors.json")
+
+
+def _path_entries() -> List[str]:
+    # The working directory, '' on sys.path, changes with wherever tmux-bro
+    # is run from
+    return [path for path in sys.path if os.path.isabs(path)]
+
+
+def _changed_since(paths: List[str], mtime_ns: int) -> bool:
+    """
+    Installing or removing a distribution adds or removes its metadata
+    directory in a sys.path entry, which changes that entry's mtime.
+    """
+    for path in paths:
+        try:
+            if os.stat(path).st_mtime_ns >= mtime_ns:
+                return True
+        except OSError:
+            continue
+    return False
+
+
+def _scan_entry_points() -> List[List[str]]:
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        return []
+
+    try:
+        found = entry_points(group=ENTRY_POINT_GROUP)
+    except TypeError:
+        # Python < 3.10
+        found = entry_points().get(ENTRY_POINT_GROUP, [])
+    return sorted([entry_point.name, entry_point.value] for entry_point in found)
+
+
+def _load_entry_points() -> List[List[str]]:
+    """
+    Return the [name, target] of every detector entry point. Reading entry
+    points is slow enough to show up in startup time, so the result is
+    cached until a sys.path directory changes. The cache is only rewritten
+    when the entry points themselves have changed.
+    """
+    cache_path = _get_entry_point_cache_path()
+    paths = _path_entries()
+    cached = None
+    try:
+        with open(cache_path, "r") as f:
+            cache = json.load(f)
+            written = os.fstat(f.fileno()).st_mtime_ns
+        if cache["paths"] == paths:
+            cached = cache["entry_points"]
+            if not _changed_since(paths, written):
+                return cached
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    found = _scan_entry_points()
+    try:
+        if found == cached:
+            # Only mark the cache as checked against the current sys.path
+            os.utime(cache_path)
+            return found
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"paths": paths, "entry_points": found}, f)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+    return found
+
+
+def _plugin_detectors() -> List[Detector]:
+    global _plugins
+    if _plugins is None:
+        _plugins = []
+        for name, target in _load_entry_points():
+            detector_name, _, markers = name.partition(":")
+            if markers:
+                _plugins.append(
+                    Detector(
+                        detector_name, frozenset(markers.split(",")), _lazy(target)
+                    )
+                )
+                continue
+            # Without markers in the name, the target is imported right away
+            # and must be a Detector
+            try:
+                detector = Detector(*_import(target))
+            except Exception as e:
+                print(f"Warning: Ignoring detector {name}: {e}")
+                continue
+            _plugins.append(detector._replace(markers=frozenset(detector.markers)))
+    return _plugins
+
+
+def get_detectors() -> List[Detector]:
+    return _plugin_detectors() + _builtin
+
+
+def detector_markers() -> FrozenSet[str]:
+    """Return the marker files of every detector."""
+    return frozenset().union(*(detector.markers for detector in get_detectors()))
+
+
+def list_root(directory: str) -> FrozenSet[str]:
+    """Return the names in a directory, with a single scandir."""
+    try:
+        with os.scandir(directory) as entries:
+            return frozenset(entry.name for entry in entries)
+    except OSError:
+        return frozenset()
+
+
+def matching_detectors(names: FrozenSet[str]) -> Iterator[Detector]:
+    """Yield the detectors with a marker among names, in order."""
+    for detector in get_detectors():
+        if not detector.markers.isdisjoint(names):
+            yield detector
+
+
+def run_detectors(directory: str, names: Optional[FrozenSet[str]] = None):
+    """
+    Return (detector name, package directories) from the first detector that
+    recognizes the directory as a workspace, or None.
+    """
+    if names is None:
+        names = list_root(directory)
+    for detector in matching_detectors(names):
+        try:
+            package_dirs = detector.detect(directory)
+        except Exception:
+            continue
+        if package_dirs:
+            return detector.name, package_dirs
+    return None
+
+
+def clear_plugin_cache() -> None:
+    global _plugins
+    _plugins = None
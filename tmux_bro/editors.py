@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import shlex
+from typing import NamedTuple, Optional
+
+from .config import get_cache_dir
+
+EDITOR_MODES = ("window", "shared")
+DEFAULT_EDITOR_MODE = "window"
+
+# How long clients wait for the editor server before starting an editor of
+# their own, for when the server fails to start
+SERVER_WAIT_SECONDS = 5
+
+
+class SharedEditor(NamedTuple):
+    # Runs the session's editor server, in the first window
+    server: str
+    # Connects the editor pane of every other window to it
+    client: str
+
+
+def get_editor_socket(session_name: str) -> str:
+    """Return the socket path of a session's editor server."""
+    key = hashlib.sha1(session_name.encode()).hexdigest()[:16]
+    return os.path.join(get_cache_dir(), "editors", key)
+
+
+def _wait_for(condition: str, then: str, fallback: str) -> str:
+    """
+    Return a command that runs `then` once the shell condition holds, or
+    fallback if it doesn't within SERVER_WAIT_SECONDS. Run through sh, as the
+    pane's shell isn't necessarily POSIX.
+    """
+    tries = int(SERVER_WAIT_SECONDS * 10)
+    script = (
+        f'i=0; until {condition} || [ "$i" -ge {tries} ]; do '
+        "sleep 0.1; i=$((i + 1)); done; "
+        f"if {condition}; then {then}; else {fallback}; fi"
+    )
+    return f"sh -c {shlex.quote(script)}"
+
+
+def _wait_for_socket(socket: str, then: str, fallback: str) -> str:
+    """Return a command that runs `then` once the server listens on socket."""
+    return _wait_for(f"[ -S {shlex.quote(socket)} ]", then, fallback)
+
+
+def _listen(socket: str, then: str) -> str:
+    # A socket left behind by a server that was killed would refuse clients
+    quoted = shlex.quote(socket)
+    return f"mkdir -p {shlex.quote(os.path.dirname(socket))}; rm -f {quoted}; {then}"
+
+
+def _neovim(editor: str, socket: str) -> SharedEditor:
+    quoted = shlex.quote(socket)
+    return SharedEditor(
+        _listen(socket, f"{editor} --listen {quoted}"),
+        _wait_for_socket(socket, f"{editor} --server {quoted} --remote-ui", editor),
+    )
+
+
+def _kakoune(editor: str, socket: str) -> SharedEditor:
+    # Kakoune names its sessions and keeps their sockets itself
+    name = f"tmux-bro-{os.path.basename(socket)}"
+    return SharedEditor(
+        f"{editor} -s {name}",
+        _wait_for(f"{editor} -l | grep -qx {name}", f"{editor} -c {name}", editor),
+    )
+
+
+def _emacs(editor: str, socket: str) -> SharedEditor:
+    # An absolute server-name is used as the socket path
+    start = f"(progn (setq server-name {json.dumps(socket, ensure_ascii=False)}) "
+    start += "(server-start))"
+    client = os.path.join(os.path.dirname(shlex.split(editor)[0]), "emacsclient")
+    return SharedEditor(
+        _listen(socket, f"{editor} -nw --eval {shlex.quote(start)}"),
+        _wait_for_socket(socket, f"{client} -t -s {shlex.quote(socket)}", editor),
+    )
+
+
+ADAPTERS = {"nvim": _neovim, "kak": _kakoune, "emacs": _emacs}
+
+
+def get_shared_editor(editor: str, session_name: str) -> Optional[SharedEditor]:
+    """
+    Return the server and client commands that share one editor instance
+    across a session, or None for editors without a server mode, which keep
+    an editor per window.
+    """
+    try:
+        program = os.path.basename(shlex.split(editor)[0])
+    except (ValueError, IndexError):
+        return None
+    adapter = ADAPTERS.get(program)
+    if adapter is None:
+        return None
+    return adapter(editor, get_editor_socket(session_name))
@@ -1,48 +1,110 @@
+import os
 import subprocess
+import threading
+from .candidates import get_candidates, has_candidate_source
 from .config import load_global_config
+from .index import CandidateIndex
+from .preview import fill_preview_records, get_preview_command
+from .speculate import MIN_FZF_VERSION, parse_fzf_version
 
 
-def run_fuzzy_finder():
+def feed_candidates(index, config, stdin, stop_previews=None):
     """
-    Run zoxide with fzf to select a directory.
+    Write the indexed candidates to fzf's stdin right away, then discover the
+    current ones, update the index and write the ones that are new. Projects
+    that are gone stay in this picker run and drop out of the next one.
+    Preview records are filled in afterwards, until stop_previews is set.
+    """
+    try:
+        try:
+            index.write_to(stdin.fileno())
+        except OSError:
+            # fzf has exited, but the index can still be brought up to date
+            stdin = None
+
+        candidates = get_candidates(config) or []
+        try:
+            added = index.update(candidates)
+        except OSError:
+            added = [] if index.count else candidates
+
+        if stdin is not None and added:
+            try:
+                stdin.write(b"".join(os.fsencode(path) + b"\n" for path in added))
+            except OSError:
+                pass
+    finally:
+        if stdin is not None:
+            try:
+                stdin.close()
+            except OSError:
+                pass
+
+    if stop_previews is not None:
+        # Records of projects opened with tmux-bro are checked too, as their
+        # manifests may have changed since
+        fill_preview_records(index.paths(), stop_previews)
+
+
+def run_fuzzy_finder(speculator=None):
+    """
+    Run fzf over the directories known to zoxide to select a directory.
     If zoxide is not installed, use projects_dir from config as fallback.
+    The candidates of the last run are shown immediately from the candidate
+    index while the current ones are discovered in the background.
+    With a speculator, the highlighted candidate is reported to it while the
+    picker is open.
     """
     try:
         # Check for fzf dependency
         try:
-            subprocess.run(["fzf", "--version"], check=True, capture_output=True)
+            version = subprocess.run(
+                ["fzf", "--version"], check=True, capture_output=True, text=True
+            ).stdout
         except (subprocess.SubprocessError, FileNotFoundError):
             print("Error: fzf is not installed or not in PATH")
             input("Press Enter to continue...")
             return None
 
-        # Try to use zoxide if available
-        try:
-            process = subprocess.Popen(
-                "zoxide query -l | fzf",
-                shell=True,
-                stdout=subprocess.PIPE,
-                text=True,
-            )
-        except (subprocess.SubprocessError, FileNotFoundError):
-            # Use projects_dir from config as fallback
-            config = load_global_config()
-            projects_dir = config.get("projects_dir")
-            if not projects_dir:
-                print(
-                    "Error: zoxide is not installed and projects_dir is not set in ~/.config/tmux-bro.yaml"
-                )
-                input("Press Enter to continue...")
-                return None
-
-            process = subprocess.Popen(
-                f"find {projects_dir} -type d -maxdepth 1 | fzf",
-                shell=True,
-                stdout=subprocess.PIPE,
-                text=True,
+        config = load_global_config()
+        if not has_candidate_source(config):
+            print(
+                "Error: zoxide is not installed and projects_dir is not set in ~/.config/tmux-bro.yaml"
             )
+            input("Press Enter to continue...")
+            return None
+
+        fzf_args = ["fzf"]
+        stop_previews = None
+        if config.get("preview", True):
+            fzf_args += ["--preview", get_preview_command()]
+            stop_previews = threading.Event()
+        if speculator is not None:
+            fzf_version = parse_fzf_version(version)
+            if fzf_version is not None and fzf_version >= MIN_FZF_VERSION:
+                fzf_args += speculator.fzf_args()
+                speculator.start()
+            else:
+                speculator = None
 
-        output = process.communicate()[0].strip().split("\n")
+        process = subprocess.Popen(
+            fzf_args,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            # The preview command is written for a POSIX shell
+            env={**os.environ, "SHELL": "/bin/sh"},
+        )
+        threading.Thread(
+            target=feed_candidates,
+            args=(CandidateIndex(), config, process.stdin, stop_previews),
+            daemon=True,
+        ).start()
+        output = os.fsdecode(process.stdout.read()).strip().split("\n")
+        process.wait()
+        if stop_previews is not None:
+            stop_previews.set()
+        if speculator is not None:
+            speculator.stop()
 
         if not output or not output[0]:
             return None
@@ -1,10 +1,18 @@
+import json
+import os
 import subprocess
 
+from .config import get_cache_dir
+
+# git can hang on an unresponsive network file system
+GIT_TIMEOUT_SECONDS = 1
+
 
 def get_git_root(directory):
     """
     Get the root directory of the git repository containing the specified directory.
-    Returns None if not in a git repository.
+    Returns None if not in a git repository, or if git doesn't answer within
+    GIT_TIMEOUT_SECONDS.
     """
     try:
         # Run git command in the specified directory
@@ -14,7 +22,145 @@ def get_git_root(directory):
             capture_output=True,
             text=True,
             cwd=directory,
+            timeout=GIT_TIMEOUT_SECONDS,
         )
         return result.stdout.strip()
     except (subprocess.SubprocessError, FileNotFoundError):
         return None
+
+
+def get_worktree_repo(directory):
+    """
+    Return the root of the main repository if the directory is a linked git
+    worktree, by reading its .git file. Returns None otherwise.
+    """
+    try:
+        with open(os.path.join(directory, ".git"), "r") as f:
+            content = f.read().strip()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+    if not content.startswith("gitdir:"):
+        return None
+
+    # gitdir: <repo>/.git/worktrees/<name>
+    gitdir = os.path.normpath(
+        os.path.join(directory, content[len("gitdir:") :].strip())
+    )
+    if os.path.basename(os.path.dirname(gitdir)) != "worktrees":
+        return None
+    return os.path.dirname(os.path.dirname(os.path.dirname(gitdir)))
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _read_worktrees(worktrees_dir):
+    worktrees = []
+    try:
+        entries = sorted(os.listdir(worktrees_dir))
+    except OSError:
+        return worktrees
+
+    for entry in entries:
+        try:
+            with open(os.path.join(worktrees_dir, entry, "gitdir"), "r") as f:
+                # Points at the worktree's .git file
+                worktrees.append(os.path.dirname(f.read().strip()))
+        except OSError:
+            continue
+    return worktrees
+
+
+def _read_submodules(gitmodules_path):
+    repo = os.path.dirname(gitmodules_path)
+    submodules = []
+    try:
+        with open(gitmodules_path, "r") as f:
+            for line in f:
+                key, _, value = line.partition("=")
+                if key.strip() == "path" and value.strip():
+                    path = os.path.join(repo, value.strip())
+                    if os.path.exists(os.path.join(path, ".git")):
+                        submodules.append(path)
+    except OSError:
+        pass
+    return submodules
+
+
+def _get_discovery_cache_path():
+    return os.path.join(get_cache_dir(), "git-checkouts.json")
+
+
+def discover_git_checkouts(directories):
+    """
+    Find the linked worktrees and initialized submodules of the repositories
+    among the given directories, without running git. Worktrees are read from
+    .git/worktrees/*/gitdir and submodules from .gitmodules. Results are cached
+    by the mtime of those, and for submodules of .git/modules too, which
+    changes when a submodule is initialized, so an unchanged repository costs
+    three stats.
+    Returns the found checkouts that aren't already in directories.
+    """
+    cache_path = _get_discovery_cache_path()
+    try:
+        with open(cache_path, "r") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+
+    known = set(directories)
+    found = []
+    updated = {}
+
+    for directory in directories:
+        sources = (
+            (
+                "worktrees",
+                os.path.join(directory, ".git", "worktrees"),
+                (),
+                _read_worktrees,
+            ),
+            (
+                "submodules",
+                os.path.join(directory, ".gitmodules"),
+                (os.path.join(directory, ".git", "modules"),),
+                _read_submodules,
+            ),
+        )
+        for kind, path, also_changed, read in sources:
+            mtime = _mtime(path)
+            if mtime is None:
+                continue
+            if also_changed:
+                mtime = [mtime] + [_mtime(other) for other in also_changed]
+
+            key = f"{kind}:{directory}"
+            entry = cache.get(key)
+            if entry is None or entry["mtime"] != mtime:
+                entry = {
+                    "mtime": mtime,
+                    "paths": read(path),
+                }
+            updated[key] = entry
+
+            for checkout in entry["paths"]:
+                if checkout not in known:
+                    known.add(checkout)
+                    found.append(checkout)
+
+    if updated != cache:
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(updated, f)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass
+
+    return found
@@ -0,0 +1,125 @@
+import contextlib
+import json
+import math
+import os
+import time
+from typing import Any, Dict, Iterator, List
+
+from .config import get_cache_dir
+
+# The log is rotated once it grows past this size, keeping one old file
+MAX_HISTORY_BYTES = 1024 * 1024
+SLOWEST_PROJECTS = 10
+
+
+def get_history_path() -> str:
+    return os.path.join(get_cache_dir(), "history.jsonl")
+
+
+class PhaseTimer:
+    """Measure the duration of named phases of an invocation, in milliseconds."""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.phases[name] = round(self.phases.get(name, 0) + elapsed, 1)
+
+    def total(self) -> float:
+        return round(sum(self.phases.values()), 1)
+
+
+def append_history(record: Dict[str, Any]) -> None:
+    """Append a record to the history log, rotating it when it's too big."""
+    path = get_history_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            if os.stat(path).st_size >= MAX_HISTORY_BYTES:
+                os.replace(path, f"{path}.1")
+        except FileNotFoundError:
+            pass
+        with open(path, "a") as f:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+    except OSError:
+        pass
+
+
+def read_history() -> Iterator[Dict[str, Any]]:
+    """Yield history records oldest first, one line at a time."""
+    path = get_history_path()
+    for log_path in (f"{path}.1", path):
+        try:
+            with open(log_path, "r") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except OSError:
+            continue
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Return the nearest-rank percentile of sorted values."""
+    index = max(0, min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1))
+    return values[index]
+
+
+def summarize(records) -> Dict[str, Any]:
+    """
+    Return per-phase durations, per-project total durations and the count of
+    each config source over the records.
+    """
+    phases: Dict[str, List[float]] = {}
+    projects: Dict[str, List[float]] = {}
+    sources: Dict[str, int] = {}
+
+    for record in records:
+        for name, duration in record.get("phases", {}).items():
+            phases.setdefault(name, []).append(duration)
+        phases.setdefault("total", []).append(record.get("total", 0))
+        projects.setdefault(record.get("path", "?"), []).append(record.get("total", 0))
+        source = record.get("source", "?")
+        sources[source] = sources.get(source, 0) + 1
+
+    return {"phases": phases, "projects": projects, "sources": sources}
+
+
+def format_stats(summary: Dict[str, Any]) -> List[str]:
+    phases = summary["phases"]
+    if not phases:
+        return ["No history yet"]
+
+    count = len(phases["total"])
+    lines = [f"{count} invocations", ""]
+    lines.append(f"{'phase':<10} {'p50':>8} {'p90':>8} {'p99':>8}  (ms)")
+    for name in sorted(phases, key=lambda name: name == "total"):
+        values = sorted(phases[name])
+        lines.append(
+            f"{name:<10} {percentile(values, 50):8.1f} "
+            f"{percentile(values, 90):8.1f} {percentile(values, 99):8.1f}"
+        )
+
+    lines += ["", "config source:"]
+    for source, n in sorted(summary["sources"].items(), key=lambda item: -item[1]):
+        lines.append(f"  {source:<11} {n:6d} ({n / count:.0%})")
+
+    slowest = sorted(
+        (
+            (percentile(sorted(totals), 50), len(totals), path)
+            for path, totals in summary["projects"].items()
+        ),
+        reverse=True,
+    )[:SLOWEST_PROJECTS]
+    lines += ["", "slowest projects (median total ms, opens):"]
+    for median, n, path in slowest:
+        lines.append(f"  {median:8.1f} {n:5d}  {path}")
+
+    return lines
@@ -0,0 +1,415 @@
+import array
+import contextlib
+import fcntl
+import itertools
+import mmap
+import operator
+import os
+import re
+import struct
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .config import get_cache_dir
+
+# The index is three files. The blob holds the candidate paths as UTF-8, each
+# followed by a newline, in entry order, so that runs of it can be fed to fzf
+# as they are. The entries file holds a header and a packed array of fixed
+# size entries pointing into the blob. Both files only grow until they are
+# compacted. The rank file holds the live candidates in zoxide's order, as
+# runs of consecutive entries, and is replaced whenever that order changes.
+#
+# Header: magic, version, id of the blob the entries point into
+# Entry: blob offset, length including the newline, flags
+# Rank header: blob id and entry count it was written for, then uint32 pairs
+# of first entry and number of entries
+HEADER = struct.Struct("<4sIQ")
+ENTRY = struct.Struct("<QIB3x")
+FLAGS_OFFSET = 12
+BLOB_HEADER = struct.Struct("<Q")
+RANK_HEADER = struct.Struct("<QQ")
+MAGIC = b"TBIX"
+VERSION = 1
+
+FLAG_DELETED = 0x01
+# Project type, once known
+FLAG_WORKSPACE = 0x02
+FLAG_SINGLE = 0x04
+# Whether tmux-bro last saw a session running for the project
+FLAG_SESSION = 0x08
+TYPE_FLAGS = FLAG_WORKSPACE | FLAG_SINGLE
+
+# Matches the flag bytes of deleted entries, to find them without a loop
+_DELETED_FLAGS = re.compile(
+    b"[" + re.escape(bytes(b for b in range(256) if b & FLAG_DELETED)) + b"]"
+)
+
+# Deleted entries are dropped once they make up this share of the index
+COMPACT_RATIO = 0.5
+CHUNK_SIZE = 256 * 1024
+# The most slices a single writev takes
+IOV_MAX = os.sysconf("SC_IOV_MAX") if "SC_IOV_MAX" in os.sysconf_names else 1024
+
+
+def get_index_dir() -> str:
+    return os.path.join(get_cache_dir(), "index")
+
+
+class CandidateIndex:
+    """
+    A memory-mapped index of picker candidates with per-entry flags. Updates
+    append to the files and flip flags in place instead of rewriting them.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or get_index_dir()
+        self.entries_path = os.path.join(self.directory, "candidates.idx")
+        self.blob_path = os.path.join(self.directory, "candidates.blob")
+        self.rank_path = os.path.join(self.directory, "candidates.rank")
+        self.lock_path = os.path.join(self.directory, "candidates.lock")
+        self.entries_map: Optional[mmap.mmap] = None
+        self.blob_map: Optional[mmap.mmap] = None
+        self.count = 0
+        self.rank: Optional[array.array] = None
+        self.load()
+
+    def _map(self, path: str) -> Optional[mmap.mmap]:
+        try:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return None
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+    def load(self) -> None:
+        """Map the index files, treating missing or mismatched files as empty."""
+        self.close()
+        entries_map = self._map(self.entries_path)
+        blob_map = self._map(self.blob_path)
+        valid = (
+            entries_map is not None
+            and blob_map is not None
+            and len(entries_map) >= HEADER.size
+            and len(blob_map) >= BLOB_HEADER.size
+            # A compaction in another process may have replaced only one file
+            and HEADER.unpack_from(entries_map)
+            == (MAGIC, VERSION, BLOB_HEADER.unpack_from(blob_map)[0])
+        )
+        count = (len(entries_map) - HEADER.size) // ENTRY.size if valid else 0
+        if valid and count and self._end(entries_map, count) > len(blob_map):
+            valid = False
+
+        if not valid:
+            for mapped in (entries_map, blob_map):
+                if mapped is not None:
+                    mapped.close()
+            return
+
+        self.entries_map = entries_map
+        self.blob_map = blob_map
+        self.count = count
+        self.rank = self._load_rank()
+
+    def _load_rank(self) -> Optional[array.array]:
+        """
+        Read the rank, or None when it was written for another version of
+        the index, in which case candidates are in entry order.
+        """
+        try:
+            with open(self.rank_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) < RANK_HEADER.size:
+            return None
+        blob_id = HEADER.unpack_from(self.entries_map)[2]
+        if RANK_HEADER.unpack_from(data) != (blob_id, self.count):
+            return None
+        rank = array.array("I")
+        try:
+            rank.frombytes(data[RANK_HEADER.size :])
+        except ValueError:
+            return None
+        if len(rank) % 2 or (
+            rank and max(map(operator.add, rank[::2], rank[1::2])) > self.count
+        ):
+            return None
+        return rank
+
+    def close(self) -> None:
+        for mapped in (self.entries_map, self.blob_map):
+            if mapped is not None:
+                mapped.close()
+        self.entries_map = self.blob_map = None
+        self.count = 0
+        self.rank = None
+
+    @staticmethod
+    def _end(entries_map, count: int) -> int:
+        """Return the blob offset just past the last entry."""
+        if not count:
+            return BLOB_HEADER.size
+        offset, length, _ = ENTRY.unpack_from(
+            entries_map, HEADER.size + (count - 1) * ENTRY.size
+        )
+        return offset + length
+
+    def _entry(self, i: int):
+        return ENTRY.unpack_from(self.entries_map, HEADER.size + i * ENTRY.size)
+
+    def _flags(self) -> bytes:
+        """Return the flags byte of every entry."""
+        if not self.count:
+            return b""
+        start = HEADER.size + FLAGS_OFFSET
+        return self.entries_map[start :: ENTRY.size][: self.count]
+
+    def _lines(self) -> List[bytes]:
+        """Return the path of every entry, deleted ones included."""
+        if not self.count:
+            return []
+        end = self._end(self.entries_map, self.count)
+        return self.blob_map[BLOB_HEADER.size : end].split(b"\n")[:-1]
+
+    def _order(self) -> Iterable[int]:
+        """Return the entry numbers in ranked order."""
+        if self.rank is None:
+            return range(self.count)
+        return itertools.chain.from_iterable(
+            range(first, first + number)
+            for first, number in zip(self.rank[::2], self.rank[1::2])
+        )
+
+    def paths(self, exclude_flags: int = 0) -> List[str]:
+        """
+        Return the live paths in ranked order, skipping entries with any of
+        exclude_flags.
+        """
+        exclude_flags |= FLAG_DELETED
+        lines = self._lines()
+        flags = self._flags()
+        return [
+            os.fsdecode(lines[i]) for i in self._order() if not flags[i] & exclude_flags
+        ]
+
+    def _positions(self) -> Dict[bytes, int]:
+        return {
+            line: i
+            for i, (line, flags) in enumerate(zip(self._lines(), self._flags()))
+            if not flags & FLAG_DELETED
+        }
+
+    def _find(self, key: bytes) -> Optional[int]:
+        """Return the number of the live entry for key, searching the blob."""
+        start = BLOB_HEADER.size
+        end = self._end(self.entries_map, self.count)
+        line = key + b"\n"
+        # Matches before the first line are ruled out by the entry lookup
+        offset = start if self.blob_map[start : start + len(line)] == line else -1
+        while True:
+            if offset < 0:
+                offset = self.blob_map.find(b"\n" + line, start, end)
+                if offset < 0:
+                    return None
+                offset += 1
+            i = self._entry_at(offset)
+            if i is not None and not self._entry(i)[2] & FLAG_DELETED:
+                return i
+            start, offset = offset, -1
+
+    def _entry_at(self, offset: int) -> Optional[int]:
+        """Return the number of the entry starting at a blob offset."""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._entry(middle)[0] < offset:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and self._entry(low)[0] == offset:
+            return low
+        return None
+
+    def flags(self, path: str) -> int:
+        """Return the flags of a path's entry, or 0 if it isn't in the index."""
+        i = self._find(os.fsencode(path)) if self.count else None
+        return 0 if i is None else self._entry(i)[2]
+
+    def _runs(self) -> Iterable[Tuple[int, int]]:
+        """
+        Yield the blob ranges of the live entries in ranked order, with
+        entries that follow each other in the blob merged into one range.
+        """
+        if self.rank is None:
+            # Entry order, so only deleted entries break up the blob
+            start = BLOB_HEADER.size
+            for match in _DELETED_FLAGS.finditer(self._flags()):
+                offset, length, _ = self._entry(match.start())
+                if offset > start:
+                    yield start, offset
+                start = offset + length
+            end = self._end(self.entries_map, self.count)
+            if end > start:
+                yield start, end
+            return
+
+        for first, number in zip(self.rank[::2], self.rank[1::2]):
+            offset, _, _ = self._entry(first)
+            last_offset, length, _ = self._entry(first + number - 1)
+            yield offset, last_offset + length
+
+    def write_to(self, fd: int) -> None:
+        """
+        Write the live paths to a file descriptor, one per line and in
+        ranked order, straight from the mapped blob: the runs of it are
+        handed to writev as they are, without being copied.
+        """
+        if not self.count:
+            return
+
+        view = memoryview(self.blob_map)
+        pending: List[memoryview] = []
+        size = 0
+        try:
+            for start, end in self._runs():
+                pending.append(view[start:end])
+                size += end - start
+                if size >= CHUNK_SIZE or len(pending) >= IOV_MAX:
+                    _writev_all(fd, pending)
+                    size = 0
+            _writev_all(fd, pending)
+        finally:
+            # The mmap can't be closed while slices of it are around
+            pending.clear()
+            view.release()
+
+    def update(self, directories: Iterable[str]) -> List[str]:
+        """
+        Bring the index in line with freshly discovered directories: append
+        new ones, flag the ones that are gone as deleted and rank them all in
+        the order given. Returns the directories that were added.
+        """
+        with self._lock():
+            positions = self._positions()
+            wanted = {}
+            for directory in directories:
+                wanted.setdefault(os.fsencode(directory), directory)
+
+            added = [key for key in wanted if key not in positions]
+            removed = [i for key, i in positions.items() if key not in wanted]
+
+            dead = self.count - (len(positions) - len(removed))
+            too_sparse = dead > COMPACT_RATIO * (self.count + len(added))
+            if not self.count or too_sparse:
+                self._rewrite(list(wanted))
+                numbers = {key: i for i, key in enumerate(wanted)}
+            else:
+                for i in removed:
+                    self._write_flags(i, FLAG_DELETED, 0)
+                self._append(added)
+                numbers = dict(positions)
+                numbers.update((key, self.count + i) for i, key in enumerate(added))
+            self.load()
+
+            rank = _runs_of(numbers[key] for key in wanted)
+            if rank != self.rank:
+                self._write_rank(rank)
+                self.rank = rank
+        return [wanted[key] for key in added]
+
+    def set_flags(self, path: str, set_flags: int = 0, clear_flags: int = 0) -> None:
+        """
+        Clear and then set flags of a path's entry, if it is in the index.
+        """
+        with self._lock():
+            i = self._find(os.fsencode(path)) if self.count else None
+            if i is not None:
+                self._write_flags(i, set_flags, clear_flags)
+                self.load()
+
+    @contextlib.contextmanager
+    def _lock(self):
+        """Hold the index lock, with the files mapped as they are now."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.lock_path, "ab") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self.load()
+            yield
+
+    def _write_flags(self, i: int, set_flags: int, clear_flags: int) -> None:
+        flags = self._entry(i)[2]
+        with open(self.entries_path, "r+b") as f:
+            f.seek(HEADER.size + i * ENTRY.size + FLAGS_OFFSET)
+            f.write(bytes([flags & ~clear_flags | set_flags]))
+
+    def _append(self, keys: List[bytes]) -> None:
+        if not keys:
+            return
+
+        offset = self._end(self.entries_map, self.count)
+        entries = bytearray()
+        for key in keys:
+            entries += ENTRY.pack(offset, len(key) + 1, 0)
+            offset += len(key) + 1
+
+        with open(self.blob_path, "r+b") as blob:
+            # Drop whatever an interrupted append left past the last entry,
+            # so that blob lines stay in entry order
+            blob.seek(self._end(self.entries_map, self.count))
+            blob.truncate()
+            blob.write(b"".join(key + b"\n" for key in keys))
+        with open(self.entries_path, "ab") as f:
+            f.write(entries)
+
+    def _write_rank(self, rank: array.array) -> None:
+        if self.entries_map is None:
+            return
+        blob_id = HEADER.unpack_from(self.entries_map)[2]
+        tmp_path = f"{self.rank_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(RANK_HEADER.pack(blob_id, self.count))
+            f.write(rank.tobytes())
+        os.replace(tmp_path, self.rank_path)
+
+    def _rewrite(self, keys: List[bytes]) -> None:
+        """Write a fresh pair of files, keeping the flags of known entries."""
+        known = dict(zip(self._lines(), self._flags()))
+
+        blob_id = int.from_bytes(os.urandom(8), "little")
+        blob = bytearray(BLOB_HEADER.pack(blob_id))
+        entries = bytearray(HEADER.pack(MAGIC, VERSION, blob_id))
+        for key in keys:
+            flags = known.get(key, 0) & ~FLAG_DELETED
+            entries += ENTRY.pack(len(blob), len(key) + 1, flags)
+            blob += key + b"\n"
+
+        self.close()
+        for path, data in ((self.blob_path, blob), (self.entries_path, entries)):
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+
+def _runs_of(numbers: Iterable[int]) -> array.array:
+    """Return entry numbers as pairs of first entry and run length."""
+    runs = array.array("I")
+    for number in numbers:
+        if runs and runs[-2] + runs[-1] == number:
+            runs[-1] += 1
+        else:
+            runs.extend((number, 1))
+    return runs
+
+
+def _writev_all(fd: int, buffers: List[memoryview]) -> None:
+    """Write all of the buffers, emptying the list."""
+    start = 0
+    while start < len(buffers):
+        written = os.writev(fd, buffers[start : start + IOV_MAX])
+        while written and written >= len(buffers[start]):
+            written -= len(buffers[start])
+            start += 1
+        if written:
+            buffers[start] = buffers[start][written:]
+    buffers.clear()
@@ -0,0 +1,249 @@
+"""
+Compute the tmux layout string of a window's final layout, so that a window
+can be split into all of its panes and then laid out once with select-layout,
+instead of being laid out again after every split.
+
+The preset layouts are computed the way tmux computes them (layout-set.c),
+so that the result is the same as `select-layout <name>` would give for the
+window's size and pane count.
+"""
+
+from typing import Dict, List, Optional
+
+# The smallest width or height of a pane, as in tmux
+PANE_MINIMUM = 1
+
+LEAF, LEFT_RIGHT, TOP_BOTTOM = "leaf", "left-right", "top-bottom"
+
+
+class _Cell:
+    def __init__(self, sx: int, sy: int, kind: str = LEAF):
+        self.sx = sx
+        self.sy = sy
+        self.kind = kind
+        self.x = 0
+        self.y = 0
+        self.cells: List["_Cell"] = []
+
+    def add(self, sx: int, sy: int, kind: str = LEAF) -> "_Cell":
+        cell = _Cell(sx, sy, kind)
+        self.cells.append(cell)
+        return cell
+
+
+def _resize_adjust(cell: _Cell, kind: str, change: int) -> None:
+    if kind == LEFT_RIGHT:
+        cell.sx += change
+    else:
+        cell.sy += change
+    if cell.kind == LEAF:
+        return
+    if cell.kind != kind:
+        for child in cell.cells:
+            _resize_adjust(child, kind, change)
+        return
+    # Only growing is needed by the preset layouts
+    while change > 0:
+        for child in cell.cells:
+            if change == 0:
+                break
+            _resize_adjust(child, kind, 1)
+            change -= 1
+
+
+def _spread(cell: _Cell) -> None:
+    """Give the children of a cell equal sizes, the last one the remainder."""
+    number = len(cell.cells)
+    size = cell.sx if cell.kind == LEFT_RIGHT else cell.sy
+    if number <= 1 or size < number - 1:
+        return
+    each = (size - (number - 1)) // number
+    if each == 0:
+        return
+    for i, child in enumerate(cell.cells):
+        if i == number - 1:
+            each = size - (each + 1) * (number - 1)
+        current = child.sx if cell.kind == LEFT_RIGHT else child.sy
+        _resize_adjust(child, cell.kind, each - current)
+
+
+def _fix_offsets(cell: _Cell) -> None:
+    offset = cell.x if cell.kind == LEFT_RIGHT else cell.y
+    for child in cell.cells:
+        if cell.kind == LEFT_RIGHT:
+            child.x, child.y = offset, cell.y
+            offset += child.sx + 1
+        else:
+            child.x, child.y = cell.x, offset
+            offset += child.sy + 1
+        _fix_offsets(child)
+
+
+def _percentage(value, size: int) -> Optional[int]:
+    """Parse a main-pane-width or -height option, "80" or "50%"."""
+    value = str(value).strip()
+    try:
+        if value.endswith("%"):
+            percent = int(value[:-1])
+            if not 0 <= percent <= 100:
+                return None
+            return size * percent // 100
+        number = int(value)
+    except ValueError:
+        return None
+    return number if 0 <= number <= size else None
+
+
+def _even(kind: str, panes: int, width: int, height: int) -> _Cell:
+    if kind == LEFT_RIGHT:
+        root = _Cell(max(panes * (PANE_MINIMUM + 1) - 1, width), height, kind)
+    else:
+        root = _Cell(width, max(panes * (PANE_MINIMUM + 1) - 1, height), kind)
+    for _ in range(panes):
+        root.add(width, height)
+    _spread(root)
+    return root
+
+
+def _main(kind: str, panes: int, width: int, height: int, main_size) -> _Cell:
+    """
+    main-vertical (kind LEFT_RIGHT) or main-horizontal (TOP_BOTTOM): the main
+    pane takes main_size of the window and the others share the rest.
+    """
+    other_kind = TOP_BOTTOM if kind == LEFT_RIGHT else LEFT_RIGHT
+    others = panes - 1
+    # One line or column goes to the border between the main pane and others
+    size = (width if kind == LEFT_RIGHT else height) - 1
+    main = _percentage(main_size, size)
+    if main is None:
+        main = 80 if kind == LEFT_RIGHT else 24
+    # The other panes keep at least the minimum size
+    main = min(main, size - PANE_MINIMUM)
+    other = size - main
+    across = max(
+        others * (PANE_MINIMUM + 1) - 1, height if kind == LEFT_RIGHT else width
+    )
+
+    if kind == LEFT_RIGHT:
+        root = _Cell(main + other + 1, across, kind)
+        root.add(main, across)
+        if others == 1:
+            root.add(other, across)
+        else:
+            rest = root.add(other, across, other_kind)
+            for _ in range(others):
+                rest.add(other, PANE_MINIMUM)
+            _spread(rest)
+    else:
+        root = _Cell(across, main + other + 1, kind)
+        root.add(across, main)
+        if others == 1:
+            root.add(across, other)
+        else:
+            rest = root.add(across, other, other_kind)
+            for _ in range(others):
+                rest.add(PANE_MINIMUM, other)
+            _spread(rest)
+    return root
+
+
+def _tiled(panes: int, width: int, height: int) -> _Cell:
+    rows = columns = 1
+    while rows * columns < panes:
+        rows += 1
+        if rows * columns < panes:
+            columns += 1
+
+    cell_width = max((width - (columns - 1)) // columns, PANE_MINIMUM)
+    cell_height = max((height - (rows - 1)) // rows, PANE_MINIMUM)
+    root = _Cell(
+        max((cell_width + 1) * columns - 1, width),
+        max((cell_height + 1) * rows - 1, height),
+        TOP_BOTTOM,
+    )
+
+    placed = 0
+    for j in range(rows):
+        if placed == panes:
+            break
+        if panes - j * columns == 1 or columns == 1:
+            root.add(width, cell_height)
+            placed += 1
+            continue
+        row = root.add(width, cell_height, LEFT_RIGHT)
+        for _ in range(columns):
+            row.add(cell_width, cell_height)
+            placed += 1
+            if placed == panes:
+                break
+        used = len(row.cells) * (cell_width + 1) - 1
+        if width > used:
+            _resize_adjust(row.cells[-1], LEFT_RIGHT, width - used)
+
+    used = rows * cell_height + rows - 1
+    if height > used:
+        _resize_adjust(root.cells[-1], TOP_BOTTOM, height - used)
+    return root
+
+
+def _dump(cell: _Cell, pane_ids: List[int]) -> str:
+    text = f"{cell.sx}x{cell.sy},{cell.x},{cell.y}"
+    if cell.kind == LEAF:
+        return f"{text},{pane_ids.pop(0)}"
+    children = ",".join(_dump(child, pane_ids) for child in cell.cells)
+    if cell.kind == LEFT_RIGHT:
+        return f"{text}{{{children}}}"
+    return f"{text}[{children}]"
+
+
+def layout_checksum(layout: str) -> str:
+    """The checksum tmux expects in front of a layout string."""
+    checksum = 0
+    for char in layout.encode():
+        checksum = (checksum >> 1) + ((checksum & 1) << 15)
+        checksum = (checksum + char) & 0xFFFF
+    return f"{checksum:04x}"
+
+
+def layout_string(
+    layout: str,
+    panes: int,
+    width: int,
+    height: int,
+    options: Optional[Dict[str, str]] = None,
+) -> Optional[str]:
+    """
+    Return the tmux layout string that lays out a window of width x height
+    with the given number of panes in the named preset layout, sized by the
+    main-pane-width and main-pane-height window options. Returns None for
+    layouts other than the presets, or when the panes don't fit the window.
+    """
+    options = options or {}
+    if panes < 1 or width < PANE_MINIMUM or height < PANE_MINIMUM:
+        return None
+    if panes == 1:
+        root = _Cell(width, height)
+    elif layout == "even-horizontal":
+        root = _even(LEFT_RIGHT, panes, width, height)
+    elif layout == "even-vertical":
+        root = _even(TOP_BOTTOM, panes, width, height)
+    elif layout == "main-vertical":
+        root = _main(
+            LEFT_RIGHT, panes, width, height, options.get("main-pane-width", 80)
+        )
+    elif layout == "main-horizontal":
+        root = _main(
+            TOP_BOTTOM, panes, width, height, options.get("main-pane-height", 24)
+        )
+    elif layout == "tiled":
+        root = _tiled(panes, width, height)
+    else:
+        return None
+
+    # Larger than the window means that tmux would have to clip the layout
+    if root.sx > width or root.sy > height:
+        return None
+    _fix_offsets(root)
+    # tmux assigns panes to the cells in order and ignores these ids
+    body = _dump(root, list(range(panes)))
+    return f"{layout_checksum(body)},{body}"
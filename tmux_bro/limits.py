@@ -0,0 +1,101 @@
+import functools
+import os
+import re
+import shlex
+import shutil
+from typing import Any, Dict, Optional
+
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+IONICE_CLASSES = {"realtime": 1, "best-effort": 2, "idle": 3}
+
+
+def get_dev_limits(
+    global_config: Dict[str, Any],
+    project_config: Dict[str, Any],
+    package_name: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Merge the `dev_limits` of the global config, the project config and the
+    package's entry under `packages`, later ones overriding single keys.
+    """
+    limits = dict(global_config.get("dev_limits") or {})
+    limits.update(project_config.get("dev_limits") or {})
+    if package_name is not None:
+        package_config = project_config.get("packages", {}).get(package_name, {})
+        limits.update(package_config.get("dev_limits") or {})
+    return limits
+
+
+def parse_size(value) -> int:
+    """Parse a memory size such as 2G, 512M or a plain number of bytes."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?\s*", str(value), re.I)
+    if not match:
+        raise ValueError(f"Invalid memory size: {value}")
+    number, unit = match.groups()
+    return int(float(number) * SIZE_UNITS[unit.upper()])
+
+
+def parse_cpu(value) -> int:
+    """Parse a CPU limit such as 150% or 1.5 (CPUs) into a percentage."""
+    text = str(value).strip()
+    if text.endswith("%"):
+        return int(float(text[:-1]))
+    return int(float(text) * 100)
+
+
+@functools.lru_cache(maxsize=None)
+def has_user_systemd() -> bool:
+    """
+    Check that systemd-run can create scopes in the user's service manager,
+    without starting a process: the binary must exist and the manager's
+    private socket must be there.
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    return bool(
+        shutil.which("systemd-run")
+        and runtime_dir
+        and os.path.exists(os.path.join(runtime_dir, "systemd", "private"))
+    )
+
+
+def wrap_dev_command(cmd: str, limits: Dict[str, Any]) -> str:
+    """
+    Return a shell command that runs cmd with the given limits. Memory and
+    CPU limits are applied by a transient systemd scope (a cgroup) when the
+    user's systemd is available. Without it, memory is limited with
+    `ulimit -d` and the CPU limit is dropped, leaving only the nice level to
+    keep the command from starving the editor.
+    """
+    if not limits:
+        return cmd
+
+    prefix = []
+    shell_cmd = cmd
+    memory = limits.get("memory")
+    cpu = limits.get("cpu")
+
+    if (memory is not None or cpu is not None) and has_user_systemd():
+        prefix += ["systemd-run", "--user", "--scope", "--quiet", "--collect"]
+        if memory is not None:
+            prefix += ["-p", f"MemoryMax={parse_size(memory)}"]
+        if cpu is not None:
+            prefix += ["-p", f"CPUQuota={parse_cpu(cpu)}%"]
+    elif memory is not None:
+        shell_cmd = f"ulimit -d {parse_size(memory) // 1024}; {cmd}"
+
+    if limits.get("nice") is not None:
+        prefix += ["nice", "-n", str(int(limits["nice"]))]
+
+    ionice = limits.get("ionice")
+    if ionice is not None and shutil.which("ionice"):
+        io_class, _, level = str(ionice).partition(":")
+        if io_class not in IONICE_CLASSES:
+            raise ValueError(f"Invalid ionice class: {io_class}")
+        prefix += ["ionice", "-c", str(IONICE_CLASSES[io_class])]
+        if level:
+            prefix += ["-n", level]
+
+    if not prefix and shell_cmd == cmd:
+        return cmd
+    # Always in a child shell, so that ulimit doesn't stick to the pane's shell
+    return " ".join(prefix + ["sh", "-c", shlex.quote(shell_cmd)])
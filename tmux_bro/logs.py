@@ -0,0 +1,74 @@
+import os
+import shlex
+from typing import Any, Dict
+
+from .config import get_cache_dir
+from .limits import parse_size
+
+DEFAULT_LOG_MAX_SIZE = "10M"
+DEFAULT_LOG_KEEP = 3
+
+# How often, in seconds, the size of a dev log is checked
+LOG_CHECK_INTERVAL = 10
+
+# Copies stdin to $log with cat, which writes output as it comes. The log is
+# checked every $every seconds, and once the pane closes, and rotated once it
+# has reached $max bytes: the older logs are shifted up by one, the one past
+# $keep is dropped, and the log is copied to $log.1, or $log.1.gz with
+# $compress, and truncated. Plain sh run by pipe-pane itself, so that a dev
+# pane's logging costs a few small processes instead of a Python interpreter.
+# Kept on one line, as commands sent through a control mode client can't span
+# lines.
+LOG_SCRIPT = (
+    'mkdir -p "$(dirname "$log")" || exit 1; '
+    "rotate() { "
+    '[ -f "$log" ] && [ "$(($(wc -c < "$log")))" -ge "$max" ] || return 0; '
+    "n=$keep; "
+    'while [ "$n" -gt 0 ]; do '
+    "for s in '' .gz; do "
+    '[ -e "$log.$n$s" ] || continue; '
+    'if [ "$n" -eq "$keep" ]; then rm -f "$log.$n$s"; '
+    'else mv -f "$log.$n$s" "$log.$((n + 1))$s"; fi; '
+    "done; "
+    "n=$((n - 1)); "
+    "done; "
+    'if [ "$keep" -lt 1 ]; then :; '
+    'elif [ "$compress" = 1 ]; then gzip -c "$log" > "$log.1.gz"; '
+    'else cp "$log" "$log.1"; fi; '
+    # cat appends, so it carries on from the start of the truncated log
+    ': > "$log"; '
+    "}; "
+    "rotate; "
+    '(while sleep "$every" && kill -0 $$ 2>/dev/null; do rotate; done) & '
+    "rotator=$!; "
+    'cat >> "$log"; '
+    'kill "$rotator" 2>/dev/null; '
+    'wait "$rotator"; '
+    "rotate"
+)
+
+
+def get_log_dir() -> str:
+    return os.path.join(get_cache_dir(), "logs")
+
+
+def get_log_path(session_name: str, package: str) -> str:
+    return os.path.join(get_log_dir(), session_name, package, "dev.log")
+
+
+def get_log_command(session_name: str, package: str, options: Dict[str, Any]) -> str:
+    """
+    Return the pipe-pane command that writes a dev pane's output to its log
+    file. options is the `dev_log` config, or True for the defaults.
+    """
+    if not isinstance(options, dict):
+        options = {}
+    variables = {
+        "log": get_log_path(session_name, package),
+        "max": str(max(parse_size(options.get("max_size", DEFAULT_LOG_MAX_SIZE)), 1)),
+        "keep": str(int(options.get("keep", DEFAULT_LOG_KEEP))),
+        "compress": "1" if options.get("compress", False) else "0",
+        "every": str(LOG_CHECK_INTERVAL),
+    }
+    assignments = " ".join(f"{k}={shlex.quote(v)}" for k, v in variables.items())
+    return f"{assignments}; {LOG_SCRIPT}"
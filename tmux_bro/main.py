@@ -1,35 +1,376 @@
+import argparse
 import sys
 import os
+import subprocess
+import time
+from libtmux import Server
 from . import tmux
 from .fuzzy import run_fuzzy_finder
+from .config import load_global_config, load_project_config
+from .history import PhaseTimer, append_history, format_stats, read_history, summarize
+from .index import (
+    FLAG_SESSION,
+    FLAG_SINGLE,
+    FLAG_WORKSPACE,
+    TYPE_FLAGS,
+    CandidateIndex,
+)
+from .prefetch import Prefetcher
+from .preview import write_preview_record
+from .reclaim import (
+    DEFAULT_GC_IDLE,
+    DEFAULT_GC_MODE,
+    GC_MODES,
+    find_idle_sessions,
+    format_report,
+    reclaim_session,
+)
+from .snapshot import is_snapshot_valid, load_snapshot, save_snapshot
+from .speculate import ConfigSpeculator
+from .units import parse_duration
+from .watch import spawn_watcher, watch_workspace
+from .workspace import detect_workspace_type
 
 
-def main():
-    selected_dir = run_fuzzy_finder()
+def open_project():
+    # The tmux server is started and the control client connected while the
+    # picker is open
+    with Prefetcher() as prefetcher:
+        return _open_project(prefetcher)
+
+
+def _open_project(prefetcher):
+    global_config = load_global_config()
+    speculator = None
+    if global_config.get("speculate", True):
+        speculator = ConfigSpeculator(tmux.build_session_config)
+    selected_dir = run_fuzzy_finder(speculator)
 
     if selected_dir and isinstance(selected_dir, str):
-        session_name = os.path.basename(selected_dir)
-        existing_session = tmux.find_tmux_session(session_name)
+        timer = PhaseTimer()
+
+        # Lookups, tagging and switching go through one control mode client
+        # instead of a tmux process per command
+        with timer.phase("lookup"):
+            session_name = tmux.get_session_name(selected_dir)
+            runner = prefetcher.wait()
+            existing_session = tmux.find_tmux_session(session_name, runner)
 
+        session_config, source, complete = None, "running", False
         if existing_session:
-            session = existing_session
+            # A running session is switched to right away and reconciled in
+            # the background, which also refreshes its preview. Started first,
+            # as attaching outside tmux only returns once the client detaches
+            tmux.spawn_sync(selected_dir, session_name)
         else:
-            session_config = tmux.build_session_config(selected_dir)
-            session = tmux.create_tmux_session(session_config)
-
-        if "TMUX" in os.environ:
-            # If we're already in a tmux session, switch client
-            tmux_env = os.environ.pop("TMUX")
-            session.switch_client()
-            os.environ["TMUX"] = tmux_env
-        else:
-            # Otherwise attach to the new session
-            session.attach_session()
+            # When detection runs out of time, the session is opened from a
+            # fallback config and a background process reconciles it
+            # afterwards
+            with timer.phase("detect"):
+                session_config, source = tmux.detect_session_config(
+                    selected_dir, speculator
+                )
+            complete = source in ("speculated", "detected")
+            with timer.phase("build"):
+                tmux.build_tmux_session(session_config, selected_dir, runner=runner)
+            if complete:
+                save_snapshot(selected_dir, session_config)
+                if _watch_enabled(selected_dir):
+                    spawn_watcher(selected_dir, session_name)
+            else:
+                tmux.spawn_sync(selected_dir, session_name, new_session=True)
+
+        with timer.phase("switch"):
+            prefetcher.release()
+            tmux.switch_to_tmux_session(session_name, prefetcher.client)
+
+        # Without finished detection the workspace type isn't known
+        workspace_type, package_count = None, 0
+        if complete:
+            with timer.phase("preview"):
+                workspace = detect_workspace_type(selected_dir)
+                write_preview_record(selected_dir, workspace)
+            workspace_type, package_count = (
+                (workspace[0], len(workspace[1])) if workspace else ("single", 0)
+            )
+        _flag_candidate(selected_dir, workspace_type)
+
+        if global_config.get("history", True):
+            append_history(
+                {
+                    "time": int(time.time()),
+                    "path": selected_dir,
+                    "type": workspace_type,
+                    "windows": session_config and len(session_config["windows"]),
+                    "packages": package_count,
+                    "existing": existing_session is not None,
+                    "source": source,
+                    "phases": timer.phases,
+                    "total": timer.total(),
+                }
+            )
     else:
         print("No directory was selected", file=sys.stderr)
         return 1
     return 0
 
 
+def _flag_candidate(directory, workspace_type=None):
+    """Record the project's type and running session in the candidate index."""
+    set_flags, clear_flags = FLAG_SESSION, 0
+    if workspace_type is not None:
+        set_flags |= FLAG_SINGLE if workspace_type == "single" else FLAG_WORKSPACE
+        clear_flags = TYPE_FLAGS
+    try:
+        CandidateIndex().set_flags(directory, set_flags, clear_flags)
+    except OSError:
+        pass
+
+
+def _watch_enabled(directory):
+    project_config = load_project_config(directory)
+    return project_config.get("watch", load_global_config().get("watch", False))
+
+
+def sync(directory, session_name, new_session=False):
+    """
+    Reconcile a project's running session with its workspace. A new session
+    that was built from a fallback config is reconciled even with
+    `reconcile: false`, and its stand-in windows are replaced.
+    """
+    session = tmux.find_tmux_session(session_name)
+    if session is None:
+        print(f"Error: no session named {session_name}", file=sys.stderr)
+        return 1
+    if not new_session and not tmux.reconcile_enabled(directory):
+        write_preview_record(directory)
+        return 0
+
+    config = tmux.build_session_config(directory)
+    if new_session:
+        tmux.replace_fallback_windows(session, config)
+        tmux.add_missing_dev_panes(session, config)
+        if _watch_enabled(directory):
+            spawn_watcher(directory, session_name)
+    else:
+        tmux.sync_tmux_session(session, directory, config=config)
+
+    save_snapshot(directory, config)
+    write_preview_record(directory)
+    return 0
+
+
+def _current_project():
+    """Return the project of the tmux session tmux-bro runs in, if any."""
+    if "TMUX" not in os.environ:
+        return None
+    try:
+        output = subprocess.run(
+            ["tmux", "display-message", "-p", f"#{{{tmux.SESSION_TAG}}}"],
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except OSError:
+        return None
+    return output or None
+
+
+def _pick(choices):
+    """Let the user pick one of the choices with fzf."""
+    try:
+        output = subprocess.run(
+            ["fzf", "--prompt", "package> "],
+            input="\n".join(choices) + "\n",
+            stdout=subprocess.PIPE,
+            text=True,
+        ).stdout.strip()
+    except OSError:
+        print("Error: fzf is not installed or not in PATH", file=sys.stderr)
+        return None
+    return output or None
+
+
+def packages(directory):
+    """
+    Pick a package of the project whose window isn't open in its session,
+    e.g. one left out by adaptive_windows, and open its window.
+    """
+    session_name = tmux.get_session_name(directory)
+    session = tmux.find_tmux_session(session_name)
+    if session is None:
+        print(f"Error: no session named {session_name}", file=sys.stderr)
+        return 1
+
+    # The snapshot has the config of every package window without detection
+    snapshot = load_snapshot(directory)
+    if snapshot is not None and is_snapshot_valid(snapshot):
+        config = snapshot["config"]
+    else:
+        config = tmux.build_session_config(directory)
+        save_snapshot(directory, config)
+
+    closed = {
+        os.path.relpath(window["start_directory"], directory): window
+        for window in tmux.get_closed_windows(session, config)
+    }
+    if not closed:
+        print("All package windows are open")
+        return 0
+
+    selected = _pick(sorted(closed))
+    if selected is None or selected not in closed:
+        return 1
+    tmux.open_window(session, config, closed[selected])
+    return 0
+
+
+def stats():
+    for line in format_stats(summarize(read_history())):
+        print(line)
+    return 0
+
+
+def gc(idle, mode, dry_run):
+    global_config = load_global_config()
+    try:
+        idle_seconds = parse_duration(
+            idle or global_config.get("gc_idle", DEFAULT_GC_IDLE)
+        )
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    mode = mode or global_config.get("gc_mode", DEFAULT_GC_MODE)
+
+    server = Server()
+    candidates = find_idle_sessions(server, idle_seconds, mode)
+    for line in format_report(candidates):
+        print(line)
+    if dry_run:
+        return 0
+
+    for candidate in candidates:
+        reclaim_session(server, candidate, mode)
+        if mode == "kill":
+            try:
+                CandidateIndex().set_flags(
+                    candidate["directory"], clear_flags=FLAG_SESSION
+                )
+            except OSError:
+                pass
+    if candidates:
+        action = "Killed" if mode == "kill" else "Stopped dev processes of"
+        plural = "s" if len(candidates) != 1 else ""
+        print(f"{action} {len(candidates)} session{plural}")
+    return 0
+
+
+def restore():
+    restored = tmux.restore_tmux_sessions()
+    for directory, session_name, from_snapshot in restored:
+        source = "snapshot" if from_snapshot else "rebuilt, manifests changed"
+        print(f"{session_name}: {directory} ({source})")
+    if not restored:
+        print("Nothing to restore")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="tmux-bro",
+        description="Pick a project and open a tmux session set up for it.",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser(
+        "restore",
+        help="recreate detached sessions for all projects that had one, "
+        "e.g. after the tmux server was restarted",
+    )
+    gc_parser = subparsers.add_parser(
+        "gc",
+        help="free memory used by tmux-bro sessions that haven't been used "
+        "for a while",
+    )
+    gc_parser.add_argument(
+        "--idle",
+        help=f"how long a session must be unused, e.g. 12h or 3d "
+        f"(default: {DEFAULT_GC_IDLE})",
+    )
+    gc_parser.add_argument(
+        "--mode",
+        choices=GC_MODES,
+        help="kill idle sessions, or only stop the processes in their dev "
+        f"panes (default: {DEFAULT_GC_MODE})",
+    )
+    gc_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="only report what would be reclaimed",
+    )
+    watch = subparsers.add_parser(
+        "watch",
+        help="keep a project's session in sync with its workspace until the "
+        "session is closed",
+    )
+    watch.add_argument("directory", nargs="?", default=os.getcwd())
+    watch.add_argument(
+        "--session", help="session name (default: derived from the directory)"
+    )
+    subparsers.add_parser(
+        "stats",
+        help="report how long opening projects takes, per phase, and the "
+        "slowest projects",
+    )
+    packages_parser = subparsers.add_parser(
+        "packages",
+        help="pick a package whose window isn't open in the project's session "
+        "and open it",
+    )
+    packages_parser.add_argument(
+        "directory",
+        nargs="?",
+        help="project directory (default: the project of the current session, "
+        "or the working directory)",
+    )
+    sync_parser = subparsers.add_parser(
+        "sync",
+        help="reconcile a project's running session with its workspace now",
+    )
+    sync_parser.add_argument("directory", nargs="?", default=os.getcwd())
+    sync_parser.add_argument(
+        "--session", help="session name (default: derived from the directory)"
+    )
+    sync_parser.add_argument(
+        "--new-session",
+        action="store_true",
+        help="the session was just built from a fallback config because "
+        "detection timed out: replace its stand-in windows",
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "restore":
+        return restore()
+    if args.command == "gc":
+        return gc(args.idle, args.mode, args.dry_run)
+    if args.command == "stats":
+        return stats()
+    if args.command == "packages":
+        return packages(
+            os.path.abspath(args.directory or _current_project() or os.getcwd())
+        )
+    if args.command == "sync":
+        directory = os.path.abspath(args.directory)
+        return sync(
+            directory,
+            args.session or tmux.get_session_name(directory),
+            args.new_session,
+        )
+    if args.command == "watch":
+        directory = os.path.abspath(args.directory)
+        return watch_workspace(
+            directory, args.session or tmux.get_session_name(directory)
+        )
+    return open_project()
+
+
 if __name__ == "__main__":
     sys.exit(main())
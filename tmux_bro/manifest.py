@@ -0,0 +1,119 @@
+"""
+Reading of the manifests workspace detection looks at. Files are read as
+bytes and checked for the names of the keys that are needed before anything
+is parsed, so that the common "not a workspace" and "no dev script" answers
+cost a read and a substring search. Files that may have them are parsed with
+the fastest parser available: orjson for JSON when installed, tomllib (or
+tomli) for TOML, and PyYAML's libyaml loader.
+"""
+
+from typing import Any, Dict, Iterable, Optional
+
+import yaml
+
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+    JSON_BACKEND = "orjson"
+except ImportError:
+    import json
+
+    _json_loads = json.loads
+    JSON_BACKEND = "json"
+
+try:
+    import tomllib
+
+    TOML_BACKEND = "tomllib"
+except ImportError:
+    try:
+        import tomli as tomllib
+
+        TOML_BACKEND = "tomli"
+    except ImportError:
+        tomllib = None
+        TOML_BACKEND = "toml"
+
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def _read(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _wanted(data: bytes, keys: Iterable[bytes], require: Iterable[bytes]) -> bool:
+    return any(key in data for key in keys) and all(r in data for r in require)
+
+
+def _pick(document, keys: Iterable[str]) -> Dict[str, Any]:
+    if not isinstance(document, dict):
+        return {}
+    return {key: document[key] for key in keys if key in document}
+
+
+def read_json_keys(
+    path: str, keys: Iterable[str], require: Iterable[str] = ()
+) -> Optional[Dict[str, Any]]:
+    """
+    Return the given top-level keys of a JSON file, leaving out missing ones.
+    The file is only parsed if one of keys and all of require appear in it
+    as quoted strings. Returns None if it can't be read or parsed.
+    """
+    keys = list(keys)
+    data = _read(path)
+    if data is None:
+        return None
+
+    quoted = [f'"{key}"'.encode() for key in keys]
+    if not _wanted(data, quoted, [f'"{r}"'.encode() for r in require]):
+        return {}
+    try:
+        return _pick(_json_loads(data), keys)
+    except ValueError:
+        return None
+
+
+def _toml_loads(data: bytes):
+    text = data.decode("utf-8")
+    if tomllib is not None:
+        return tomllib.loads(text)
+    import toml
+
+    return toml.loads(text)
+
+
+def read_toml_keys(
+    path: str, keys: Iterable[str], require: Iterable[str] = ()
+) -> Optional[Dict[str, Any]]:
+    """
+    Return the given top-level keys (tables) of a TOML file, leaving out
+    missing ones. The file is only parsed if one of keys and all of require
+    appear in it. Returns None if it can't be read or parsed.
+    """
+    keys = list(keys)
+    data = _read(path)
+    if data is None:
+        return None
+
+    if not _wanted(data, [k.encode() for k in keys], [r.encode() for r in require]):
+        return {}
+    try:
+        return _pick(_toml_loads(data), keys)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def read_yaml(path: str) -> Any:
+    """Parse a YAML file, returning None if it can't be read or parsed."""
+    data = _read(path)
+    if data is None:
+        return None
+    try:
+        return yaml.load(data, Loader=_YAML_LOADER)
+    except yaml.YAMLError:
+        return None
@@ -0,0 +1,104 @@
+import subprocess
+import threading
+from typing import Optional, Sequence
+
+from .control import ControlClient
+
+# Keeps a tmux server started while the picker is open alive until the
+# project's session exists
+PLACEHOLDER_SESSION = "tmux-bro-starting"
+
+
+class Prefetcher:
+    """
+    Do the part of opening a project that doesn't depend on which project is
+    picked while the picker is still open: start the tmux server when it isn't
+    running and connect the control mode client that looks up, tags and
+    switches to the session.
+
+    tmux exits when its last session is closed, so a server started here is
+    held by a placeholder session that release() closes once the project's
+    session is built. The placeholder has detach-on-destroy off, so that the
+    control client moves on to the project's session instead of exiting.
+    """
+
+    def __init__(self, tmux_args: Sequence[str] = ()):
+        self.tmux_args = list(tmux_args)
+        self.client = ControlClient(tmux_args)
+        self.connected = False
+        self.placeholder = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def _run(self) -> None:
+        try:
+            self.connected = self.client.connect() or (
+                self._start_server() and self.client.connect()
+            )
+        except Exception:
+            self.connected = False
+
+    def _tmux(self, *args: str) -> bool:
+        try:
+            result = subprocess.run(
+                ["tmux", *self.tmux_args, *args],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        except OSError:
+            return False
+        return result.returncode == 0
+
+    def _start_server(self) -> bool:
+        # Fails when the server already has a placeholder, such as one of a
+        # tmux-bro running in another terminal
+        self.placeholder = self._tmux(
+            "new-session",
+            "-d",
+            "-s",
+            PLACEHOLDER_SESSION,
+            "cat",
+            ";",
+            "set-option",
+            "-t",
+            PLACEHOLDER_SESSION,
+            "detach-on-destroy",
+            "off",
+        )
+        return self.placeholder
+
+    def wait(self) -> Optional[ControlClient]:
+        """
+        Wait for the prefetch to finish and return the connected control
+        client, or None if there is no server to connect to.
+        """
+        self._thread.join()
+        return self.client if self.connected else None
+
+    def release(self) -> None:
+        """Close the placeholder session, if one was opened."""
+        self._thread.join()
+        if not self.placeholder:
+            return
+        self.placeholder = False
+        target = f"={PLACEHOLDER_SESSION}"
+        if self.client.process is not None:
+            try:
+                self.client.cmd("kill-session", "-t", target)
+                return
+            except ConnectionError:
+                pass
+        self._tmux("kill-session", "-t", target)
+
+    def close(self) -> None:
+        self.release()
+        self.client.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
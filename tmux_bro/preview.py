@@ -0,0 +1,124 @@
+import json
+import os
+import shlex
+import threading
+from typing import Iterable, List
+
+from .config import get_cache_dir
+from .snapshot import get_manifest_mtimes, manifests_unchanged
+from .tmux import get_session_name
+from .workspace import (
+    detect_package_manager,
+    detect_workspace_type,
+    has_package_json_dev_script,
+)
+
+# Records live at <preview dir>/<project path>/RECORD_NAME, so that the fzf
+# preview command can find one by plain string concatenation. A record is the
+# session name, the mtimes of the manifests it was computed from as JSON, and
+# the lines to show, one per line.
+RECORD_NAME = ".tmux-bro-preview"
+
+# Upper bound on records computed in the background per picker run
+MAX_BACKGROUND_RECORDS = 1000
+
+
+def get_preview_dir() -> str:
+    return os.path.join(get_cache_dir(), "preview")
+
+
+def _record_path(directory: str) -> str:
+    return os.path.join(
+        get_preview_dir(), os.path.abspath(directory).lstrip(os.sep), RECORD_NAME
+    )
+
+
+def describe(directory: str, workspace=None) -> List[str]:
+    """
+    Return the preview record of a project: the session name on the first line,
+    then the lines to show in the picker. workspace is the result of
+    detect_workspace_type when the caller already has it.
+    """
+    if workspace is None:
+        workspace = detect_workspace_type(directory)
+    lines = [get_session_name(directory)]
+
+    if workspace:
+        workspace_type, package_dirs = workspace
+        dev_count = sum(has_package_json_dev_script(d) for d in package_dirs)
+        lines.append(f"type: {workspace_type} workspace")
+        lines.append(f"packages: {len(package_dirs)}")
+        lines.append(f"dev scripts: {dev_count} of {len(package_dirs)} packages")
+    else:
+        dev_script = has_package_json_dev_script(directory)
+        lines.append("type: single project")
+        lines.append(f"dev script: {'yes' if dev_script else 'no'}")
+
+    lines.append(f"package manager: {detect_package_manager(directory)}")
+    return lines
+
+
+def write_preview_record(directory: str, workspace=None) -> None:
+    """
+    Describe the project and write its preview record. workspace is the
+    result of detect_workspace_type when the caller already has it.
+    """
+    if workspace is None:
+        workspace = detect_workspace_type(directory)
+    lines = describe(directory, workspace)
+    package_dirs = workspace[1] if workspace else []
+    manifests = get_manifest_mtimes(directory, [directory] + package_dirs)
+    lines.insert(1, json.dumps(manifests))
+
+    path = _record_path(directory)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def is_preview_fresh(directory: str) -> bool:
+    """Check that the project's record exists and its manifests are unchanged."""
+    try:
+        with open(_record_path(directory), "r") as f:
+            f.readline()
+            manifests = json.loads(f.readline())
+    except (OSError, ValueError):
+        return False
+    return isinstance(manifests, dict) and manifests_unchanged(manifests)
+
+
+def get_preview_command() -> str:
+    """
+    Return the fzf --preview command. It only reads the candidate's record and
+    asks tmux whether the session is running, so moving the cursor never
+    starts a Python process.
+    """
+    record = shlex.quote(get_preview_dir()) + "{}/" + RECORD_NAME
+    return (
+        f"f={record}; "
+        'if [ -f "$f" ]; then '
+        'tail -n +3 "$f"; '
+        'if tmux has-session -t "=$(head -n 1 "$f")" 2>/dev/null; '
+        "then echo 'session: running'; else echo 'session: not running'; fi; "
+        "else echo 'not analyzed yet'; fi"
+    )
+
+
+def fill_preview_records(directories: Iterable[str], stop: threading.Event) -> None:
+    """
+    Compute records for candidates that don't have one yet, or whose manifests
+    changed since theirs was computed, in candidate order, until stop is set.
+    """
+    computed = 0
+    for directory in directories:
+        if stop.is_set() or computed >= MAX_BACKGROUND_RECORDS:
+            return
+        if is_preview_fresh(directory) or not os.path.isdir(directory):
+            continue
+        write_preview_record(directory)
+        computed += 1
@@ -0,0 +1,87 @@
+import os
+from typing import Dict, Iterable, List, Optional, Set
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def read_process_table() -> Dict[int, int]:
+    """
+    Read a mapping of pid -> parent pid for every process in /proc.
+    Returns an empty dict on systems without procfs.
+    """
+    parents = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return parents
+
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "rb") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces and parens, so split after the
+        # last closing paren: "<pid> (<comm>) <state> <ppid> ..."
+        fields = stat[stat.rfind(b")") + 2 :].split()
+        parents[int(entry)] = int(fields[1])
+
+    return parents
+
+
+def descendants(pids: Iterable[int], parents: Dict[int, int]) -> Set[int]:
+    """
+    Return the given pids together with all of their descendant processes.
+    """
+    children: Dict[int, List[int]] = {}
+    for pid, ppid in parents.items():
+        children.setdefault(ppid, []).append(pid)
+
+    result = set()
+    stack = list(pids)
+    while stack:
+        pid = stack.pop()
+        if pid in result:
+            continue
+        result.add(pid)
+        stack.extend(children.get(pid, []))
+
+    return result
+
+
+def process_rss(pid: int) -> int:
+    """
+    Return the resident set size of a process in bytes, or 0 if it is gone.
+    """
+    try:
+        with open(f"/proc/{pid}/statm", "rb") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def tree_rss(pids: Iterable[int], parents: Optional[Dict[int, int]] = None) -> int:
+    """
+    Return the combined resident set size of the given processes and all of
+    their descendants, in bytes.
+    """
+    if parents is None:
+        parents = read_process_table()
+    return sum(process_rss(pid) for pid in descendants(pids, parents))
+
+
+def process_cpu_time(pid: int) -> float:
+    """
+    Return the user and system CPU time a process has used so far, in
+    seconds, or 0 if it is gone.
+    """
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            stat = f.read()
+        fields = stat[stat.rfind(b")") + 2 :].split()
+        return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+    except (OSError, IndexError, ValueError):
+        return 0.0
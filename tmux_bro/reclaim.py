@@ -0,0 +1,143 @@
+import os
+import signal
+import time
+from typing import Any, Dict, List, Optional
+
+from .procfs import descendants, process_cpu_time, process_rss, read_process_table
+from .snapshot import remove_snapshot
+from .tmux import PANE_TAG, SESSION_TAG
+from .units import format_bytes, format_duration
+
+DEFAULT_GC_IDLE = "3d"
+# kill closes whole sessions, stop-dev only stops the processes running in
+# their dev panes and leaves editors and shells alone
+GC_MODES = ["kill", "stop-dev"]
+DEFAULT_GC_MODE = "stop-dev"
+
+
+def _list_sessions(server) -> List[Dict[str, Any]]:
+    """Return the sessions tmux-bro created, with their activity times."""
+    output = server.cmd(
+        "list-sessions",
+        "-F",
+        "\t".join(
+            [
+                "#{session_id}",
+                "#{session_attached}",
+                "#{session_activity}",
+                "#{session_last_attached}",
+                f"#{{{SESSION_TAG}}}",
+                "#{session_name}",
+            ]
+        ),
+    ).stdout
+
+    sessions = []
+    for line in output:
+        session_id, attached, activity, last_attached, directory, name = line.split(
+            "\t", 5
+        )
+        if not directory:
+            continue
+        sessions.append(
+            {
+                "session_id": session_id,
+                "name": name,
+                "directory": directory,
+                "attached": attached not in ("", "0"),
+                "last_used": max(int(activity or 0), int(last_attached or 0)),
+                "panes": [],
+            }
+        )
+    return sessions
+
+
+def _list_panes(server) -> List[List[str]]:
+    """Return (session_id, pane pid, role) of every pane on the server."""
+    output = server.cmd(
+        "list-panes", "-a", "-F", f"#{{session_id}}\t#{{pane_pid}}\t#{{{PANE_TAG}}}"
+    ).stdout
+    return [line.split("\t", 2) for line in output]
+
+
+def find_idle_sessions(
+    server, idle_seconds: float, mode: str, now: Optional[float] = None
+) -> List[Dict[str, Any]]:
+    """
+    Find tmux-bro sessions that are not attached and have seen neither
+    activity nor a client for idle_seconds. Each gets the combined RSS and CPU
+    time of its pane process trees, and the processes the mode would
+    terminate with the memory that frees. Sorted by memory reclaimed.
+    """
+    if now is None:
+        now = time.time()
+
+    sessions = {session["session_id"]: session for session in _list_sessions(server)}
+    for session_id, pane_pid, role in _list_panes(server):
+        if session_id in sessions and pane_pid.isdigit():
+            sessions[session_id]["panes"].append((int(pane_pid), role))
+
+    parents = read_process_table()
+    candidates = []
+    for session in sessions.values():
+        idle = now - session["last_used"]
+        if session["attached"] or idle < idle_seconds:
+            continue
+
+        pane_pids = [pid for pid, _ in session["panes"]]
+        tree = descendants(pane_pids, parents)
+        if mode == "kill":
+            targets = tree
+        else:
+            # The dev command runs under the pane's shell, which stays
+            dev_pids = [pid for pid, role in session["panes"] if role == "dev"]
+            targets = descendants(dev_pids, parents) - set(dev_pids)
+        if not targets:
+            continue
+
+        rss = {pid: process_rss(pid) for pid in tree}
+        candidates.append(
+            {
+                **session,
+                "idle": idle,
+                "rss": sum(rss.values()),
+                "cpu": sum(process_cpu_time(pid) for pid in tree),
+                "reclaim": sum(rss.get(pid, 0) for pid in targets),
+                "targets": sorted(targets),
+            }
+        )
+
+    candidates.sort(key=lambda candidate: candidate["reclaim"], reverse=True)
+    return candidates
+
+
+def reclaim_session(server, candidate: Dict[str, Any], mode: str) -> None:
+    """Kill the session, or stop the processes in its dev panes."""
+    if mode == "kill":
+        server.cmd("kill-session", "-t", candidate["session_id"])
+        # Don't bring it back on the next `tmux-bro restore`
+        remove_snapshot(candidate["directory"])
+        return
+
+    for pid in candidate["targets"]:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError:
+            continue
+
+
+def format_report(candidates: List[Dict[str, Any]]) -> List[str]:
+    if not candidates:
+        return ["No idle sessions to reclaim"]
+
+    lines = [f"{'reclaim':>11} {'rss':>11} {'cpu':>8} {'idle':>5}  session"]
+    for candidate in candidates:
+        lines.append(
+            f"{format_bytes(candidate['reclaim']):>11} "
+            f"{format_bytes(candidate['rss']):>11} "
+            f"{candidate['cpu']:7.0f}s "
+            f"{format_duration(candidate['idle']):>5}  {candidate['name']}"
+        )
+    total = sum(candidate["reclaim"] for candidate in candidates)
+    lines.append(f"{format_bytes(total):>11} total")
+    return lines
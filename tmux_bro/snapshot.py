@@ -0,0 +1,206 @@
+import hashlib
+import json
+import os
+import shlex
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .config import get_cache_dir
+from .detectors import detector_markers
+
+# Files whose contents decide the session config. A snapshot is stale as soon
+# as any of them is created, changed or deleted.
+PROJECT_MANIFESTS = [
+    "package.json",
+    "pnpm-workspace.yaml",
+    "Cargo.toml",
+    "go.work",
+    "pyproject.toml",
+    "turbo.json",
+    ".tmux-bro.yaml",
+    "pnpm-lock.yaml",
+    "yarn.lock",
+    ".yarnrc.yml",
+    "package-lock.json",
+    "Cargo.lock",
+]
+PACKAGE_MANIFESTS = [
+    "package.json",
+    ".tmux-bro.yaml",
+    os.path.join("venv", "bin", "activate"),
+    os.path.join(".venv", "bin", "activate"),
+]
+
+
+def get_snapshot_dir() -> str:
+    return os.path.join(get_cache_dir(), "snapshots")
+
+
+def get_live_dir() -> str:
+    return os.path.join(get_snapshot_dir(), "live")
+
+
+def _snapshot_path(directory: str) -> str:
+    key = hashlib.sha1(os.path.abspath(directory).encode()).hexdigest()
+    return os.path.join(get_snapshot_dir(), f"{key}.json")
+
+
+def _mtime(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def manifest_paths(directory: str, window_dirs: Iterable[str]) -> List[str]:
+    """
+    Return the manifests that a project's session config, or anything else
+    derived from its workspace, depends on, given its window directories.
+    """
+    names = set(PROJECT_MANIFESTS) | detector_markers()
+    paths = [os.path.join(directory, name) for name in names]
+
+    for window_dir in window_dirs:
+        paths.extend(os.path.join(window_dir, name) for name in PACKAGE_MANIFESTS)
+        # Directories matched by workspace globs change when packages are
+        # added or removed next to them
+        if window_dir != directory:
+            paths.append(os.path.dirname(window_dir))
+
+    return sorted(set(paths))
+
+
+def get_manifest_mtimes(
+    directory: str, window_dirs: Iterable[str]
+) -> Dict[str, Optional[int]]:
+    return {path: _mtime(path) for path in manifest_paths(directory, window_dirs)}
+
+
+def manifests_unchanged(manifests: Dict[str, Optional[int]]) -> bool:
+    """Check that none of the manifests changed since their mtimes were taken."""
+    return all(_mtime(path) == mtime for path, mtime in manifests.items())
+
+
+def save_snapshot(directory: str, config: Dict[str, Any]) -> None:
+    """
+    Persist the session config of a project together with the modification
+    times of the manifests it was built from.
+    """
+    snapshot = {
+        "directory": directory,
+        "config": config,
+        "manifests": get_manifest_mtimes(
+            directory,
+            [
+                window["start_directory"]
+                for window in config["windows"] + config.get("deferred_windows", [])
+            ],
+        ),
+    }
+
+    path = _snapshot_path(directory)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: Could not save session snapshot {path}: {e}")
+
+
+def load_snapshot(directory: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_snapshot_path(directory), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_snapshots() -> List[Dict[str, Any]]:
+    """Load every saved snapshot, skipping unreadable ones."""
+    snapshots = []
+    try:
+        entries = sorted(os.listdir(get_snapshot_dir()))
+    except OSError:
+        return snapshots
+
+    for entry in entries:
+        if not entry.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(get_snapshot_dir(), entry), "r") as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+
+    return snapshots
+
+
+def mark_session_live(session_name: str, directory: str) -> None:
+    """
+    Record that the project has a running session. The marker, named after the
+    session, is removed by the session-closed hook when the session is closed,
+    so the markers left once the tmux server is gone are of the sessions that
+    were alive when it died.
+    """
+    path = os.path.join(get_live_dir(), session_name)
+    try:
+        os.makedirs(get_live_dir(), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(directory)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: Could not mark session {session_name} as live: {e}")
+
+
+def unmark_session(session_name: str) -> None:
+    try:
+        os.remove(os.path.join(get_live_dir(), session_name))
+    except OSError:
+        pass
+
+
+def load_live_sessions() -> List[Tuple[str, str]]:
+    """Return the (session name, project directory) of every live marker."""
+    sessions = []
+    try:
+        entries = sorted(os.listdir(get_live_dir()))
+    except OSError:
+        return sessions
+
+    for entry in entries:
+        if entry.endswith(".tmp"):
+            continue
+        try:
+            with open(os.path.join(get_live_dir(), entry), "r") as f:
+                sessions.append((entry, f.read()))
+        except OSError:
+            continue
+
+    return sessions
+
+
+def get_closed_hook() -> str:
+    """
+    Return the global session-closed hook that removes a closed session's
+    live marker. It runs in the background when the session is killed or its
+    last window exits, but not when the server itself goes away.
+    """
+    live_dir = shlex.quote(get_live_dir())
+    return f'run-shell -b "rm -f {live_dir}/#{{q:hook_session_name}}"'
+
+
+def remove_snapshot(directory: str) -> None:
+    try:
+        os.remove(_snapshot_path(directory))
+    except OSError:
+        pass
+
+
+def is_snapshot_valid(snapshot: Dict[str, Any]) -> bool:
+    """
+    Check that none of the manifests recorded in the snapshot have changed
+    since it was taken.
+    """
+    return manifests_unchanged(snapshot["manifests"])
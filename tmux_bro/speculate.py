@@ -0,0 +1,162 @@
+import os
+import select
+import shlex
+import shutil
+import sys
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Optional
+
+# How long the highlighted candidate must stay put before it is built, so
+# that scrolling through the list doesn't start a build per line
+DEBOUNCE_SECONDS = 0.15
+# Upper bound on speculative builds per picker run
+MAX_SPECULATIVE_BUILDS = 20
+# Builds run at a lower priority than fzf and the preview command
+SPECULATION_NICENESS = 10
+
+# The focus event was added in fzf 0.33
+MIN_FZF_VERSION = (0, 33)
+
+
+def parse_fzf_version(output: str):
+    """Parse `fzf --version` output such as "0.44.1 (debian)"."""
+    try:
+        return tuple(int(part) for part in output.split()[0].split(".")[:2])
+    except (IndexError, ValueError):
+        return None
+
+
+class ConfigSpeculator:
+    """
+    Build the session config of the candidate highlighted in fzf while the
+    user is still choosing, so that it is usually ready when Enter is pressed.
+
+    fzf reports focus changes by writing the candidate to a FIFO. A single
+    worker thread builds one config at a time, at a lower priority, and stops
+    after max_builds builds or when stop() is called. build is called with the
+    directory and a `cancel` event, set when the focus moves away from the
+    directory or another directory's result is asked for, which should stop
+    the build. Results are kept for the rest of the picker run.
+    """
+
+    def __init__(
+        self,
+        build: Callable[..., Dict[str, Any]],
+        max_builds: int = MAX_SPECULATIVE_BUILDS,
+    ):
+        self.build = build
+        self.max_builds = max_builds
+        self.fifo_dir: Optional[str] = None
+        self.stop_event = threading.Event()
+        self.focus_changed = threading.Event()
+        self.lock = threading.Lock()
+        self.built = threading.Condition(self.lock)
+        self.focused: Optional[str] = None
+        self.building: Optional[str] = None
+        self.cancel_build = threading.Event()
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def fifo(self) -> str:
+        assert self.fifo_dir is not None
+        return os.path.join(self.fifo_dir, "focus")
+
+    def fzf_args(self):
+        """Return the fzf arguments that report focus changes."""
+        command = f"printf '%s\\n' {{}} > {shlex.quote(self.fifo)}"
+        return ["--bind", f"focus:execute-silent:{command}"]
+
+    def start(self) -> None:
+        self.fifo_dir = tempfile.mkdtemp(prefix="tmux-bro-")
+        os.mkfifo(self.fifo)
+        for target in (self._read_focus, self._work):
+            threading.Thread(target=target, daemon=True).start()
+
+    def stop(self) -> None:
+        """Stop reading focus changes and starting builds."""
+        self.stop_event.set()
+        self.focus_changed.set()
+        if self.fifo_dir is not None:
+            shutil.rmtree(self.fifo_dir, ignore_errors=True)
+
+    def focus(self, directory: str) -> None:
+        with self.lock:
+            self.focused = directory
+            self._cancel_other_than(directory)
+        self.focus_changed.set()
+
+    def _cancel_other_than(self, directory: str) -> None:
+        if self.building is not None and self.building != directory:
+            self.cancel_build.set()
+
+    def _read_focus(self) -> None:
+        # Opened read-write so that the FIFO never reports end of file and
+        # fzf's writes never block waiting for a reader
+        fd = os.open(self.fifo, os.O_RDWR | os.O_NONBLOCK)
+        buffer = b""
+        try:
+            while not self.stop_event.is_set():
+                ready, _, _ = select.select([fd], [], [], 0.1)
+                if not ready:
+                    continue
+                buffer += os.read(fd, 64 * 1024)
+                *lines, buffer = buffer.split(b"\n")
+                if lines and lines[-1]:
+                    self.focus(os.fsdecode(lines[-1]))
+        finally:
+            os.close(fd)
+
+    def _wait_for_stable_focus(self) -> bool:
+        self.focus_changed.wait()
+        while not self.stop_event.is_set():
+            self.focus_changed.clear()
+            if self.stop_event.wait(DEBOUNCE_SECONDS):
+                break
+            if not self.focus_changed.is_set():
+                return True
+        return False
+
+    def _work(self) -> None:
+        if sys.platform.startswith("linux"):
+            # Linux priorities are per thread, so this leaves the main thread
+            # alone
+            os.nice(SPECULATION_NICENESS)
+
+        builds = 0
+        while builds < self.max_builds:
+            if not self._wait_for_stable_focus():
+                return
+            with self.lock:
+                directory = self.focused
+                if directory is None or directory in self.results:
+                    continue
+                self.building = directory
+                self.cancel_build = threading.Event()
+                cancel = self.cancel_build
+
+            builds += 1
+            try:
+                config = self.build(directory, cancel=cancel)
+            except Exception:
+                config = None
+            if cancel.is_set():
+                # Built again if the focus comes back
+                config = None
+
+            with self.lock:
+                if config is not None:
+                    self.results[directory] = config
+                self.building = None
+                self.built.notify_all()
+
+    def result(self, directory: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the speculatively built config of the directory, waiting for
+        its build if it is in progress, or None if it wasn't built. A build
+        of another directory is cancelled.
+        """
+        with self.lock:
+            self._cancel_other_than(directory)
+            self.built.wait_for(lambda: self.building != directory)
+            return self.results.get(directory)
@@ -1,68 +1,159 @@
-from libtmux import Server
+from libtmux import Server, Session
 from tmuxp.workspace.builder import WorkspaceBuilder
 import os
+import shlex
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from .workspace import (
     detect_workspace,
     has_package_json_dev_script,
     detect_package_manager,
+    is_yarn_berry,
 )
 from .config import load_global_config, load_project_config
+from .control import ControlClient
+from .editors import DEFAULT_EDITOR_MODE, get_shared_editor
+from .git import get_worktree_repo
+from .limits import get_dev_limits, wrap_dev_command
+from .layout import layout_string
+from .logs import get_log_command
+from .snapshot import (
+    get_closed_hook,
+    get_live_dir,
+    is_snapshot_valid,
+    load_live_sessions,
+    load_snapshot,
+    mark_session_live,
+    remove_snapshot,
+    save_snapshot,
+    unmark_session,
+)
+from .usage import get_adaptive_options, get_visit_hook, load_usage, split_by_usage
+from .venv import find_venv, get_venv_environment, get_venv_shell
 
+DEFAULT_LAUNCH_MODE = "keys"
 
-def _get_venv_source_cmd(directory):
-    """Return venv source command if a venv exists in the directory."""
-    venv_activate_path = os.path.join(directory, "venv", "bin", "activate")
-    if os.path.isfile(venv_activate_path):
-        return {"cmd": f"source {venv_activate_path}"}
-    return None
 
+def _exec_wrapper(cmd):
+    """
+    Wrap a command so that it runs as the pane's own process and drops back to
+    an interactive shell when it exits. That is a login shell, except in a
+    virtual environment, whose PATH a login profile could rebuild.
+    """
+    shell = '"${SHELL:-/bin/sh}"'
+    script = f'{cmd}; [ -z "$VIRTUAL_ENV" ] || exec {shell}; exec {shell} -l'
+    return "sh -c " + shlex.quote(script)
 
-def _create_editor_pane(directory, editor):
-    """Create editor pane with venv activation if needed."""
-    commands = []
-    venv_cmd = _get_venv_source_cmd(directory)
-    if venv_cmd:
-        commands.append(venv_cmd)
-    commands.append({"cmd": editor})
-    return {"shell_command": commands}
 
+def _create_command_pane(cmd, launch_mode):
+    """
+    Create a pane running the command, either typed into the pane's shell
+    ("keys") or started directly as the pane's process ("command").
+    """
+    if launch_mode == "command":
+        return {"shell": _exec_wrapper(cmd), "shell_command": []}
+    return {"shell_command": [{"cmd": cmd}]}
 
-def _create_shell_pane(directory):
-    """Create shell pane with venv activation if needed."""
-    commands = []
-    venv_cmd = _get_venv_source_cmd(directory)
-    if venv_cmd:
-        commands.append(venv_cmd)
-    return {"shell_command": commands}
 
+def _create_editor_pane(editor, launch_mode=DEFAULT_LAUNCH_MODE):
+    """Create editor pane."""
+    return _create_command_pane(editor, launch_mode)
 
-def _create_dev_pane(directory, pkg_manager, dev_command=None):
-    """Create dev script pane with appropriate command."""
-    commands = []
-    venv_cmd = _get_venv_source_cmd(directory)
-    if venv_cmd:
-        commands.append(venv_cmd)
 
+def _create_shell_pane():
+    """Create an empty shell pane."""
+    return {"shell_command": []}
+
+
+def _create_dev_pane(
+    pkg_manager, dev_command=None, launch_mode=DEFAULT_LAUNCH_MODE, limits=None
+):
+    """
+    Create dev script pane with appropriate command, run with the priority
+    and resource limits from `dev_limits`.
+    """
     if dev_command:
-        commands.append({"cmd": dev_command})
+        cmd = dev_command
     elif pkg_manager == "npm":
-        commands.append({"cmd": "npm run dev"})
+        cmd = "npm run dev"
     else:
-        commands.append({"cmd": f"{pkg_manager} dev"})
-
-    return {"shell_command": commands}
+        cmd = f"{pkg_manager} dev"
+
+    try:
+        cmd = wrap_dev_command(cmd, limits or {})
+    except ValueError as e:
+        print(f"Warning: Ignoring dev_limits: {e}")
+
+    return _create_command_pane(cmd, launch_mode)
+
+
+def _get_aggregate_dev_command(directory, pkg_manager):
+    """
+    Return a single command that runs the dev script of every package in the
+    workspace, or None if the package manager has no parallel recursive runner.
+    """
+    if os.path.isfile(os.path.join(directory, "turbo.json")):
+        return {
+            "pnpm": "pnpm exec turbo dev",
+            "yarn": "yarn turbo dev",
+            "npm": "npx turbo dev",
+        }.get(pkg_manager)
+    if pkg_manager == "pnpm":
+        return "pnpm -r --parallel run dev"
+    # foreach only exists from Yarn 2 on
+    if pkg_manager == "yarn" and is_yarn_berry(directory):
+        return (
+            "yarn workspaces foreach --all --parallel --interlaced -j unlimited run dev"
+        )
+    if pkg_manager == "cargo":
+        return "cargo watch -x 'check --workspace'"
+    return None
 
 
 DEFAULT_LAYOUT = "main-vertical"
 DEFAULT_MAIN_PANE_WIDTH = "50%"
 DEFAULT_MAIN_PANE_HEIGHT = "50%"
+DEFAULT_DEV_MODE = "package"
+DEFAULT_INSPECT_WORKERS = 8
+DEFAULT_DETECTION_TIMEOUT_MS = 300
+
+
+def _create_window_config(
+    directory, window_name=None, project_dir=None, global_config=None
+):
+    """
+    Create a standard window configuration. A virtual environment found in the
+    directory, or failing that in the project root, is set as the window's
+    VIRTUAL_ENV, and its panes start with it already active.
+    """
+    if global_config is None:
+        global_config = load_global_config()
+    project_config = load_project_config(directory)
+    layout, options = _get_layout(project_config, global_config)
+
+    config = {
+        "layout": layout,
+        "start_directory": directory,
+        "options": options,
+        "suppress_history": False,
+    }
 
+    if window_name is not None:
+        config["window_name"] = window_name
 
-def _create_window_config(directory, window_name=None):
-    """Create a standard window configuration."""
-    global_config = load_global_config()
-    project_config = load_project_config(directory)
+    venv = find_venv(directory)
+    if venv is None and project_dir is not None and project_dir != directory:
+        venv = find_venv(project_dir)
+    if venv is not None:
+        config["environment"] = get_venv_environment(venv)
 
+    return config
+
+
+def _get_layout(project_config, global_config):
+    """Return the window layout and the tmux options that size its main pane."""
     # Get layout and pane dimensions from project config, global config, or use defaults
     layout = project_config.get("layout", global_config.get("layout", DEFAULT_LAYOUT))
     main_pane_width = project_config.get(
@@ -83,34 +174,141 @@ def _create_window_config(directory, window_name=None):
         options["main-pane-width"] = main_pane_width
         options["main-pane-height"] = main_pane_height
 
-    config = {
-        "layout": layout,
-        "start_directory": directory,
-        "options": options,
-        "suppress_history": False,
-    }
+    return layout, options
 
-    if window_name is not None:
-        config["window_name"] = window_name
 
-    return config
+def _map_concurrently(func, items, workers):
+    """
+    Call func for every item and return the results in order. Uses a thread
+    pool of at most `workers` threads so that the file system and tmux round
+    trips of different items overlap, which matters on network file systems.
+    With workers <= 1 items are processed serially.
+    """
+    if workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as executor:
+        return list(executor.map(func, items))
+
+
+def get_session_name(directory):
+    """
+    Return the session name for a project directory: its basename, prefixed
+    with the repository name for linked git worktrees so that every worktree
+    gets its own session.
+    """
+    name = os.path.basename(directory)
+    repo = get_worktree_repo(directory)
+    if repo is not None:
+        repo_name = os.path.basename(repo)
+        if not name.startswith(repo_name):
+            name = f"{repo_name}-{name}"
+    return name
+
 
+class BuildCancelled(Exception):
+    """Raised by build_session_config when its cancel event is set."""
 
-def build_session_config(directory):
+
+def _check_cancelled(cancel):
+    if cancel is not None and cancel.is_set():
+        raise BuildCancelled()
+
+
+def build_session_config(directory, window_dirs=None, cancel=None):
+    """
+    Build the tmuxp session config for a project. With window_dirs, only the
+    windows whose start directory is in it are built, so that a few packages
+    of a large workspace can be recomputed without inspecting the others.
+    With a cancel event, the build stops with BuildCancelled between packages
+    once it is set.
+    """
     editor = os.environ.get("EDITOR", "vim")
-    session_name = os.path.basename(directory)
+    session_name = get_session_name(directory)
     package_dirs = detect_workspace(directory)
+    _check_cancelled(cancel)
+    all_package_dirs = package_dirs
+    if package_dirs and window_dirs is not None:
+        package_dirs = [d for d in package_dirs if d in window_dirs]
     pkg_manager = detect_package_manager(directory)
 
+    global_config = load_global_config()
     project_config = load_project_config(directory)
     default_dev_command = project_config.get("dev_command")
     package_configs = project_config.get("packages", {})
+    dev_mode = project_config.get(
+        "dev_mode", global_config.get("dev_mode", DEFAULT_DEV_MODE)
+    )
+    launch_mode = project_config.get(
+        "launch_mode", global_config.get("launch_mode", DEFAULT_LAUNCH_MODE)
+    )
+    inspect_workers = project_config.get(
+        "inspect_workers",
+        global_config.get("inspect_workers", DEFAULT_INSPECT_WORKERS),
+    )
+    editor_mode = project_config.get(
+        "editor_mode", global_config.get("editor_mode", DEFAULT_EDITOR_MODE)
+    )
+    adaptive = get_adaptive_options(global_config, project_config)
+
+    # Windows of packages that are rarely visited are only opened on demand
+    built_dirs, deferred_dirs = all_package_dirs, []
+    if all_package_dirs and adaptive is not None:
+        built_dirs, deferred_dirs = split_by_usage(
+            all_package_dirs, load_usage(directory), adaptive
+        )
 
+    _check_cancelled(cancel)
     windows = []
 
+    aggregate_dev_command = None
+    if package_dirs and dev_mode == "aggregate":
+        aggregate_dev_command = project_config.get(
+            "aggregate_dev_command"
+        ) or _get_aggregate_dev_command(directory, pkg_manager)
+
+    def inspect_package(package_dir):
+        _check_cancelled(cancel)
+        window = _create_window_config(
+            package_dir, os.path.basename(package_dir), directory, global_config
+        )
+        # The dev script doesn't matter when the root window runs all of them
+        has_dev_script = not aggregate_dev_command and has_package_json_dev_script(
+            package_dir
+        )
+        return window, has_dev_script
+
     if package_dirs:
+        inspected = _map_concurrently(inspect_package, package_dirs, inspect_workers)
+
+    if aggregate_dev_command:
+        # One recursive dev process in a root window instead of one per package
+        if window_dirs is None or directory in window_dirs:
+            window = _create_window_config(
+                directory, "root", global_config=global_config
+            )
+            window["panes"] = [
+                _create_editor_pane(editor, launch_mode),
+                _create_dev_pane(
+                    pkg_manager,
+                    aggregate_dev_command,
+                    launch_mode,
+                    get_dev_limits(global_config, project_config),
+                ),
+                _create_shell_pane(),
+            ]
+            windows.append(window)
+
+        for window, _ in inspected:
+            window["panes"] = [
+                _create_editor_pane(editor, launch_mode),
+                _create_shell_pane(),
+            ]
+            windows.append(window)
+    elif package_dirs:
         # Multi-package workspace
-        for package_dir in package_dirs:
+        for package_dir, (window, has_dev_script) in zip(package_dirs, inspected):
+            _check_cancelled(cancel)
             package_name = os.path.basename(package_dir)
 
             # Check for package-specific dev command override
@@ -124,22 +322,24 @@ def build_session_config(directory):
                 package_dev_command = default_dev_command
 
             # Add dev pane if package has dev script or if dev command is specified in config
-            has_dev = (
-                has_package_json_dev_script(package_dir)
-                or package_dev_command is not None
-            )
+            has_dev = has_dev_script or package_dev_command is not None
 
             panes = [
-                _create_editor_pane(package_dir, editor),
-                _create_shell_pane(package_dir),
+                _create_editor_pane(editor, launch_mode),
+                _create_shell_pane(),
             ]
 
             if has_dev:
                 panes.insert(
-                    1, _create_dev_pane(package_dir, pkg_manager, package_dev_command)
+                    1,
+                    _create_dev_pane(
+                        pkg_manager,
+                        package_dev_command,
+                        launch_mode,
+                        get_dev_limits(global_config, project_config, package_name),
+                    ),
                 )
 
-            window = _create_window_config(package_dir, package_name)
             window["panes"] = panes
             windows.append(window)
     else:
@@ -149,45 +349,666 @@ def build_session_config(directory):
         )
 
         panes = [
-            _create_editor_pane(directory, editor),
-            _create_shell_pane(directory),
+            _create_editor_pane(editor, launch_mode),
+            _create_shell_pane(),
         ]
 
         if has_dev:
             panes.insert(
-                1, _create_dev_pane(directory, pkg_manager, default_dev_command)
+                1,
+                _create_dev_pane(
+                    pkg_manager,
+                    default_dev_command,
+                    launch_mode,
+                    get_dev_limits(global_config, project_config),
+                ),
             )
 
-        window = _create_window_config(directory)
+        window = _create_window_config(directory, global_config=global_config)
         window["panes"] = panes
         windows.append(window)
 
-    return {
+    if editor_mode == "shared" and all_package_dirs:
+        # The server runs in the first window of the whole session, also when
+        # only some of its windows are built
+        server_dir = directory if aggregate_dev_command else built_dirs[0]
+        _share_editor(windows, editor, session_name, server_dir, launch_mode)
+
+    config = {
         "session_name": session_name,
         "windows": windows,
     }
+    if adaptive is not None:
+        deferred = set(deferred_dirs)
+        config["windows"] = [w for w in windows if w["start_directory"] not in deferred]
+        config["deferred_windows"] = [
+            w for w in windows if w["start_directory"] in deferred
+        ]
+    _apply_pane_settings(config, global_config, project_config)
+    return config
 
 
-def create_tmux_session(config):
-    server = Server()
+def _share_editor(windows, editor, session_name, server_dir, launch_mode):
+    """
+    Replace the editor of each window by a client of one editor server, run
+    in the window of server_dir. Editors without a server mode are left as
+    they are.
+    """
+    shared = get_shared_editor(editor, session_name)
+    if shared is None:
+        return
+    for window in windows:
+        if window["start_directory"] == server_dir:
+            command = shared.server
+        else:
+            command = shared.client
+        window["panes"][0] = _create_editor_pane(command, launch_mode)
+
+
+def _apply_pane_settings(config, global_config, project_config):
+    """
+    Give each pane the scrollback size of its role from `history_limit`, and
+    dev panes the command that copies their output to a log with `dev_log`.
+    Panes of windows with a virtual environment are started with its bin
+    directory in front of their PATH.
+    """
+    history_limits = dict(global_config.get("history_limit") or {})
+    history_limits.update(project_config.get("history_limit") or {})
+    dev_log = project_config.get("dev_log", global_config.get("dev_log"))
+
+    for window in config["windows"] + config.get("deferred_windows", []):
+        venv = "VIRTUAL_ENV" in window.get("environment", {})
+        for pane, role in zip(window["panes"], pane_roles(window)):
+            if venv:
+                pane["shell"] = get_venv_shell(pane.get("shell"))
+            if history_limits.get(role) is not None:
+                pane["history_limit"] = int(history_limits[role])
+            if role == "dev" and dev_log:
+                package = window.get("window_name") or config["session_name"]
+                try:
+                    pane["log_command"] = get_log_command(
+                        config["session_name"], package, dev_log
+                    )
+                except ValueError as e:
+                    print(f"Warning: Ignoring dev_log: {e}")
+
+
+def _get_fallback_session_config(directory, session_name):
+    """
+    Return a config with a single window with the editor and a shell, built
+    without reading anything in the project directory.
+    """
+    global_config = load_global_config()
+    launch_mode = global_config.get("launch_mode", DEFAULT_LAUNCH_MODE)
+    layout, options = _get_layout({}, global_config)
+    window = {
+        "layout": layout,
+        "start_directory": directory,
+        "options": options,
+        "suppress_history": False,
+        "panes": [
+            _create_editor_pane(os.environ.get("EDITOR", "vim"), launch_mode),
+            _create_shell_pane(),
+        ],
+        # Tagged, so that the window is rebuilt once detection finishes
+        "fallback": True,
+    }
+    config = {"session_name": session_name, "windows": [window]}
+    _apply_pane_settings(config, global_config, {})
+    return config
+
 
-    builder = WorkspaceBuilder(session_config=config, server=server)
+def detect_session_config(directory, speculator=None):
+    """
+    Build the session config within the `detection_timeout_ms` deadline, so
+    that a hung network file system can't block the picker. A config that
+    the speculator built while the picker was open is used when there is one.
+    Returns a tuple of (config, source), where source is "speculated" or
+    "detected" when detection finished. When the deadline passes, the config
+    is the one from the project's last snapshot ("snapshot") or, without a
+    snapshot, a single window with the editor and a shell ("fallback").
+    """
+    timeout_ms = load_global_config().get(
+        "detection_timeout_ms", DEFAULT_DETECTION_TIMEOUT_MS
+    )
+    result = {}
+
+    def detect():
+        try:
+            result["session_name"] = get_session_name(directory)
+            config = speculator.result(directory) if speculator else None
+            result["source"] = "speculated" if config else "detected"
+            result["config"] = config or build_session_config(directory)
+        except Exception as e:
+            result["error"] = e
+
+    # A daemon thread, so that a detection stuck in the kernel doesn't keep
+    # tmux-bro from exiting
+    thread = threading.Thread(target=detect, daemon=True)
+    thread.start()
+    thread.join(None if timeout_ms is None else timeout_ms / 1000)
+
+    if "error" in result:
+        raise result["error"]
+    if "config" in result:
+        return result["config"], result["source"]
+
+    snapshot = load_snapshot(directory)
+    if snapshot is not None:
+        return snapshot["config"], "snapshot"
+    session_name = result.get("session_name", os.path.basename(directory))
+    return _get_fallback_session_config(directory, session_name), "fallback"
+
+
+SESSION_TAG = "@tmux-bro"
+WINDOW_TAG = "@tmux-bro-path"
+PANE_TAG = "@tmux-bro-role"
+FALLBACK_TAG = "@tmux-bro-fallback"
+
+
+def pane_roles(window_config):
+    """
+    Return the role of each pane of a window built by build_session_config:
+    the editor comes first, the shell last and the dev pane, if any, between.
+    """
+    panes = window_config["panes"]
+    return ["editor"] + ["dev"] * (len(panes) - 2) + ["shell"]
+
+
+def _list_windows(runner, session_id):
+    """Return (window_id, tagged path) of every window in the session, in order."""
+    output = runner.cmd(
+        "list-windows", "-t", session_id, "-F", f"#{{window_id}}\t#{{{WINDOW_TAG}}}"
+    ).stdout
+    return [tuple(line.split("\t", 1)) for line in output]
+
+
+def _list_panes(runner, window_id):
+    """Return (pane_id, tagged role) of every pane in the window, in order."""
+    output = runner.cmd(
+        "list-panes", "-t", window_id, "-F", f"#{{pane_id}}\t#{{{PANE_TAG}}}"
+    ).stdout
+    return [tuple(line.split("\t", 1)) for line in output]
+
+
+def _list_session_panes(runner, session_id):
+    """Return the pane ids of every window in the session, in window order."""
+    output = runner.cmd(
+        "list-panes", "-s", "-t", session_id, "-F", "#{window_id}\t#{pane_id}"
+    ).stdout
+    panes = {}
+    for line in output:
+        window_id, pane_id = line.split("\t", 1)
+        panes.setdefault(window_id, []).append(pane_id)
+    return panes
+
+
+def _run_commands(runner, commands):
+    """
+    Run tmux commands in one round trip through a control mode client, or one
+    by one through a libtmux server.
+    """
+    if isinstance(runner, ControlClient):
+        return runner.run(commands)
+    return [runner.cmd(*command) for command in commands]
+
+
+def _tag_commands(window_ids, session_panes, window_configs):
+    commands = []
+    for window_id, window_config in zip(window_ids, window_configs):
+        commands.append(
+            ["set-option", "-w", "-t", window_id]
+            + [WINDOW_TAG, window_config["start_directory"]]
+        )
+        if window_config.get("fallback"):
+            commands.append(["set-option", "-w", "-t", window_id, FALLBACK_TAG, "1"])
+        panes = session_panes.get(window_id, [])
+        for pane_id, role, pane in zip(
+            panes, pane_roles(window_config), window_config["panes"]
+        ):
+            commands.append(["set-option", "-p", "-t", pane_id, PANE_TAG, role])
+            if pane.get("log_command"):
+                commands.append(["pipe-pane", "-o", "-t", pane_id, pane["log_command"]])
+    return commands
+
+
+class SessionBuilder(WorkspaceBuilder):
+    """
+    A tmuxp builder that lays out each window once. tmuxp selects the layout
+    after every split and starts each pane's command before the next split,
+    so programs that are already running redraw after every split. Here all
+    panes of a window are split first, the window gets its final layout from
+    a precomputed layout string, and only then are commands typed in.
+
+    Each pane is also created with the scrollback size in its config's
+    `history_limit`. tmux sizes a pane's history from the session's
+    history-limit option when the pane is created, so the option is set
+    before each pane, or unset for panes without a `history_limit` so that
+    they get the global value, and unset once the build is done.
+    """
+
+    def build(self, session=None, append=False):
+        self._history_limit = None
+        self._layouts = {}
+        try:
+            super().build(session, append)
+        finally:
+            if self._history_limit is not None:
+                self._set_history_limit(None)
+
+    def _set_history_limit(self, limit):
+        if limit == self._history_limit:
+            return
+        if limit is None:
+            self.server.cmd(
+                "set-option", "-u", "-t", self.session.session_id, "history-limit"
+            )
+        else:
+            self.server.cmd(
+                "set-option",
+                "-t",
+                self.session.session_id,
+                "history-limit",
+                str(limit),
+            )
+        self._history_limit = limit
+
+    def iter_create_windows(self, session, append=False):
+        # A window is created with its first pane
+        windows = super().iter_create_windows(session, append)
+        for window_config in self.session_config["windows"]:
+            panes = window_config["panes"]
+            self._set_history_limit(panes[0].get("history_limit") if panes else None)
+            window, _ = next(windows)
+            # Without a layout, tmuxp doesn't select it after each pane
+            self._layouts[window.window_id] = window_config.get("layout")
+            yield window, {k: v for k, v in window_config.items() if k != "layout"}
+
+    def iter_create_panes(self, window, window_config):
+        # Split every pane before any of them runs a command
+        split_config = {
+            **window_config,
+            "panes": [{**p, "shell_command": []} for p in window_config["panes"]],
+        }
+        panes = super().iter_create_panes(window, split_config)
+        created = []
+        for i, pane_config in enumerate(window_config["panes"]):
+            if i:
+                self._set_history_limit(pane_config.get("history_limit"))
+            created.append(next(panes)[0])
+
+        layout = self._layouts.pop(window.window_id, None)
+        if layout is not None:
+            _apply_layout(
+                window, layout, window_config.get("options", {}), len(created)
+            )
+
+        suppress_default = window_config.get("suppress_history", True)
+        for pane, pane_config in zip(created, window_config["panes"]):
+            suppress = pane_config.get("suppress_history", suppress_default)
+            enter = pane_config.get("enter", True)
+            for command in pane_config["shell_command"]:
+                pane.send_keys(
+                    command["cmd"],
+                    suppress_history=suppress,
+                    enter=command.get("enter", enter),
+                )
+            yield pane, pane_config
+
+
+def _apply_layout(window, layout, options, panes):
+    """
+    Lay out a window in one step: with the layout string of the named layout
+    for the window's size and pane count, or by name if it can't be computed.
+    """
+    try:
+        final = layout_string(
+            layout, panes, int(window.window_width), int(window.window_height), options
+        )
+    except (TypeError, ValueError):
+        final = None
+    if final is None or window.cmd("select-layout", final).stderr:
+        window.cmd("select-layout", layout)
+
+
+def tag_tmux_session(session, config, directory, runner=None):
+    """
+    Remember which project the session and each of its windows belong to, so
+    that the session can later be reconciled with the workspace, and that the
+    session is alive, so that it can be restored.
+    """
+    runner = runner or session.server
+    session_panes = _list_session_panes(runner, session.session_id)
+    commands = [["set-option", "-t", session.session_id, SESSION_TAG, directory]]
+    mark_session_live(session.session_name, directory)
+    hooks = runner.cmd("show-hooks", "-g", "session-closed").stdout
+    if not any(get_live_dir() in hook for hook in hooks):
+        commands.append(["set-hook", "-ag", "session-closed", get_closed_hook()])
+    commands += _tag_commands(list(session_panes), session_panes, config["windows"])
+    if "deferred_windows" in config:
+        # Record window visits, for adaptive_windows
+        commands.append(
+            ["set-hook", "-t", session.session_id, "session-window-changed"]
+            + [get_visit_hook(directory)]
+        )
+    _run_commands(runner, commands)
+
+
+def build_tmux_session(config, directory=None, server=None, runner=None):
+    """
+    Build the session in the background without switching to it. The session
+    is tagged through runner, a control mode client or the libtmux server.
+    """
+    builder = SessionBuilder(session_config=config, server=server or Server())
     builder.build()
     session = builder.session
 
-    if "TMUX" in os.environ:
-        # If we're already in a tmux session, switch client
-        tmux_env = os.environ.pop("TMUX")
-        session.switch_client()
-        os.environ["TMUX"] = tmux_env
-    else:
-        # Otherwise attach to the new session
-        session.attach_session()
+    if directory is not None:
+        tag_tmux_session(session, config, directory, runner)
 
     return session
 
 
-def find_tmux_session(session_name):
-    """Find an existing tmux session by name."""
+def _switch_command(session_name):
+    """Return the tmux command that takes the terminal to the session."""
+    if "TMUX" in os.environ:
+        return ["tmux", "switch-client", "-t", f"={session_name}"]
+    return ["tmux", "attach-session", "-t", f"={session_name}"]
+
+
+def switch_to_tmux_session(session_name, client=None):
+    """
+    Switch the client that runs tmux-bro to the session, or attach to it when
+    running outside tmux.
+    """
+    if client is not None:
+        switched = (
+            "TMUX" in os.environ
+            and client.connect()
+            and client.switch_client(session_name)
+        )
+        # Don't keep the control client attached for as long as an attached
+        # terminal runs
+        client.close()
+        if switched:
+            return
+    subprocess.run(_switch_command(session_name))
+
+
+def reconcile_tmux_session(session, config, remove=False, runner=None):
+    """
+    Bring an existing session in line with a freshly built session config.
+    Windows are matched to the config by the package path they were tagged
+    with. Windows for new packages are appended, and with remove=True windows
+    of packages that no longer exist are closed. Other windows and their
+    running panes are left alone. Sessions that tmux-bro didn't create are
+    not touched.
+    Returns a tuple of (added window count, removed window count).
+    """
+    runner = runner or session.server
+    session_id = session.session_id
+    if not runner.cmd("show-options", "-v", "-t", session_id, SESSION_TAG).stdout:
+        return 0, 0
+
+    live_windows = _list_windows(runner, session_id)
+    live_paths = {path for _, path in live_windows if path}
+    # Windows opened on demand are kept too
+    wanted_paths = {
+        window["start_directory"]
+        for window in config["windows"] + config.get("deferred_windows", [])
+    }
+
+    missing = [
+        window
+        for window in config["windows"]
+        if window["start_directory"] not in live_paths
+    ]
+    if missing:
+        builder = SessionBuilder(
+            session_config={**config, "windows": missing}, server=session.server
+        )
+        builder.build(session=session, append=True)
+
+        known_ids = {window_id for window_id, _ in live_windows}
+        session_panes = _list_session_panes(runner, session_id)
+        new_ids = [
+            window_id for window_id in session_panes if window_id not in known_ids
+        ]
+        _run_commands(runner, _tag_commands(new_ids, session_panes, missing))
+
+    stale_ids = [
+        window_id
+        for window_id, path in live_windows
+        if remove and path and path not in wanted_paths
+    ]
+    _run_commands(runner, [["kill-window", "-t", window_id] for window_id in stale_ids])
+    removed = len(stale_ids)
+
+    return len(missing), removed
+
+
+def replace_fallback_windows(session, config, runner=None):
+    """
+    Reconcile a session that was built from a fallback config with the
+    detected config. The stand-in windows, tagged when the fallback config was
+    built, are closed once their replacements are built from the config, so
+    that the venv environment, launch mode and layout of the real windows
+    are applied even where a stand-in window has the same directory. Windows
+    of packages that aren't in the config are closed too.
+    Returns the number of windows replaced.
+    """
+    runner = runner or session.server
+    output = runner.cmd(
+        "list-windows",
+        "-t",
+        session.session_id,
+        "-F",
+        f"#{{window_id}}\t#{{window_active}}\t#{{{WINDOW_TAG}}}\t#{{{FALLBACK_TAG}}}",
+    ).stdout
+    stand_ins = [line.split("\t") for line in output]
+    stand_ins = [window for window in stand_ins if len(window) == 4 and window[3]]
+    # Untagged, they no longer stand for their directory, and aren't closed
+    # as stale until the real windows exist
+    _run_commands(
+        runner,
+        [
+            ["set-option", "-w", "-u", "-t", window[0], WINDOW_TAG]
+            for window in stand_ins
+        ],
+    )
+    reconcile_tmux_session(session, config, remove=True, runner=runner)
+
+    active = [path for _, is_active, path, _ in stand_ins if is_active == "1"]
+    commands = [["kill-window", "-t", window[0]] for window in stand_ins]
+    if active:
+        for window_id, path in _list_windows(runner, session.session_id):
+            if path == active[0]:
+                commands.insert(0, ["select-window", "-t", window_id])
+                break
+    _run_commands(runner, commands)
+    return len(stand_ins)
+
+
+def get_closed_windows(session, config, runner=None):
+    """
+    Return the window configs of the session's config, deferred ones
+    included, that have no window open in the session.
+    """
+    runner = runner or session.server
+    live_paths = {path for _, path in _list_windows(runner, session.session_id)}
+    return [
+        window
+        for window in config["windows"] + config.get("deferred_windows", [])
+        if window["start_directory"] not in live_paths
+    ]
+
+
+def open_window(session, config, window_config, runner=None):
+    """Build one window of the session's config into it and select it."""
+    runner = runner or session.server
+    reconcile_tmux_session(
+        session, {**config, "windows": [window_config]}, runner=runner
+    )
+    for window_id, path in _list_windows(runner, session.session_id):
+        if path == window_config["start_directory"]:
+            runner.cmd("select-window", "-t", window_id)
+            return True
+    return False
+
+
+def add_missing_dev_panes(session, config, runner=None):
+    """
+    Add a dev pane to every live window whose config now has one, e.g. after
+    a dev script was added to the package. The new pane is inserted before
+    the shell pane, and the other panes keep running.
+    Returns the number of dev panes added.
+    """
+    server = runner or session.server
+    window_ids = {
+        path: window_id for window_id, path in _list_windows(server, session.session_id)
+    }
+    added = 0
+
+    for window_config in config["windows"]:
+        roles = pane_roles(window_config)
+        window_id = window_ids.get(window_config["start_directory"])
+        if "dev" not in roles or window_id is None:
+            continue
+
+        panes = _list_panes(server, window_id)
+        if any(role == "dev" for _, role in panes):
+            continue
+
+        dev_pane = window_config["panes"][roles.index("dev")]
+        args = ["-b", "-P", "-F", "#{pane_id}"]
+        args += ["-t", panes[-1][0], "-c", window_config["start_directory"]]
+        for name, value in window_config.get("environment", {}).items():
+            args += ["-e", f"{name}={value}"]
+        if "shell" in dev_pane:
+            args.append(dev_pane["shell"])
+        history_limit = dev_pane.get("history_limit")
+        if history_limit is not None:
+            server.cmd(
+                "set-option",
+                "-t",
+                session.session_id,
+                "history-limit",
+                str(history_limit),
+            )
+        pane_id = server.cmd("split-window", *args).stdout[0]
+        if history_limit is not None:
+            server.cmd("set-option", "-u", "-t", session.session_id, "history-limit")
+
+        server.cmd("set-option", "-p", "-t", pane_id, PANE_TAG, "dev")
+        if dev_pane.get("log_command"):
+            server.cmd("pipe-pane", "-o", "-t", pane_id, dev_pane["log_command"])
+        for command in dev_pane["shell_command"]:
+            server.cmd("send-keys", "-t", pane_id, command["cmd"], "Enter")
+        for option, value in window_config["options"].items():
+            server.cmd("set-option", "-w", "-t", window_id, option, value)
+        server.cmd("select-layout", "-t", window_id, window_config["layout"])
+        added += 1
+
+    return added
+
+
+def reconcile_enabled(directory):
+    """Check that reconciling isn't disabled with `reconcile: false`."""
+    project_config = load_project_config(directory)
+    return project_config.get("reconcile", load_global_config().get("reconcile", True))
+
+
+def sync_tmux_session(session, directory, runner=None, config=None):
+    """
+    Reconcile an existing session with the current state of the project's
+    workspace, unless disabled with `reconcile: false`. config is built from
+    the workspace when not given.
+    """
+    if not reconcile_enabled(directory):
+        return 0, 0
+
+    global_config = load_global_config()
+    project_config = load_project_config(directory)
+    remove = project_config.get(
+        "reconcile_remove", global_config.get("reconcile_remove", False)
+    )
+    if config is None:
+        config = build_session_config(directory)
+    return reconcile_tmux_session(session, config, remove=remove, runner=runner)
+
+
+def spawn_sync(directory, session_name, new_session=False):
+    """
+    Finish detection in a detached process and reconcile the session with its
+    result, for sessions opened after detection ran out of time.
+    """
+    args = [sys.executable, "-m", "tmux_bro.main", "sync", directory]
+    args += ["--session", session_name]
+    if new_session:
+        args.append("--new-session")
+    subprocess.Popen(
+        args,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def restore_tmux_sessions(workers=DEFAULT_INSPECT_WORKERS):
+    """
+    Recreate detached sessions for the projects whose sessions were alive when
+    the tmux server went away, and have no running session. Sessions that
+    were closed are not brought back. Snapshots whose manifests are unchanged
+    are built as is, stale ones are rebuilt with fresh detection.
+    Returns a list of (directory, session name, whether the snapshot was used).
+    """
     server = Server()
-    return server.find_where({"session_name": session_name})
+    running = {session.name for session in server.sessions}
+
+    pending = []
+    for session_name, directory in load_live_sessions():
+        if session_name in running:
+            continue
+        snapshot = load_snapshot(directory)
+        if snapshot is None or not os.path.isdir(directory):
+            remove_snapshot(directory)
+            unmark_session(session_name)
+            continue
+        pending.append(snapshot)
+
+    def restore(snapshot):
+        directory = snapshot["directory"]
+        fresh = is_snapshot_valid(snapshot)
+        if fresh:
+            config = snapshot["config"]
+        else:
+            config = build_session_config(directory)
+            save_snapshot(directory, config)
+        build_tmux_session(config, directory, Server())
+        return directory, config["session_name"], fresh
+
+    if not pending:
+        return []
+
+    # The first session starts the tmux server, the rest are built in parallel
+    restored = [restore(pending[0])]
+    restored.extend(_map_concurrently(restore, pending[1:], workers))
+    return restored
+
+
+def find_tmux_session(session_name, runner=None):
+    """
+    Find an existing tmux session by exact name. The lookup goes through
+    runner when given, so that it doesn't need a tmux process of its own.
+    """
+    server = Server()
+    result = (runner or server).cmd(
+        "display-message", "-p", "-t", f"={session_name}:", "#{session_id}"
+    )
+    # An unknown target prints an empty line rather than an error
+    if result.stderr or not result.stdout or not result.stdout[0]:
+        return None
+    return Session(
+        server=server, session_id=result.stdout[0], session_name=session_name
+    )
@@ -0,0 +1,138 @@
+"""
+Which package windows of a project are actually visited.
+
+Sessions get a tmux hook that appends the path of every window selected in
+them to the project's visit log, with a plain shell `printf`. The log is
+folded into per-package counts whenever the session config is built. With
+`adaptive_windows`, only the package windows that are used get built, and
+the rest are opened on demand with `tmux-bro packages`.
+"""
+
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import shlex
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import get_cache_dir
+from .units import parse_duration
+
+DEFAULT_MIN_VISITS = 2
+DEFAULT_MAX_AGE = "30d"
+
+
+def get_usage_dir() -> str:
+    return os.path.join(get_cache_dir(), "usage")
+
+
+def _usage_path(directory: str, suffix: str) -> str:
+    key = hashlib.sha1(os.path.abspath(directory).encode()).hexdigest()
+    return os.path.join(get_usage_dir(), f"{key}{suffix}")
+
+
+def get_visit_hook(directory: str) -> str:
+    """
+    Return the session-window-changed hook that logs the selected window's
+    package path. It runs a shell, not Python, so that switching windows
+    stays cheap.
+    """
+    log = shlex.quote(_usage_path(directory, ".log"))
+    return f"run-shell -b \"printf '%s\\\\n' #{{q:@tmux-bro-path}} >> {log}\""
+
+
+@contextlib.contextmanager
+def _locked(directory: str):
+    os.makedirs(get_usage_dir(), exist_ok=True)
+    with open(_usage_path(directory, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def load_usage(directory: str) -> Dict[str, Any]:
+    """
+    Return the project's usage: {"packages": {path: {"visits", "last"}},
+    "current": the last visited path}, with the visit log folded in.
+    """
+    usage_path = _usage_path(directory, ".json")
+    log_path = _usage_path(directory, ".log")
+    try:
+        with _locked(directory):
+            try:
+                with open(usage_path, "r") as f:
+                    usage = json.load(f)
+            except (OSError, ValueError):
+                usage = {"packages": {}, "current": None}
+
+            # Moved aside first, so that visits logged meanwhile aren't lost
+            folding = f"{log_path}.{os.getpid()}"
+            try:
+                os.replace(log_path, folding)
+            except OSError:
+                return usage
+            with open(folding, "r", errors="replace") as f:
+                visited = [line.rstrip("\n") for line in f if line.strip()]
+            now = int(os.stat(folding).st_mtime)
+            os.remove(folding)
+
+            for path in visited:
+                package = usage["packages"].setdefault(path, {"visits": 0})
+                package["visits"] += 1
+                package["last"] = now
+            if visited:
+                usage["current"] = visited[-1]
+
+            tmp_path = f"{usage_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(usage, f)
+            os.replace(tmp_path, usage_path)
+            return usage
+    except OSError:
+        return {"packages": {}, "current": None}
+
+
+def get_adaptive_options(
+    global_config: Dict[str, Any], project_config: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """Return the `adaptive_windows` options, or None when it is disabled."""
+    options = project_config.get(
+        "adaptive_windows", global_config.get("adaptive_windows", False)
+    )
+    if not options:
+        return None
+    return options if isinstance(options, dict) else {}
+
+
+def split_by_usage(
+    package_dirs: List[str], usage: Dict[str, Any], options: Dict[str, Any]
+) -> Tuple[List[str], List[str]]:
+    """
+    Split package directories into the ones to build windows for and the
+    ones to defer: a package is built when it was visited at least
+    `min_visits` times and within `max_age`, or was the last one visited.
+    Without any recorded visits every package is built.
+    """
+    packages = usage.get("packages", {})
+    if not any(path in packages for path in package_dirs):
+        return list(package_dirs), []
+
+    min_visits = int(options.get("min_visits", DEFAULT_MIN_VISITS))
+    try:
+        max_age = parse_duration(options.get("max_age", DEFAULT_MAX_AGE))
+    except ValueError as e:
+        print(f"Warning: Ignoring adaptive_windows max_age: {e}")
+        max_age = parse_duration(DEFAULT_MAX_AGE)
+    since = time.time() - max_age
+
+    built, deferred = [], []
+    for path in package_dirs:
+        package = packages.get(path, {})
+        used = (
+            package.get("visits", 0) >= min_visits and package.get("last", 0) >= since
+        )
+        (built if used or path == usage.get("current") else deferred).append(path)
+    if not built:
+        built.append(deferred.pop(0))
+    return built, deferred
@@ -0,0 +1,121 @@
+import base64
+import functools
+import hashlib
+import os
+import re
+import shlex
+import sys
+from typing import Dict, Optional
+
+from .manifest import read_toml_keys
+
+VENV_DIR_NAMES = ["venv", ".venv"]
+
+
+def _is_venv(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, "bin", "activate"))
+
+
+def _poetry_virtualenvs_dir() -> str:
+    if os.environ.get("POETRY_VIRTUALENVS_PATH"):
+        return os.environ["POETRY_VIRTUALENVS_PATH"]
+    if sys.platform == "darwin":
+        cache_dir = os.path.expanduser("~/Library/Caches")
+    else:
+        cache_dir = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache_dir, "pypoetry", "virtualenvs")
+
+
+def _poetry_venv_prefix(directory: str) -> Optional[str]:
+    """
+    Return the name prefix Poetry uses for the project's centrally stored
+    virtualenvs, e.g. "my-project-AbCdEf12-", or None if it's not a Poetry project.
+    """
+    pyproject_path = os.path.join(directory, "pyproject.toml")
+
+    if not os.path.isfile(pyproject_path):
+        return None
+
+    pyproject = read_toml_keys(pyproject_path, ["tool", "project"], ["poetry"])
+    if pyproject is None:
+        return None
+
+    poetry = pyproject.get("tool", {}).get("poetry")
+    if poetry is None:
+        return None
+
+    name = poetry.get("name") or pyproject.get("project", {}).get("name")
+    if not name:
+        return None
+
+    # Mirrors poetry.utils.env.EnvManager.generate_env_name
+    sanitized_name = re.sub(r'[ $`!*@"\\\r\n\t]', "_", name.lower())[:42]
+    normalized_cwd = os.path.normcase(os.path.realpath(directory))
+    digest = hashlib.sha256(normalized_cwd.encode()).digest()
+    cwd_hash = base64.urlsafe_b64encode(digest).decode()[:8]
+    return f"{sanitized_name}-{cwd_hash}-"
+
+
+def _find_poetry_venv(directory: str) -> Optional[str]:
+    prefix = _poetry_venv_prefix(directory)
+    if prefix is None:
+        return None
+
+    try:
+        entries = os.listdir(_poetry_virtualenvs_dir())
+    except OSError:
+        return None
+
+    # Poetry suffixes the name with the Python version, e.g. "-py3.12"
+    candidates = sorted(
+        (e for e in entries if e.startswith(prefix + "py")),
+        reverse=True,
+    )
+    for candidate in candidates:
+        path = os.path.join(_poetry_virtualenvs_dir(), candidate)
+        if _is_venv(path):
+            return path
+
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def find_venv(directory: str) -> Optional[str]:
+    """
+    Find the Python virtual environment of a project directory.
+    Looks for in-project venv/ and .venv/ directories (also used by uv and
+    Poetry's in-project mode) and Poetry's centrally stored virtualenvs.
+    Returns the path of the virtual environment or None. Results are cached
+    for the lifetime of the process.
+    """
+    uv_env = os.environ.get("UV_PROJECT_ENVIRONMENT")
+    names = [uv_env] + VENV_DIR_NAMES if uv_env else VENV_DIR_NAMES
+
+    for name in names:
+        path = os.path.join(directory, name)
+        if _is_venv(path):
+            return path
+
+    return _find_poetry_venv(directory)
+
+
+def get_venv_environment(venv: str) -> Dict[str, str]:
+    """
+    Return the environment variables that activating the virtual environment
+    would set, for passing to tmux instead of sourcing bin/activate. PATH is
+    left out, so that panes keep the PATH they start with; get_venv_shell
+    puts the venv's bin directory in front of it.
+    """
+    return {"VIRTUAL_ENV": venv}
+
+
+def get_venv_shell(shell: Optional[str] = None) -> str:
+    """
+    Return the pane command that runs shell, or the user's shell, with
+    $VIRTUAL_ENV/bin in front of the PATH the pane starts with. The user's
+    shell is started as an interactive, non-login shell, so that login
+    profiles that rebuild PATH (e.g. macOS path_helper) don't move the venv
+    behind the system paths.
+    """
+    script = 'PATH="$VIRTUAL_ENV/bin:$PATH" exec ' + (shell or '"${SHELL:-/bin/sh}"')
+    return f"sh -c {shlex.quote(script)}"
@@ -0,0 +1,267 @@
+import ctypes
+import ctypes.util
+import hashlib
+import os
+import select
+import signal
+import struct
+import subprocess
+import sys
+from typing import Dict, List, Optional, Set, Tuple
+
+from . import tmux
+from .config import get_cache_dir
+from .detectors import detector_markers
+from .workspace import detect_workspace
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_ONLYDIR
+)
+
+EVENT_HEADER = struct.Struct("iIII")
+
+# Files in the project root that decide the set of packages and their config
+PROJECT_FILES = {
+    "package.json",
+    "pnpm-workspace.yaml",
+    "Cargo.toml",
+    "go.work",
+    "pyproject.toml",
+    "turbo.json",
+    ".tmux-bro.yaml",
+}
+# Files in a package directory that decide its window
+PACKAGE_FILES = {"package.json", ".tmux-bro.yaml"}
+
+DEBOUNCE_SECONDS = 0.3
+# How often an idle watcher wakes up to check that its session still exists
+SESSION_CHECK_SECONDS = 300
+
+
+class Inotify:
+    """Minimal ctypes binding to Linux inotify."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+
+        self.fd = libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+    def add_watch(self, path: str, mask: int = WATCH_MASK) -> Optional[int]:
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        return wd if wd >= 0 else None
+
+    def rm_watch(self, wd: int) -> None:
+        self._rm_watch(self.fd, wd)
+
+    def read(self, timeout: Optional[float]) -> List[Tuple[int, int, str]]:
+        """
+        Wait up to timeout seconds (forever if None) for events and return
+        them as (watch descriptor, mask, name) tuples.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+
+        data = os.read(self.fd, 64 * 1024)
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            events.append((wd, mask, os.fsdecode(name)))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class WorkspaceWatcher:
+    """
+    Watch the manifests of a workspace and keep its tmux session in sync.
+
+    Only directories are watched, so that editors replacing files by rename
+    don't drop the watch: the project root, each package directory and the
+    directories that workspace globs expand in.
+    """
+
+    def __init__(self, directory: str, session_name: str):
+        self.directory = directory
+        self.session_name = session_name
+        self.project_files = PROJECT_FILES | detector_markers()
+        self.inotify = Inotify()
+        self.watches: Dict[int, str] = {}
+        self.package_dirs: Set[str] = set()
+        self.glob_parents: Set[str] = set()
+
+    def _update_watches(self) -> None:
+        package_dirs = detect_workspace(self.directory) or []
+        self.package_dirs = set(package_dirs)
+        self.glob_parents = {
+            os.path.dirname(package_dir)
+            for package_dir in package_dirs
+            if os.path.dirname(package_dir) != self.directory
+        }
+
+        wanted = {self.directory} | self.package_dirs | self.glob_parents
+        watched = {path: wd for wd, path in self.watches.items()}
+
+        for path, wd in watched.items():
+            if path not in wanted:
+                self.inotify.rm_watch(wd)
+                del self.watches[wd]
+        for path in wanted - set(watched):
+            wd = self.inotify.add_watch(path)
+            if wd is not None:
+                self.watches[wd] = path
+
+    def _classify(self, events) -> Tuple[bool, Set[str]]:
+        """
+        Return whether the set of packages may have changed, and which
+        packages had their own manifests changed.
+        """
+        workspace_changed = False
+        changed_packages = set()
+
+        for wd, mask, name in events:
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                workspace_changed = True
+                continue
+
+            path = self.watches.get(wd)
+            if path is None:
+                continue
+            if path == self.directory and name in self.project_files:
+                workspace_changed = True
+            elif path in self.glob_parents and mask & IN_ISDIR:
+                workspace_changed = True
+            elif path in self.package_dirs and name in PACKAGE_FILES:
+                changed_packages.add(path)
+
+        return workspace_changed, changed_packages
+
+    def _wait_for_changes(self) -> Optional[Tuple[bool, Set[str]]]:
+        """
+        Block until relevant files change and return the debounced changes, or
+        None if the idle timeout passed without events.
+        """
+        events = self.inotify.read(SESSION_CHECK_SECONDS)
+        if not events:
+            return None
+
+        # Collect the rest of a burst, e.g. a package manager rewriting files
+        while True:
+            more = self.inotify.read(DEBOUNCE_SECONDS)
+            if not more:
+                break
+            events.extend(more)
+
+        return self._classify(events)
+
+    def _sync(self, session, workspace_changed: bool, changed_packages: Set[str]):
+        if workspace_changed:
+            config = tmux.build_session_config(self.directory)
+            self._update_watches()
+        else:
+            config = tmux.build_session_config(self.directory, changed_packages)
+
+        tmux.reconcile_tmux_session(session, config)
+        tmux.add_missing_dev_panes(session, config)
+
+    def run(self) -> None:
+        self._update_watches()
+        while True:
+            changes = self._wait_for_changes()
+            if changes is not None and not any(changes):
+                continue
+
+            session = tmux.find_tmux_session(self.session_name)
+            if session is None:
+                return
+            if changes is not None:
+                self._sync(session, *changes)
+
+
+def _pid_file(directory: str) -> str:
+    key = hashlib.sha1(os.path.abspath(directory).encode()).hexdigest()
+    return os.path.join(get_cache_dir(), "watch", f"{key}.pid")
+
+
+def _is_running(pid_file: str) -> bool:
+    try:
+        with open(pid_file, "r") as f:
+            os.kill(int(f.read().strip()), 0)
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+def watch_workspace(directory: str, session_name: str) -> int:
+    """
+    Run the watcher for a session in the foreground until the session is
+    gone. Only one watcher runs per project.
+    """
+    if not sys.platform.startswith("linux"):
+        print("Error: watching workspaces requires Linux inotify", file=sys.stderr)
+        return 1
+
+    pid_file = _pid_file(directory)
+    if _is_running(pid_file):
+        return 0
+
+    os.makedirs(os.path.dirname(pid_file), exist_ok=True)
+    with open(pid_file, "w") as f:
+        f.write(str(os.getpid()))
+
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    watcher = WorkspaceWatcher(directory, session_name)
+    try:
+        watcher.run()
+    finally:
+        watcher.inotify.close()
+        try:
+            os.remove(pid_file)
+        except OSError:
+            pass
+    return 0
+
+
+def spawn_watcher(directory: str, session_name: str) -> None:
+    """Start a detached watcher process for the session."""
+    if not sys.platform.startswith("linux") or _is_running(_pid_file(directory)):
+        return
+
+    subprocess.Popen(
+        [sys.executable, "-m", "tmux_bro.main", "watch", directory]
+        + ["--session", session_name],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
@@ -1,9 +1,10 @@
 import os
-import yaml
-import json
 import glob
-import toml
-from typing import List, Optional
+import re
+from typing import List, Optional, Tuple
+
+from .detectors import register_detector, run_detectors
+from .manifest import read_json_keys, read_toml_keys, read_yaml
 
 
 def detect_workspace(directory: str) -> Optional[List[str]]:
@@ -11,19 +12,18 @@ def detect_workspace(directory: str) -> Optional[List[str]]:
     Detect if the directory is any type of workspace (pnpm, npm, cargo, etc.)
     Returns a list of package directories if it's a workspace, None otherwise
     """
-    # Try each workspace type in order
-    detectors = [
-        detect_pnpm_workspace,
-        detect_npm_workspace,
-        detect_cargo_workspace,
-    ]
+    workspace = detect_workspace_type(directory)
+    return workspace[1] if workspace else None
 
-    for detector in detectors:
-        package_dirs = detector(directory)
-        if package_dirs:
-            return package_dirs
 
-    return None
+def detect_workspace_type(directory: str) -> Optional[Tuple[str, List[str]]]:
+    """
+    Detect the workspace type of the directory.
+    Returns a tuple of the detector name ('pnpm', 'npm', 'cargo', 'go', 'uv'
+    or a plugin's) and the package directories if it's a workspace, None
+    otherwise
+    """
+    return run_detectors(directory)
 
 
 def detect_npm_workspace(directory: str) -> Optional[List[str]]:
@@ -33,12 +33,8 @@ def detect_npm_workspace(directory: str) -> Optional[List[str]]:
     """
     package_json_path = os.path.join(directory, "package.json")
 
-    if not os.path.isfile(package_json_path):
-        return None
-
     try:
-        with open(package_json_path, "r") as f:
-            package_data = json.load(f)
+        package_data = read_json_keys(package_json_path, ["workspaces"])
 
         if not package_data or "workspaces" not in package_data:
             return None
@@ -79,12 +75,8 @@ def detect_pnpm_workspace(directory: str) -> Optional[List[str]]:
     """
     workspace_file = os.path.join(directory, "pnpm-workspace.yaml")
 
-    if not os.path.isfile(workspace_file):
-        return None
-
     try:
-        with open(workspace_file, "r") as f:
-            workspace_config = yaml.safe_load(f)
+        workspace_config = read_yaml(workspace_file)
 
         if not workspace_config or "packages" not in workspace_config:
             return None
@@ -116,12 +108,8 @@ def detect_cargo_workspace(directory: str) -> Optional[List[str]]:
     """
     cargo_toml_path = os.path.join(directory, "Cargo.toml")
 
-    if not os.path.isfile(cargo_toml_path):
-        return None
-
     try:
-        with open(cargo_toml_path, "r") as f:
-            cargo_data = toml.load(f)
+        cargo_data = read_toml_keys(cargo_toml_path, ["workspace"], ["members"])
 
         if not cargo_data or "workspace" not in cargo_data:
             return None
@@ -144,6 +132,93 @@ def detect_cargo_workspace(directory: str) -> Optional[List[str]]:
         return None
 
 
+def _expand_members(directory: str, patterns: List[str]) -> List[str]:
+    """Return the directories matched by member paths or globs, in order."""
+    package_dirs = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            package_dirs.extend(sorted(glob.glob(os.path.join(directory, pattern))))
+        else:
+            package_dirs.append(os.path.join(directory, pattern))
+    return package_dirs
+
+
+def detect_go_workspace(directory: str) -> Optional[List[str]]:
+    """
+    Detect if the directory is a Go workspace by reading the use directives
+    of go.work
+    Returns a list of module directories if it's a workspace, None otherwise
+    """
+    try:
+        with open(os.path.join(directory, "go.work"), "r") as f:
+            lines = f.read().splitlines()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+    uses = []
+    in_block = False
+    for line in lines:
+        line = line.split("//", 1)[0].strip()
+        if in_block:
+            if line == ")":
+                in_block = False
+            elif line:
+                uses.append(line)
+        elif line.startswith("use"):
+            rest = line[len("use") :].strip()
+            if rest == "(":
+                in_block = True
+            elif rest and line[len("use")].isspace():
+                uses.append(rest)
+
+    package_dirs = []
+    for use in uses:
+        package_dir = os.path.normpath(os.path.join(directory, use.strip('"`')))
+        if package_dir != directory and os.path.isdir(package_dir):
+            package_dirs.append(package_dir)
+
+    return package_dirs if package_dirs else None
+
+
+def detect_uv_workspace(directory: str) -> Optional[List[str]]:
+    """
+    Detect if the directory is a uv workspace by checking for
+    [tool.uv.workspace] members in pyproject.toml
+    Returns a list of package directories if it's a workspace, None otherwise
+    """
+    pyproject = read_toml_keys(
+        os.path.join(directory, "pyproject.toml"), ["tool"], ["uv", "workspace"]
+    )
+    try:
+        workspace = pyproject["tool"]["uv"]["workspace"]
+        members = workspace.get("members", [])
+        exclude = {
+            os.path.normpath(d)
+            for d in _expand_members(directory, workspace.get("exclude", []))
+        }
+    except (TypeError, KeyError, AttributeError):
+        return None
+
+    package_dirs = []
+    for package_dir in _expand_members(directory, members):
+        package_dir = os.path.normpath(package_dir)
+        if (
+            package_dir not in exclude
+            and package_dir not in package_dirs
+            and os.path.isfile(os.path.join(package_dir, "pyproject.toml"))
+        ):
+            package_dirs.append(package_dir)
+
+    return package_dirs if package_dirs else None
+
+
+register_detector("pnpm", ["pnpm-workspace.yaml"], detect_pnpm_workspace)
+register_detector("npm", ["package.json"], detect_npm_workspace)
+register_detector("cargo", ["Cargo.toml"], detect_cargo_workspace)
+register_detector("go", ["go.work"], detect_go_workspace)
+register_detector("uv", ["pyproject.toml"], detect_uv_workspace)
+
+
 def has_cargo_toml(directory: str) -> bool:
     """
     Check if the directory has a Cargo.toml file
@@ -161,10 +236,9 @@ def has_package_json_dev_script(package_dir: str) -> bool:
         return False
 
     try:
-        with open(package_json_path, "r") as f:
-            package_data = json.load(f)
+        package_data = read_json_keys(package_json_path, ["scripts"], ["dev"])
 
-        return (
+        return bool(
             package_data
             and "scripts" in package_data
             and "dev" in package_data["scripts"]
@@ -173,6 +247,21 @@ def has_package_json_dev_script(package_dir: str) -> bool:
         return False
 
 
+def is_yarn_berry(directory: str) -> bool:
+    """
+    Check if the directory uses Yarn 2 or later rather than Yarn classic,
+    which share yarn.lock: by its .yarnrc.yml, or the packageManager field
+    in package.json
+    """
+    if os.path.isfile(os.path.join(directory, ".yarnrc.yml")):
+        return True
+    package_data = read_json_keys(
+        os.path.join(directory, "package.json"), ["packageManager"]
+    )
+    match = re.match(r"yarn@(\d+)", str((package_data or {}).get("packageManager")))
+    return bool(match and int(match.group(1)) >= 2)
+
+
 def detect_package_manager(directory: str) -> str:
     """
     Detect which package manager is used in the directory